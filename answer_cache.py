@@ -0,0 +1,404 @@
+"""
+Answer Cache
+Reuses EcoCoach's opening replies across sessions. On the start and quiz
+screens most first messages are some version of "what should I answer for
+this question?" about one of the 12 quiz questions. Before the user has
+answered anything, the reply depends only on the screen, the question and
+the message, not on who asks.
+
+- Only first-turn messages are looked up (an empty conversation history),
+  and never on the results screen or once there are quiz answers: those
+  prompts carry the user's own results and answers. On the quiz screen the
+  question must match the catalog exactly
+- Keys are (screen, question id) plus the normalized message (case,
+  punctuation, filler words and plural 's' dropped). Messages are compared by
+  the Jaccard similarity of their word unigrams + bigrams
+- Replies generated at runtime are only served for the same normalized
+  message; near matches (similarity >= ANSWER_CACHE_THRESHOLD) are served
+  from pre-warmed entries only, so a crafted message can't plant a reply
+  for other people's questions
+- "Question N" in a reply is stored as a template: the quiz is shuffled, so
+  a question has a different number in each session
+- Runtime entries expire after ANSWER_CACHE_TTL seconds and are bounded by
+  ANSWER_CACHE_SIZE (LRU; 0 disables the cache)
+
+Pre-warm every question with the chat suggestions (through the real API, or
+the local fake for a dry run); the file is loaded at startup and entries
+whose prompt has changed since are skipped:
+
+    python -m answer_cache warm [--output answer_cache.json] [--fake] [--messages "..." ...]
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from quiz_data import QUESTIONS
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_FILE = os.environ.get('ANSWER_CACHE_FILE',
+                                   os.path.join(os.path.dirname(os.path.abspath(__file__)), 'answer_cache.json'))
+ANSWER_CACHE_SIZE = int(os.environ.get('ANSWER_CACHE_SIZE', 2048))
+ANSWER_CACHE_TTL = float(os.environ.get('ANSWER_CACHE_TTL', 24 * 3600))
+ANSWER_CACHE_THRESHOLD = float(os.environ.get('ANSWER_CACHE_THRESHOLD', 0.6))
+
+CACHE_SCREENS = ('start', 'quiz')
+
+# Pre-warmed per screen (the chat suggestion buttons in index.html, plus common phrasings)
+WARM_MESSAGES = {
+    'start': ("What does this quiz measure?", "What's my biggest climate impact?", "Give me a quick win"),
+    'quiz': ("What should I answer for this question?", "What's my biggest climate impact?", "Give me a quick win",
+             "Which option is best for the planet?"),
+}
+
+FILLER_WORDS = frozenset(('a', 'an', 'the', 'please', 'pls', 'hey', 'hi', 'hello', 'ecocoach', 'um', 'so', 'ok',
+                          'okay', 'thanks', 'thank', 'you', 'just'))
+
+QUESTION_NUMBER = '\x00n\x00'  # stands in for the question number in stored replies
+
+AnswerKey = namedtuple('AnswerKey', ['context', 'text', 'shingles', 'number'])
+
+
+def normalize(message):
+    """Lowercase words without punctuation, filler words or a plural 's'"""
+    words = re.findall(r"[a-z0-9]+(?:'[a-z]+)?", message.lower())
+    words = [word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') else word
+             for word in words if word not in FILLER_WORDS]
+    return ' '.join(words)
+
+
+def shingles(text):
+    """Word unigrams and bigrams of a normalized message"""
+    words = text.split()
+    return frozenset(words + [f'{first} {second}' for first, second in zip(words, words[1:])])
+
+
+def jaccard(first, second):
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+def option_labels(question):
+    """Option texts as the quiz screen sends them in current_question (see updateQuestionContext)"""
+    if question.get('options'):
+        return [option['text'] for option in question['options']]
+    if question.get('type') == 'slider':
+        return [f"Range: {question['min']}-{question['max']} {question['unit']}"]
+    return []
+
+
+def catalog_questions(questions=QUESTIONS):
+    """{question text: current_question dict (without number/total)} for every quiz question"""
+    catalog = {}
+    for category, category_questions in questions.items():
+        for question in category_questions:
+            catalog[question['question']] = {
+                'id': question['id'],
+                'category': category,
+                'question': question['question'],
+                'type': question.get('type', 'multiple_choice'),
+                'options': option_labels(question),
+            }
+    return catalog
+
+
+def to_template(reply, number):
+    """Replace 'Question <number>' in a reply with a placeholder"""
+    if number is None:
+        return reply
+    return re.sub(rf'\b([Qq]uestion) {number}\b', rf'\1 {QUESTION_NUMBER}', reply)
+
+
+def from_template(template, number):
+    return template.replace(QUESTION_NUMBER, str(number if number is not None else '?'))
+
+
+class _Entry:
+    __slots__ = ('template', 'shingles', 'seconds', 'expires')
+
+    def __init__(self, template, shingles, seconds, expires=None):
+        self.template = template
+        self.shingles = shingles
+        self.seconds = seconds  # upstream time it took to generate (what a hit saves)
+        self.expires = expires
+
+
+class AnswerCache:
+    """
+    First-turn EcoCoach replies keyed by screen, question and message
+
+    Args:
+        max_entries: Runtime entries kept (LRU; 0 disables the cache)
+        ttl: Seconds a runtime entry is served
+        threshold: Minimum similarity for a near match against a pre-warmed entry
+        questions: {category: [question, ...]}
+    """
+
+    def __init__(self, max_entries=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL, threshold=ANSWER_CACHE_THRESHOLD,
+                 questions=QUESTIONS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.catalog = catalog_questions(questions)
+        self.total_questions = len(self.catalog)
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.saved_seconds = 0.0
+        self._entries = OrderedDict()  # (context, text) -> _Entry
+        self._warm = {}  # context -> {text: _Entry}
+        self._lock = threading.Lock()
+
+    def key(self, data, history):
+        """
+        Cache key for a chat request, or None when its reply can't be shared
+
+        Args:
+            data: The chat request JSON (message, screen_context, current_question, results, user_answers)
+            history: Conversation history before this message
+
+        Returns:
+            AnswerKey or None
+        """
+        key = self._key(data, history)
+        if key is None:
+            with self._lock:
+                self.bypassed += 1
+        return key
+
+    def _key(self, data, history):
+        screen = data.get('screen_context')
+        if self.max_entries <= 0 or history or screen not in CACHE_SCREENS or data.get('results'):
+            return None
+        answers = data.get('user_answers')
+        if answers and isinstance(answers, list):
+            return None  # the prompt lists this user's answers (prompt_builder.answers_context)
+        question_id = number = None
+        if screen == 'quiz':
+            current = data.get('current_question')
+            if not isinstance(current, dict) or not isinstance(current.get('question'), str):
+                return None
+            known = self.catalog.get(current.get('question'))
+            if known is None or current.get('category') != known['category'] \
+                    or list(current.get('options') or []) != known['options']:
+                return None  # edited by the client: its prompt isn't the one the cache was built from
+            question_id, number = known['id'], current.get('number')
+            if not isinstance(number, int) or isinstance(number, bool):
+                number = None
+        text = normalize(str(data.get('message', '')))
+        if not text:
+            return None
+        return AnswerKey((screen, question_id), text, shingles(text), number)
+
+    def get(self, key):
+        """
+        Cached reply for key (None on a miss)
+
+        Returns:
+            tuple or None: (reply, similarity, upstream seconds saved)
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry, similarity = self._entries.get((key.context, key.text)), 1.0
+            if entry is not None and entry.expires <= now:
+                del self._entries[(key.context, key.text)]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end((key.context, key.text))
+            else:
+                entry, similarity = self._warm_match(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.near_hits += similarity < 1.0
+            self.saved_seconds += entry.seconds
+        return from_template(entry.template, key.number), similarity, entry.seconds
+
+    def _warm_match(self, key):
+        candidates = self._warm.get(key.context)
+        if not candidates:
+            return None, 0.0
+        entry = candidates.get(key.text)
+        if entry is not None:
+            return entry, 1.0
+        best, best_similarity = None, 0.0
+        for candidate in candidates.values():
+            similarity = jaccard(key.shingles, candidate.shingles)
+            if similarity > best_similarity:
+                best, best_similarity = candidate, similarity
+        if best_similarity >= self.threshold:
+            return best, best_similarity
+        return None, 0.0
+
+    def put(self, key, reply, seconds):
+        """Store the reply generated for key (served to the same normalized message until it expires)"""
+        if self.max_entries <= 0:
+            return
+        entry = _Entry(to_template(reply, key.number), key.shingles, seconds, time.monotonic() + self.ttl)
+        with self._lock:
+            self._entries[(key.context, key.text)] = entry
+            self._entries.move_to_end((key.context, key.text))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def warm(self, screen, question_id, message, reply, seconds=0.0):
+        """Add a pre-warmed reply (a template, see to_template), near-matched and never expired"""
+        text = normalize(message)
+        with self._lock:
+            self._warm.setdefault((screen, question_id), {})[text] = _Entry(reply, shingles(text), seconds)
+
+    def question_context(self, question_id, number=1):
+        """The current_question dict the quiz screen sends for a catalog question"""
+        for known in self.catalog.values():
+            if known['id'] == question_id:
+                question = {key: value for key, value in known.items() if key != 'id'}
+                return {'number': number, 'total': self.total_questions, **question}
+        return None
+
+    def prompt_digest(self, prompt_builder, screen, question_id):
+        """Digest of the system prompt a pre-warmed reply was generated from"""
+        current = self.question_context(question_id) if question_id is not None else None
+        prompt = prompt_builder.build('answer-cache', screen, current, None, None)
+        return hashlib.sha256(prompt.text.encode('utf-8')).hexdigest()[:16]
+
+    def load(self, path, prompt_builder, model):
+        """
+        Load pre-warmed replies written by `python -m answer_cache warm`
+
+        Entries generated for another model or from a different prompt are
+        skipped. A missing file is not an error.
+
+        Returns:
+            int: Entries loaded
+        """
+        try:
+            with open(path, encoding='utf-8') as f:
+                warmed = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            logger.warning("⚠️  Can't read answer cache file %s: %s", path, e)
+            return 0
+        if warmed.get('model') != model:
+            logger.warning("⚠️  Answer cache file %s was generated for %s, not %s; ignoring it",
+                           path, warmed.get('model'), model)
+            return 0
+        digests, loaded, stale = {}, 0, 0
+        for item in warmed.get('entries', []):
+            context = (item['screen'], item['question_id'])
+            if context not in digests:
+                digests[context] = self.prompt_digest(prompt_builder, *context)
+            if item['prompt_digest'] != digests[context]:
+                stale += 1
+                continue
+            self.warm(item['screen'], item['question_id'], item['message'], item['reply'],
+                      item.get('upstream_ms', 0) / 1000)
+            loaded += 1
+        logger.info("💾 Loaded %d pre-warmed answers from %s", loaded, path, extra={'stale': stale})
+        return loaded
+
+    def stats(self):
+        """Return {'entries', 'warm_entries', 'hits', 'near_hits', 'misses', 'bypassed', 'hit_ratio', 'saved_seconds'}"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'warm_entries': sum(len(entries) for entries in self._warm.values()),
+                'hits': self.hits,
+                'near_hits': self.near_hits,
+                'misses': self.misses,
+                'bypassed': self.bypassed,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'saved_seconds': round(self.saved_seconds, 3),
+            }
+
+
+# ===================================
+# Warm-up job
+# ===================================
+def warm(client, cache, prompt_builder, model, max_tokens, messages=WARM_MESSAGES):
+    """
+    Generate a reply for every (screen, question, message) combination
+
+    Returns:
+        list: File entries (see load)
+    """
+    contexts = [('start', None)] + [('quiz', known['id']) for known in cache.catalog.values()]
+    entries = []
+    for screen, question_id in contexts:
+        current = cache.question_context(question_id) if question_id is not None else None
+        system_prompt = prompt_builder.build('answer-cache', screen, current, None, None)
+        digest = cache.prompt_digest(prompt_builder, screen, question_id)
+        for message in messages[screen]:
+            start = time.perf_counter()
+            response = client.messages.create(
+                model=model,
+                max_tokens=max_tokens,
+                system=system_prompt.blocks(),
+                messages=[{"role": "user", "content": message}]
+            )
+            elapsed = time.perf_counter() - start
+            if getattr(response, 'stop_reason', 'end_turn') != 'end_turn':
+                logger.warning("⚠️  Skipping truncated reply for %s/%s: %r", screen, question_id, message)
+                continue
+            entries.append({
+                'screen': screen,
+                'question_id': question_id,
+                'message': message,
+                'reply': to_template(response.content[0].text, current and current['number']),
+                'prompt_digest': digest,
+                'upstream_ms': round(elapsed * 1000, 1),
+            })
+    return entries
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pre-generate EcoCoach's first replies for every quiz question")
+    parser.add_argument('command', choices=['warm'])
+    parser.add_argument('--output', default=ANSWER_CACHE_FILE)
+    parser.add_argument('--fake', action='store_true',
+                        help="Use the local fake Anthropic API (benchmarks.fake_anthropic) instead of the real one")
+    parser.add_argument('--messages', nargs='+', help="Messages to warm (default: the chat suggestions)")
+    args = parser.parse_args()
+
+    from anthropic import Anthropic
+
+    import app as web
+
+    fake = None
+    if args.fake:
+        from benchmarks.fake_anthropic import start_fake_server
+        fake = start_fake_server(latency_ms=50, token_delay_ms=0)
+        client = Anthropic(api_key='fake', base_url=fake.url)
+    else:
+        client = web.anthropic_client
+    messages = {screen: tuple(args.messages) for screen in CACHE_SCREENS} if args.messages else WARM_MESSAGES
+    try:
+        entries = warm(client, AnswerCache(), web.prompt_builder, web.CHAT_MODEL, web.CHAT_MAX_TOKENS, messages)
+    finally:
+        if fake is not None:
+            fake.shutdown()
+    # A dry run's canned replies are never served: the app only loads files made for its model
+    model = f'{web.CHAT_MODEL} (fake)' if args.fake else web.CHAT_MODEL
+    for entry in entries:
+        print(f"   {entry['screen']:<5} {entry['question_id'] or '-':>2}  {entry['upstream_ms']:>7.0f} ms  "
+              f"{entry['message']}")
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'model': model, 'generated': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                   'entries': entries}, f, indent=1, ensure_ascii=False)
+    print(f"✅ {len(entries)} answers written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
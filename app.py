@@ -1,349 +1,314 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, Response, g, request, jsonify, session
+import json
+import logging
 import random
 import os
-from anthropic import Anthropic
-from ml_calculator import calculate_emission, get_comparison_data
+import time
+from ml_calculator import calculate_emission, calculate_emissions_batch, canonicalize_answers, get_comparison_data
+from quiz_data import QUESTIONS, AVERAGE_EMISSIONS, PRODUCTS, TIPS
+from inference import MODEL_BUNDLE, MODEL_RELOAD_INTERVAL, BundleWatcher, load_inference_server
+from conversation_store import clean_history, create_conversation_store
+from prompt_builder import FULL_DETAIL, PromptBuilder, SystemPrompt
+from history_compactor import HistoryCompactor, api_messages, estimate_tokens
+from answer_cache import ANSWER_CACHE_FILE, AnswerCache
+from catalog_index import ResultsCatalog, category_weights
+from local_coach import LOCAL_COACH, LOCAL_COACH_CONFIDENCE, LocalCoach
+from upstream import CircuitBreaker, CircuitOpen, create_client, unavailable
+from question_catalog import QuestionCatalog
+from index_page import IndexPage, compress
+import static_assets
+from response_cache import CachedResponse, ResponseCache, make_etag
+from logging_setup import configure_logging, end_request, request_context, start_request
+import metrics
+import profiling
+from profiling import span
 from dotenv import load_dotenv
 
 # Load environment variables from .env file if it exists
 load_dotenv()
 
+# Structured logging (LOG_LEVEL, LOG_LEVELS, LOG_FORMAT)
+configure_logging()
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'dev-secret-key-change-in-production')
 
+# Fingerprinted, precompressed CSS/JS and self-hosted fonts from static/dist/ (if built)
+static_assets.init_app(app)
+
 # Get API key from environment
 api_key = os.getenv('ANTHROPIC_API_KEY', '')
 
 # Validate API key exists
 if not api_key:
-    print("⚠️  WARNING: No ANTHROPIC_API_KEY found in environment!")
-    print("⚠️  Please create a .env file with your API key")
-    print("⚠️  The chatbot will not work without a valid API key")
+    logger.warning("⚠️  No ANTHROPIC_API_KEY found in environment! Please create a .env file "
+                   "with your API key - until then the chatbot only gives local answers")
 else:
-    print("✅ Anthropic API Key loaded successfully")
-
-# Initialize Claude API client
-anthropic_client = Anthropic(api_key=api_key)
-
-# Store conversation history per session
-conversation_history = {}
-
-# Quiz questions database (based on Carbon Emissions dataset)
-QUESTIONS = {
-    "Home": [
-        {
-            "id": 1,
-            "question": "What is your primary heating energy source?",
-            "type": "multiple_choice",
-            "options": [
-                {"text": "Electricity", "co2": 200},
-                {"text": "Natural gas", "co2": 350},
-                {"text": "Wood", "co2": 450},
-                {"text": "Coal", "co2": 650}
-            ]
-        },
-        {
-            "id": 2,
-            "question": "How many hours per day do you use TV/Computer?",
-            "type": "slider",
-            "min": 0,
-            "max": 24,
-            "unit": "hours",
-            "co2_per_unit": 8  # kg CO2 per hour per year
-        },
-        {
-            "id": 3,
-            "question": "How many hours per day do you use the internet?",
-            "type": "slider",
-            "min": 0,
-            "max": 24,
-            "unit": "hours",
-            "co2_per_unit": 5  # kg CO2 per hour per year
-        }
-    ],
-    "Mobility": [
-        {
-            "id": 4,
-            "question": "What is your primary mode of transportation?",
-            "type": "multiple_choice",
-            "options": [
-                {"text": "Walk/Bicycle", "co2": 50},
-                {"text": "Public transport", "co2": 250},
-                {"text": "Private vehicle", "co2": 550}
-            ]
-        },
-        {
-            "id": 5,
-            "question": "How many kilometers do you travel by vehicle per month?",
-            "type": "slider",
-            "min": 0,
-            "max": 10000,
-            "unit": "km",
-            "co2_per_unit": 0.15  # kg CO2 per km per year
-        },
-        {
-            "id": 6,
-            "question": "How often do you travel by air?",
-            "type": "multiple_choice",
-            "options": [
-                {"text": "Never", "co2": 0},
-                {"text": "Rarely", "co2": 200},
-                {"text": "Frequently", "co2": 600},
-                {"text": "Very frequently", "co2": 1200}
-            ]
-        }
-    ],
-    "Food": [
-        {
-            "id": 7,
-            "question": "What best describes your diet?",
-            "type": "multiple_choice",
-            "options": [
-                {"text": "Vegan", "co2": 150},
-                {"text": "Vegetarian", "co2": 250},
-                {"text": "Pescatarian", "co2": 350},
-                {"text": "Omnivore", "co2": 600}
-            ]
-        },
-        {
-            "id": 8,
-            "question": "What is your monthly grocery bill (in dollars)?",
-            "type": "slider",
-            "min": 50,
-            "max": 300,
-            "unit": "$",
-            "co2_per_unit": 3  # kg CO2 per dollar per year
-        },
-        {
-            "id": 9,
-            "question": "How many waste bags do you produce per week?",
-            "type": "slider",
-            "min": 1,
-            "max": 7,
-            "unit": "bags",
-            "co2_per_unit": 25  # kg CO2 per bag per year
-        }
-    ],
-    "Consumption": [
-        {
-            "id": 10,
-            "question": "How many new clothes do you buy per month?",
-            "type": "slider",
-            "min": 0,
-            "max": 50,
-            "unit": "items",
-            "co2_per_unit": 8  # kg CO2 per item per year
-        },
-        {
-            "id": 11,
-            "question": "What size waste bag do you typically use?",
-            "type": "multiple_choice",
-            "options": [
-                {"text": "Small", "co2": 100},
-                {"text": "Medium", "co2": 200},
-                {"text": "Large", "co2": 350},
-                {"text": "Extra large", "co2": 500}
-            ]
-        },
-        {
-            "id": 12,
-            "question": "How often do you shower?",
-            "type": "multiple_choice",
-            "options": [
-                {"text": "Less frequently (every 2-3 days)", "co2": 80},
-                {"text": "Daily", "co2": 150},
-                {"text": "More frequently (1.5x/day)", "co2": 220},
-                {"text": "Twice a day", "co2": 300}
-            ]
-        }
-    ]
-}
+    logger.info("✅ Anthropic API Key loaded successfully")
 
-# Average CO2 emissions per category (kg CO2/year)
-AVERAGE_EMISSIONS = {
-    "Home": 2000,
-    "Mobility": 2500,
-    "Food": 2000,
-    "Consumption": 1500
-}
+# Claude API client: pooled connections, per-chat deadline, retries, and a circuit breaker
+# shared with the async client (asgi.py)
+upstream_breaker = CircuitBreaker()
+anthropic_client = create_client(api_key, upstream_breaker)
 
-# Product recommendations based on category
-PRODUCTS = {
-    "Home": [
-        {
-            "name": "Smart Thermostat - Nest Learning",
-            "description": "Reduces heating costs by 10-12%",
-            "price": "$90",
-            "link": "https://www.amazon.com/Google-Nest-Thermostat-Smart-Programmable/dp/B08HRPDYTP",
-            "image": "https://images.unsplash.com/photo-1558002038-1055907df827?w=400&h=300&fit=crop"
-        },
-        {
-            "name": "LED Smart Bulbs (4-Pack)",
-            "description": "75% less energy than traditional bulbs",
-            "price": "$30",
-            "link": "https://www.amazon.com/Amazon-Basics-Dimmable-2-4GHz-Equivalent/dp/B0D34WN3JG",
-            "image": "https://images.unsplash.com/photo-1567226475328-9d6baaf565cf?w=400&h=300&fit=crop"
-        },
-        {
-            "name": "Window Insulation Kit",
-            "description": "Reduces heat loss by up to 55%",
-            "price": "$15",
-            "link": "https://www.amazon.com/Duck-Brand-SFWK-Shrink-Window/dp/B09JM8DCYL",
-            "image": "https://images.unsplash.com/photo-1545259741-2ea3ebf61fa3?w=400&h=300&fit=crop"
-        }
-    ],
-    "Mobility": [
-        {
-            "name": "Electric Bike Conversion Kit",
-            "description": "Transform your bike, reduce car trips",
-            "price": "$200",
-            "link": "https://www.amazon.com/Jasion-Removable-Commuting-Brushless-Suspension/dp/B09L63HGDP",
-            "image": "https://images.unsplash.com/photo-1571333250630-f0230c320b6d?w=400&h=300&fit=crop"
-        },
-        {
-            "name": "Public Transport Annual Pass",
-            "description": "Unlimited travel, zero emissions guilt",
-            "price": "$200/year",
-            "link": "https://tcatbus.com/fare-pass-options/",
-            "image": "https://images.unsplash.com/photo-1544620347-c4fd4a3d5957?w=400&h=300&fit=crop"
-        },
-        {
-            "name": "Carbon Offset - Flight Credits",
-            "description": "Offset your annual flight emissions",
-            "price": "$8-$80",
-            "link": "https://terrapass.com/product/flight-carbon-offset/",
-            "image": "https://images.unsplash.com/photo-1436491865332-7a61a109cc05?w=400&h=300&fit=crop"
-        }
-    ],
-    "Food": [
-        {
-            "name": "Indoor Herb Garden Kit",
-            "description": "Grow your own fresh herbs year-round",
-            "price": "$50",
-            "link": "https://www.amazon.com/Indoor-Garden-Hydroponic-Growing-System/dp/B0B6BB4TVC",
-            "image": "https://images.unsplash.com/photo-1466692476868-aef1dfb1e735?w=400&h=300&fit=crop"
-        },
-        {
-            "name": "Reusable Food Storage Set",
-            "description": "Eliminate single-use plastic",
-            "price": "$13",
-            "link": "https://www.amazon.com/Bentgo-1-Compartment-Meal-Prep-Containers-Custom-Fit/dp/B08CVTY9FS",
-            "image": "https://images.unsplash.com/photo-1610557892470-55d9e80c0bce?w=400&h=300&fit=crop"
-        },
-        {
-            "name": "Compost Bin - Kitchen Counter",
-            "description": "Turn food scraps into garden gold",
-            "price": "$30",
-            "link": "https://www.amazon.com/Epica-Stainless-Compost-Gallon-Charcoal/dp/B00AMNCYNQ",
-            "image": "https://images.unsplash.com/photo-1625246333195-78d9c38ad449?w=400&h=300&fit=crop"
-        }
-    ],
-    "Consumption": [
-        {
-            "name": "Reusable Shopping Bags Set",
-            "description": "Durable, washable, replaces 1000s of plastic bags",
-            "price": "$8.25",
-            "link": "https://www.amazon.com/Ikea-Large-Shopping-Bags-SET/dp/B00KVJJGN2",
-            "image": "https://images.unsplash.com/photo-1553913861-c0fddf2619ee?w=400&h=300&fit=crop"
-        },
-        {
-            "name": "Bamboo Toothbrush Set (10-Pack)",
-            "description": "Biodegradable alternative to plastic",
-            "price": "$8",
-            "link": "https://www.amazon.com/Nuduko-Biodegradable-Toothbrushes-Toothbrush-Eco-Friendly/dp/B07V4CW682",
-            "image": "https://images.unsplash.com/photo-1607613009820-a29f7bb81c04?w=400&h=300&fit=crop"
-        },
-        {
-            "name": "Stainless Steel Water Bottle",
-            "description": "Insulated, eliminates 156 plastic bottles/year",
-            "price": "$30",
-            "link": "https://www.amazon.com/Owala-Insulated-Stainless-Steel-Push-Button-24-Ounce/dp/B085DTZQNZ",
-            "image": "https://images.unsplash.com/photo-1602143407151-7111542de6e8?w=400&h=300&fit=crop"
-        }
-    ]
-}
+# EcoCoach model settings
+CHAT_MODEL = "claude-sonnet-4-20250514"
+CHAT_MAX_TOKENS = 1024
+CHAT_HISTORY_LIMIT = 10  # messages kept per session
+
+CHAT_EMPTY_MESSAGE = "Please enter a message to chat with EcoCoach!"
+CHAT_UNAVAILABLE_MESSAGE = "EcoCoach can't reach its AI brain right now 🌧️ Please try again in a minute!"
+CHAT_OFFLINE_MESSAGE = "EcoCoach is in offline mode 🔌 It can only answer a few common questions right now."
+CHAT_FALLBACK_MESSAGE = "I'm having trouble connecting right now. Please make sure your ANTHROPIC_API_KEY is set correctly. In the meantime, feel free to explore your results and try the quiz again!"
+
+# Load the trained CatBoost model if its artifacts are present
+# (falls back to the coefficient calculator otherwise)
+inference_server = load_inference_server()
+model_generation = 0  # bumped on every hot swap
+
+# Store conversation history per session (backend chosen by CHAT_STORE)
+conversation_store = create_conversation_store(max_messages=CHAT_HISTORY_LIMIT)
+
+# Tips and products indexed once; the results prompt carries the top matches for each message
+results_catalog = ResultsCatalog(TIPS, PRODUCTS)
+
+# Deterministic answers for the common intents (explain a question, biggest impact, top product, quick win)
+local_coach = LocalCoach(catalog=results_catalog)
+
+# System prompt builder (static sections compiled once, per-session context memoized)
+prompt_builder = PromptBuilder(catalog=results_catalog)
+
+# Folds old turns into a rolling summary so system prompt + history fit CHAT_INPUT_BUDGET
+history_compactor = HistoryCompactor(max_messages=CHAT_HISTORY_LIMIT)
+
+# First-turn replies shared across sessions (pre-warmed by python -m answer_cache warm)
+answer_cache = AnswerCache()
+answer_cache.load(ANSWER_CACHE_FILE, prompt_builder, CHAT_MODEL)
+
+# Quiz questions serialized once; requests only shuffle the fragments
+question_catalog = QuestionCatalog(QUESTIONS)
+
+# index.html rendered once (critical CSS inlined); requests only splice in a question sample
+index_page = IndexPage(app)
+
+# Built /api/calculate responses keyed by canonicalized answers
+calculate_cache = ResponseCache(max_entries=int(os.environ.get('CALCULATE_CACHE_SIZE', 4096)))
 
-# Tips for reducing emissions
-TIPS = {
-    "Home": [
-        "Switch to LED bulbs throughout your home (saves ~100 kg CO2/year)",
-        "Install a smart thermostat to optimize heating/cooling",
-        "Improve insulation in walls, attic, and around windows",
-        "Use cold water for laundry when possible",
-        "Unplug devices when not in use to eliminate phantom power drain",
-        "Consider switching to renewable energy providers"
-    ],
-    "Mobility": [
-        "Walk or bike for trips under 3 km",
-        "Use public transportation whenever possible",
-        "Carpool with colleagues or neighbors",
-        "Combine errands into one trip to reduce total distance",
-        "Consider an electric or hybrid vehicle for your next car",
-        "Avoid unnecessary flights; choose trains for shorter distances"
-    ],
-    "Food": [
-        "Reduce red meat consumption to once per week or less",
-        "Buy seasonal and locally-sourced produce",
-        "Plan meals to minimize food waste",
-        "Start composting organic waste",
-        "Choose products with minimal packaging",
-        "Grow your own herbs or vegetables if possible"
-    ],
-    "Consumption": [
-        "Buy second-hand clothes and electronics when possible",
-        "Repair items instead of replacing them",
-        "Choose quality products that last longer",
-        "Recycle properly and learn your local recycling guidelines",
-        "Avoid single-use plastics; carry reusable alternatives",
-        "Support companies with strong sustainability practices"
+def swap_inference_server(server):
+    """Serve a newly loaded model: swap it in, drop cached totals, retire the old one"""
+    global inference_server, model_generation
+    previous, inference_server = inference_server, server
+    model_generation += 1
+    calculate_cache.clear()
+    if previous is not None:
+        previous.close()
+
+# Hot-swap model.bundle whenever train_model.py writes a new one (MODEL_RELOAD_INTERVAL=0 disables)
+model_watcher = BundleWatcher(MODEL_BUNDLE, swap_inference_server).start() if MODEL_RELOAD_INTERVAL > 0 else None
+
+@app.before_request
+def begin_request_log():
+    """Give the request an id (or reuse X-Request-ID) and a route for log records"""
+    route = request.url_rule.rule if request.url_rule else request.path
+    g.log_request = start_request(route, request.headers.get('X-Request-ID'))
+
+@app.after_request
+def end_request_log(response):
+    """Log method, status and duration, and echo the request id"""
+    started = g.pop('log_request', None)
+    if started is not None:
+        response.headers['X-Request-ID'] = started[0]
+        end_request(logger, started, request.method, response.status_code)
+    return response
+
+@app.before_request
+def begin_request_metrics():
+    """Count the request as in flight on its route"""
+    route = request.url_rule.rule if request.url_rule else metrics.UNMATCHED_ROUTE
+    g.metrics_request = metrics.request_started(route)
+
+@app.after_request
+def end_request_metrics(response):
+    """Record status and latency"""
+    started = g.pop('metrics_request', None)
+    if started is not None:
+        metrics.request_finished(started, request.method, response.status_code)
+    return response
+
+@app.teardown_request
+def abort_request_metrics(exc):
+    """Count unhandled exceptions, and finish requests after_request never saw"""
+    started = g.pop('metrics_request', None)
+    if exc is not None:
+        metrics.record_error(exc, started[0] if started else None)
+    if started is not None:
+        metrics.request_finished(started, request.method, 500)
+
+@app.before_request
+def begin_request_profile():
+    """Spans and stack sampling for routes in PROFILE_ROUTES or with a valid X-Profile header"""
+    route = request.url_rule.rule if request.url_rule else metrics.UNMATCHED_ROUTE
+    g.profile = profiling.begin(route, request.headers.get(profiling.PROFILE_HEADER))
+
+@app.after_request
+def add_server_timing(response):
+    """Send a profiled request's per-phase timings"""
+    state = g.get('profile')
+    if state is not None:
+        response.headers['Server-Timing'] = profiling.timing_header(state)
+    return response
+
+@app.teardown_request
+def end_request_profile(exc):
+    state = g.pop('profile', None)
+    if state is not None:
+        profiling.end(state)
+
+def collect_app_metrics():
+    """Scrape-time values: chat sessions, cache hit ratio, local coach, circuit breaker, served model"""
+    store = conversation_store.stats()
+    cache = calculate_cache.stats()
+    answers = answer_cache.stats()
+    coach = local_coach.stats()
+    breaker = upstream_breaker.stats()
+    server = inference_server
+    return [
+        ('ecotrace_chat_sessions', 'gauge', 'Live conversation_history sessions', [({}, store['sessions'])]),
+        ('ecotrace_chat_history_bytes', 'gauge', 'Total message bytes across live sessions',
+         [({}, store['bytes'])]),
+        ('ecotrace_cache_entries', 'gauge', 'Cached responses',
+         [({'cache': 'calculate'}, cache['entries']), ({'cache': 'answer'}, answers['entries']),
+          ({'cache': 'answer_warm'}, answers['warm_entries'])]),
+        ('ecotrace_cache_lookups_total', 'counter', 'Response cache lookups by result',
+         [({'cache': 'calculate', 'result': 'hit'}, cache['hits']),
+          ({'cache': 'calculate', 'result': 'miss'}, cache['misses']),
+          ({'cache': 'answer', 'result': 'hit'}, answers['hits']),
+          ({'cache': 'answer', 'result': 'miss'}, answers['misses']),
+          ({'cache': 'answer', 'result': 'bypass'}, answers['bypassed'])]),
+        ('ecotrace_cache_hit_ratio', 'gauge', 'Response cache hits / lookups',
+         [({'cache': 'calculate'}, cache['hit_ratio']), ({'cache': 'answer'}, answers['hit_ratio'])]),
+        ('ecotrace_answer_cache_near_hits_total', 'counter', 'Answer cache hits on a similar (not identical) message',
+         [({}, answers['near_hits'])]),
+        ('ecotrace_answer_cache_saved_seconds_total', 'counter',
+         'Claude latency saved by answer cache hits (generation time of the served replies)',
+         [({}, answers['saved_seconds'])]),
+        ('ecotrace_local_coach_answers_total', 'counter', 'Chats answered by the local coach, by intent',
+         [({'intent': intent}, count) for intent, count in sorted(coach['answered'].items())]),
+        ('ecotrace_local_coach_declined_total', 'counter', 'Messages the local coach had no confident answer for',
+         [({}, coach['declined'])]),
+        ('ecotrace_claude_circuit_state', 'gauge', 'Claude API circuit breaker (0 closed, 1 half-open, 2 open)',
+         [({}, breaker['state_value'])]),
+        ('ecotrace_claude_circuit_opened_total', 'counter', 'Times the Claude API circuit opened',
+         [({}, breaker['opened'])]),
+        ('ecotrace_claude_circuit_rejected_total', 'counter', 'Chats answered locally while the circuit was open',
+         [({}, breaker['rejected'])]),
+        ('ecotrace_model_info', 'gauge', 'Engine and version serving /api/calculate totals',
+         [({'engine': 'catboost' if server else 'coefficients',
+            'version': (server.version or 'unknown') if server else 'none'}, 1)]),
+        ('ecotrace_model_generation', 'counter', 'Model hot swaps since startup', [({}, model_generation)]),
     ]
-}
+
+metrics.registry.add_collector(collect_app_metrics)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text-format metrics for this worker process"""
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    """Quiz page with a freshly sampled question set inlined (same sample as /api/questions)"""
+    payload = question_catalog.payload(per_category=3, rng=request_rng())
+    body, encoding = compress(index_page.render(payload), request.accept_encodings)
+    response = Response(body, mimetype='text/html')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
 
 @app.route('/favicon.ico')
 def favicon():
     return '', 204  # No content response
 
+def request_rng():
+    """Seeded random.Random for ?seed=N (reproducible sampling), else None"""
+    seed = request.args.get('seed', type=int)
+    return random.Random(seed) if seed is not None else None
+
 # New bubbly UI API routes
 @app.route('/api/questions', methods=['GET'])
 def api_get_questions():
     """Return randomized quiz questions for bubbly UI"""
-    all_questions = []
-    
-    # Get 3 random questions from each category
-    for category in QUESTIONS:
-        questions = random.sample(QUESTIONS[category], min(3, len(QUESTIONS[category])))
-        for q in questions:
-            q['category'] = category
-        all_questions.extend(questions)
-    
-    # Randomize the order
-    random.shuffle(all_questions)
-    
-    return jsonify(all_questions)
+    # Get 3 random questions from each category, in random order
+    payload = question_catalog.payload(per_category=3, rng=request_rng())
+    return Response(payload, mimetype='application/json')
+
+def json_response(cached, cache_status):
+    """Send a cached JSON body with its ETag, or a 304 if the client has it"""
+    if request.if_none_match.contains(cached.etag):
+        response = Response(status=304)
+    else:
+        response = Response(cached.body, mimetype='application/json')
+    response.set_etag(cached.etag)
+    response.headers['X-Cache'] = cache_status
+    return response
 
 @app.route('/api/calculate', methods=['POST'])
 def api_calculate():
     """
     Calculate CO2 emissions using ML-informed calculator
     Based on CatBoost model trained on 10,000 real data points (R² = 0.9907)
+    
+    Responses are cached by canonicalized answers, so repeat submissions
+    skip scoring and serialization (X-Cache: HIT) and honour If-None-Match.
     """
-    data = request.json
+    with span('parse'):
+        data = request.json
     answers_dict = data.get('answers', {})
     
-    # Convert dict to list format that ml_calculator expects
-    answers_list = list(answers_dict.values())
+    with span('cache'):
+        cache_key = canonicalize_answers(answers_dict)
+        cached = calculate_cache.get(cache_key) if cache_key is not None else None
+    if cached is not None:
+        logger.debug("⚡ /api/calculate cache hit", extra=calculate_cache.stats())
+        return json_response(cached, 'HIT')
     
-    # Use ML-informed calculator
-    ml_results = calculate_emission(answers_list)
+    generation = model_generation
+    with span('score'):
+        response, engine = calculate_response(answers_dict)
+    with span('serialize'):
+        body = app.json.response(response).get_data()  # same bytes as jsonify
+    
+    # Don't cache a coefficient fallback while the trained model is loaded,
+    # or a result from a model that was swapped out mid-request
+    if (cache_key is not None and generation == model_generation
+            and (inference_server is None or engine == 'catboost')):
+        cached = calculate_cache.put(cache_key, body)
+    else:
+        cached = CachedResponse(body, make_etag(body))
+    return json_response(cached, 'MISS')
+
+def calculate_response(answers_dict):
+    """Score one answer set and build the /api/calculate response (and engine used)"""
+    # Use ML-informed calculator (answers are keyed by question id)
+    ml_results = calculate_emission(answers_dict)
     comparison_data = get_comparison_data()
     
     # Get emissions by category from ML calculator
     category_emissions = ml_results['emissions']
     total_emission = ml_results['total']
+    engine = 'coefficients'
+    
+    # Use the trained model for the total when it's loaded
+    server = inference_server
+    if server is not None:
+        try:
+            total_emission = server.predict(answers_dict)
+            engine = 'catboost'
+        except Exception as e:
+            logger.warning("⚠️  CatBoost prediction failed, using coefficient calculator: %s", e)
+            metrics.record_error(e)
     
     # Dataset averages (from 10,000 data points)
     # These represent typical emissions for each category
@@ -391,29 +356,48 @@ def api_calculate():
         "ml_info": {
             "model_accuracy": ml_results['model_accuracy'],
             "dataset_mean": comparison_data['dataset_mean'],
-            "features_used": len(ml_results['features_used'])
+            "features_used": len(ml_results['features_used']),
+            "engine": engine
         }
     }
     
-    print(f"✅ ML Calculator: Total CO2 = {total_emission} kg/year")
-    print(f"   Dataset mean: {comparison_data['dataset_mean']} kg/year")
-    print(f"   Features used: {ml_results['features_used']}")
+    logger.info("✅ ML Calculator (%s): Total CO2 = %s kg/year", engine, total_emission,
+                extra={'engine': engine, 'total_co2': total_emission,
+                       'features_used': len(ml_results['features_used'])})
+    logger.debug("Features used: %s", ml_results['features_used'])
+    
+    return response, engine
+
+@app.route('/api/calculate/batch', methods=['POST'])
+def api_calculate_batch():
+    """
+    Score many stored answer sets in one call
+    Expects {"answer_sets": [answers, ...]} where each entry has the same shape
+    as the /api/calculate "answers" payload. Returns columnar results.
+    """
+    data = request.get_json(silent=True) or {}
+    answer_sets = data.get('answer_sets')
+    
+    if not isinstance(answer_sets, list):
+        return jsonify({"error": "answer_sets must be a list of answer sets"}), 400
     
-    return jsonify(response)
+    try:
+        batch = calculate_emissions_batch(answer_sets)
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid answer set: {e}"}), 400
+    
+    return jsonify({
+        "count": batch['count'],
+        "categories": {category: values.tolist() for category, values in batch['categories'].items()},
+        "total": batch['total'].tolist()
+    })
 
 # Old API routes (kept for compatibility)
 @app.route('/get-questions', methods=['GET'])
 def get_questions():
     """Return randomized questions"""
-    all_questions = []
-    for category, questions in QUESTIONS.items():
-        for q in questions:
-            q_copy = q.copy()
-            q_copy['category'] = category
-            all_questions.append(q_copy)
-    
-    random.shuffle(all_questions)
-    return jsonify(all_questions)
+    payload = question_catalog.payload(rng=request_rng())
+    return Response(payload, mimetype='application/json')
 
 @app.route('/calculate-results', methods=['POST'])
 def calculate_results():
@@ -428,8 +412,8 @@ def calculate_results():
         if not answers:
             return jsonify({"error": "No answers provided"}), 400
         
-        print(f"Received {len(answers)} answers")
-        print(f"Answers: {answers}")
+        logger.info("Received %d answers", len(answers))
+        logger.debug("Answers: %s", answers)
         
         # Calculate emissions by category
         category_emissions = {
@@ -442,12 +426,12 @@ def calculate_results():
         for answer in answers:
             # Skip None/null entries
             if answer is None:
-                print("Warning: Skipping None answer")
+                logger.warning("Skipping None answer")
                 continue
             
             # Ensure answer is a dictionary
             if not isinstance(answer, dict):
-                print(f"Warning: Skipping non-dict answer: {answer}")
+                logger.warning("Skipping non-dict answer: %s", answer)
                 continue
                 
             category = answer.get('category')
@@ -456,9 +440,9 @@ def calculate_results():
             if category in category_emissions:
                 category_emissions[category] += co2
             else:
-                print(f"Warning: Unknown category '{category}'")
+                logger.warning("Unknown category '%s'", category)
         
-        print(f"Category emissions: {category_emissions}")
+        logger.debug("Category emissions: %s", category_emissions)
         
         # Convert monthly/weekly to annual
         for category in category_emissions:
@@ -498,7 +482,7 @@ def calculate_results():
         total_emissions = sum(category_emissions.values())
         total_average = sum(AVERAGE_EMISSIONS.values())
         
-        print(f"Returning results: total_emissions={total_emissions}")
+        logger.info("Returning results: total_emissions=%s", total_emissions)
         
         return jsonify({
             "results": results,
@@ -508,16 +492,188 @@ def calculate_results():
         })
     
     except Exception as e:
-        print(f"Error calculating results: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error calculating results: %s", e)
+        metrics.record_error(e)
         return jsonify({"error": str(e)}), 500
 
+def chat_prompt(data, user_message):
+    """
+    Build the system prompt for a chat request, shortened if it crowds out the history
+    
+    Returns:
+        tuple: (system_prompt, full-detail prompt tokens, detail level used)
+    """
+    with span('prompt'):
+        prompt_args = (
+            data.get('session_id', 'default'),
+            data.get('screen_context', 'unknown'),
+            data.get('current_question', None),
+            data.get('results', None),
+            data.get('user_answers', None)
+        )
+        system_prompt = prompt_builder.build(*prompt_args, message=user_message)
+        full_prompt_tokens = estimate_tokens(system_prompt.text)
+        # Shorten the results context (tips only, then totals only) if it crowds out the history
+        detail = FULL_DETAIL
+        while detail > 0 and not history_compactor.system_fits(system_prompt):
+            detail -= 1
+            system_prompt = prompt_builder.build(*prompt_args, detail=detail, message=user_message)
+    return system_prompt, full_prompt_tokens, detail
+
+def chat_history(system_prompt, session_id, user_message, full_prompt_tokens=None):
+    """
+    Load a session's history, add the user message and fold older turns into the summary
+    
+    Returns:
+        tuple: (cleaned history before compaction, Compaction)
+    """
+    with span('history'):
+        history = clean_history(conversation_store.load(session_id) + [{
+            "role": "user",
+            "content": user_message
+        }])
+        return history, history_compactor.compact(system_prompt, history, full_prompt_tokens)
+
+def prepare_chat(data):
+    """
+    Build the system prompt and message list for a chat request
+    Shared by the Flask chat routes and the async (ASGI) chat handlers.
+    
+    Returns:
+        tuple: (session_id, system_prompt, messages, answer_key) or None if the
+            message is empty. messages is the history to store (its first entry
+            may be the rolling summary; send api_messages(messages) to Claude).
+            answer_key is None when the answer cache can't serve it
+    """
+    user_message = str(data.get('message', '')).strip()
+    session_id = data.get('session_id', 'default')
+    if not user_message:
+        return None
+    
+    system_prompt, full_prompt_tokens, detail = chat_prompt(data, user_message)
+    history, compaction = chat_history(system_prompt, session_id, user_message, full_prompt_tokens)
+    messages = compaction.messages
+    if compaction.summary:
+        system_prompt = SystemPrompt(system_prompt.static, system_prompt.dynamic + compaction.summary,
+                                     system_prompt.build_ms)
+    
+    metrics.record_prompt_tokens(compaction.tokens, compaction.uncompacted_tokens)
+    logger.info("Chat prompt ready", extra={
+        'prompt_chars': len(system_prompt),
+        'prompt_prefix_chars': len(system_prompt.static),
+        'prompt_build_ms': round(system_prompt.build_ms, 3),
+        'prompt_detail': detail,
+        'history_messages': len(messages),
+        'folded_messages': compaction.folded,
+        'input_tokens_est': compaction.tokens,
+        'tokens_saved_est': compaction.uncompacted_tokens - compaction.tokens,
+    })
+    
+    return session_id, system_prompt, messages, answer_cache.key(data, history[:-1])
+
+def cached_answer(answer_key, session_id, messages):
+    """
+    Reply from the answer cache, saved to the history like a Claude reply
+    
+    Returns:
+        str or None: The reply, or None when answer_key is None or missed
+    """
+    if answer_key is None:
+        return None
+    with span('answer_cache'):
+        cached = answer_cache.get(answer_key)
+    if cached is None:
+        return None
+    reply, similarity, saved_seconds = cached
+    logger.info("💾 Answer cache hit", extra={
+        'similarity': round(similarity, 3),
+        'saved_ms': round(saved_seconds * 1000, 1),
+    })
+    messages.append({"role": "assistant", "content": reply})
+    conversation_store.save(session_id, messages)
+    return reply
+
+def remember_answer(answer_key, reply, stop_reason, seconds):
+    """Cache a complete first-turn Claude reply (truncated replies aren't reused)"""
+    if answer_key is not None and stop_reason == 'end_turn':
+        answer_cache.put(answer_key, reply, seconds)
+
+def local_answer(data):
+    """
+    Reply from the local coach, saved to the history like a Claude reply
+    Runs before prepare_chat; the prompt is only built for an answer, to fold
+    older turns into the rolling summary as a Claude turn would. With
+    LOCAL_COACH=first it answers intents at LOCAL_COACH_CONFIDENCE or more;
+    without an API key, any recognised intent.
+    
+    Returns:
+        str or None: The reply, or None when Claude should answer
+    """
+    user_message = str(data.get('message', '')).strip()
+    if not user_message or LOCAL_COACH == 'off' or (api_key and LOCAL_COACH != 'first'):
+        return None
+    with span('local_coach'):
+        answer = local_coach.answer(data, LOCAL_COACH_CONFIDENCE if api_key else 0)
+    if answer is None:
+        return None
+    logger.info("🧭 Local coach answer", extra={
+        'intent': answer.intent,
+        'confidence': round(answer.confidence, 2),
+    })
+    session_id = data.get('session_id', 'default')
+    system_prompt, full_prompt_tokens, _ = chat_prompt(data, user_message)
+    _, compaction = chat_history(system_prompt, session_id, user_message, full_prompt_tokens)
+    compaction.messages.append({"role": "assistant", "content": answer.reply})
+    with span('save'):
+        conversation_store.save(session_id, compaction.messages)
+    return answer.reply
+
+def fallback_reply(data, notice=CHAT_UNAVAILABLE_MESSAGE):
+    """
+    Local reply while Claude is unavailable or busy: the local coach's answer
+    for any recognised intent, else the catalog tip that best fits the message and results
+    """
+    answer = local_coach.answer(data, 0) if LOCAL_COACH != 'off' else None
+    if answer is not None:
+        return f"{notice}\n\n{answer.reply}"
+    tips = results_catalog.tips.search(str(data.get('message', '')), category_weights(data.get('results')), 1)
+    if not tips:
+        return notice
+    category, tip = tips[0]
+    return f"{notice}\n\n💡 Meanwhile, a {category} tip: {tip}"
+
+def offline_payload(data):
+    """Reply without an API key: a local answer or tip instead of a Claude call that can't authenticate"""
+    return {"success": False, "message": fallback_reply(data, CHAT_OFFLINE_MESSAGE), "fallback": True}
+
+def chat_failure(error, data, call, start):
+    """
+    Log and count a failed Claude call and build the reply for it
+    Shared by the Flask chat routes and the async (ASGI) chat handlers.
+    
+    Returns:
+        tuple: (status, payload, headers). Unreachable or overloaded upstream
+            (circuit open, retries used up) is a 503 with a local fallback;
+            anything else (bad request, bad API key) a 500 as before
+    """
+    metrics.record_error(error)
+    if isinstance(error, CircuitOpen):
+        logger.warning("⚡ Claude API circuit open, serving the local fallback")
+        return 503, {"success": False, "message": fallback_reply(data), "fallback": True}, \
+            {"Retry-After": str(max(1, round(error.retry_after)))}
+    metrics.record_upstream(call, time.perf_counter() - start, outcome='error')
+    if unavailable(error):
+        logger.warning("Claude API unavailable: %s", error)
+        return 503, {"success": False, "message": fallback_reply(data), "fallback": True, "error": str(error)}, {}
+    logger.exception("Error calling Claude API: %s", error)
+    return 500, {"success": False, "message": CHAT_FALLBACK_MESSAGE, "error": str(error)}, {}
+
 @app.route('/chat', methods=['POST'])
 def chat():
     """Handle chatbot interactions using Claude API"""
     try:
-        data = request.json
+        with span('parse'):
+            data = request.json
         user_message = data.get('message', '').strip()
         user_results = data.get('results', None)
         session_id = data.get('session_id', 'default')
@@ -527,255 +683,184 @@ def chat():
         
         # Validate user message is not empty
         if not user_message:
-            print("ERROR: Empty user message received")
+            logger.warning("Empty user message received")
             return jsonify({
                 "success": False,
-                "message": "Please enter a message to chat with EcoCoach!"
+                "message": CHAT_EMPTY_MESSAGE
             }), 400
             
     except Exception as e:
-        print(f"Error parsing request: {e}")
+        logger.warning("Error parsing request: %s", e)
+        metrics.record_error(e)
         return jsonify({
             "success": False,
             "message": "Sorry, there was an error processing your request. Please try again!"
         }), 400
     
-    # Debug logging
-    print(f"\n=== CHAT REQUEST ===")
-    print(f"Screen Context: '{screen_context}'")
-    print(f"Current Question Type: {type(current_question)}")
-    print(f"Current Question Value: {current_question}")
-    print(f"Current Question Bool: {bool(current_question)}")
-    if current_question:
-        print(f"Question Details: number={current_question.get('number')}, category={current_question.get('category')}")
-    print(f"User Message: {user_message}")
-    print(f"Full Request Data: {data}")
-    print(f"===================\n")
-    
-    # Initialize conversation history for this session if not exists
-    if session_id not in conversation_history:
-        conversation_history[session_id] = []
-    
-    # Build system prompt based on context - Make it engaging and concise!
-    system_prompt = """You are EcoCoach 🌱 - a witty, enthusiastic sustainability expert who makes eco-living feel exciting, not overwhelming!
-
-YOUR PERSONALITY:
-- Conversational & fun (think: helpful friend, not boring textbook)
-- Direct and punchy (2-3 sentences for simple q's, max 5 for complex)
-- Use vivid comparisons ("That's like driving to the moon!" or "Saves enough energy to charge your phone 500 times!")
-- Encouraging but honest - celebrate wins, gently nudge on big impacts
-- Strategic emoji use for emphasis (but don't overdo it)
-
-RESPONSE RULES:
-1. **BE CONCISE** - Get to the point fast. No fluff.
-2. **BE SPECIFIC** - Real numbers, real actions, real impact
-3. **BE MEMORABLE** - Use analogies people remember
-4. **BE ACTIONABLE** - Always include a "next step" when relevant
-5. **BE CONTEXTUAL** - Reference what they're looking at RIGHT NOW
-
-CONVERSATION STYLE:
-❌ "Your emissions are higher than average. You should consider making changes."
-✅ "Whoa! You're 500kg above average - that's like an extra round-trip flight to NYC each year. Want to tackle the biggest win first?"
-
-❌ "Composting reduces methane emissions from landfills."
-✅ "Compost turns trash into treasure! Plus it saves ~150kg CO₂/year - that's like planting 7 trees. 🌳"
-"""
-
-    # Add screen-specific context
-    if screen_context == 'start':
-        system_prompt += "\n\n📍 USER IS ON: Landing page (hasn't started quiz yet)\nHelp them understand what the quiz does or answer sustainability basics."
-    
-    elif screen_context == 'quiz':
-        # Check if current_question exists and has data
-        has_question = current_question and isinstance(current_question, dict) and current_question.get('question')
-        
-        if has_question:
-            q_num = current_question.get('number', '?')
-            q_total = current_question.get('total', '?')
-            q_category = current_question.get('category', 'Unknown')
-            q_text = current_question.get('question', 'Unknown')
-            q_options = current_question.get('options', [])
-            
-            system_prompt += f"\n\n🚨 THE USER IS LOOKING AT THIS EXACT QUESTION 🚨"
-            system_prompt += f"\n\n📍 QUESTION {q_num} of {q_total}"
-            system_prompt += f"\n📂 Category: {q_category}"
-            system_prompt += f"\n❓ Question: \"{q_text}\""
-            system_prompt += f"\n\n📋 THEIR 4 OPTIONS:"
-            for i, opt in enumerate(q_options, 1):
-                system_prompt += f"\n   {i}. {opt}"
-            
-            system_prompt += "\n\n🎯 ABSOLUTE RULES:"
-            system_prompt += f"\n1. ONLY reference Question {q_num} - DO NOT make up other question numbers"
-            system_prompt += f"\n2. The question is about: \"{q_text}\" - DO NOT change the topic"
-            system_prompt += f"\n3. ONLY mention these {len(q_options)} options listed above"
-            system_prompt += "\n4. DO NOT ask which question they're on - you already know!"
-            system_prompt += "\n5. Keep it concise: 2-3 sentences max, then list options briefly"
-            system_prompt += "\n6. NO bold (**), NO headings - just plain text with line breaks and bullet points"
-            
-            system_prompt += "\n\n✅ GOOD Response Format:"
-            system_prompt += f"\n\"Perfect! Question {q_num} is about {q_category.lower()}. Here's the impact:\n\n"
-            system_prompt += "\n• Option 1: [1 sentence impact]\n"
-            system_prompt += "\n• Option 2: [1 sentence impact]\n"
-            system_prompt += "\n\nPick what matches your habits!\""
-        else:
-            system_prompt += f"\n\n📍 USER IS ON: Quiz screen BUT question context is missing or invalid"
-            system_prompt += f"\nDEBUG: current_question type = {type(current_question)}, value = {current_question}"
-            system_prompt += "\n\n⚠️ IMPORTANT: Include this debug info in your response:"
-            system_prompt += f"\n'DEBUG: I received current_question as: {current_question} (type: {type(current_question)})'"
-            system_prompt += "\nThen politely ask them to tell you which question they're looking at."
-    
-    elif screen_context == 'results':
-        system_prompt += "\n\n📍 USER IS ON: Results page (quiz is COMPLETE)"
-        system_prompt += "\nThey're viewing their full carbon footprint breakdown with all categories."
-        system_prompt += "\n\n🎯 RULES FOR RESULTS PAGE:"
-        system_prompt += "\n1. DO NOT reference quiz questions - the quiz is finished"
-        system_prompt += "\n2. Focus on their RESULTS and actionable next steps"
-        system_prompt += "\n3. Help them understand their emissions by category"
-        system_prompt += "\n4. Suggest which category to tackle first (highest difference from average)"
-        system_prompt += "\n5. Reference SPECIFIC tips and products shown on their results"
-        system_prompt += "\n6. When asked for advice, mention actual product names and prices from their recommendations"
-        system_prompt += "\n7. When asked WHY their emissions are high, reference their SPECIFIC QUIZ ANSWERS"
-        system_prompt += "\n8. Be encouraging about the changes they can make"
-        system_prompt += "\n\n💡 EXAMPLES:"
-        system_prompt += "\n• 'Try the Smart Thermostat ($249) - it could cut your Home emissions by 10-12%!'"
-        system_prompt += "\n• 'I see you have high Mobility emissions. The tips recommend carpooling or an electric vehicle.'"
-        system_prompt += "\n• 'Your high Mobility score is because you answered \"Gasoline/Diesel car\" for transportation (600 kg).'"
-        system_prompt += "\n• 'Your Food category is great! The compost bin ($75) could make it even better.'"
-
-    # Add user results context if available
-    if user_results:
-        results_context = f"\n\n📊 USER'S CARBON FOOTPRINT:\n"
-        results_context += f"Total: {user_results.get('total_emissions', 'N/A')} kg CO₂/year (Avg: {user_results.get('total_average', 'N/A')})\n"
-        diff = user_results.get('total_difference', 0)
-        if diff > 0:
-            results_context += f"⚠️ {diff} kg ABOVE average\n"
-        elif diff < 0:
-            results_context += f"🎉 {abs(diff)} kg BELOW average!\n"
-        
-        if 'results' in user_results:
-            results_context += "\nCategory Breakdown (sorted by priority):\n"
-            for idx, result in enumerate(user_results['results'], 1):
-                emoji = "🔴" if result['difference'] > 0 else "🟢"
-                results_context += f"\n{idx}. {emoji} {result['category']}: {result['emissions']} kg (avg: {result['average']}, diff: {result['difference']:+d} kg)"
-                
-                # Add tips for this category
-                if 'tips' in result and result['tips']:
-                    results_context += f"\n   Recommended Actions for {result['category']}:"
-                    for tip_idx, tip in enumerate(result['tips'], 1):
-                        results_context += f"\n   • {tip}"
-                
-                # Add products for this category
-                if 'products' in result and result['products']:
-                    results_context += f"\n   Recommended Products for {result['category']}:"
-                    for prod in result['products']:
-                        results_context += f"\n   • {prod['name']} - {prod['price']}: {prod['description']}"
-                
-                results_context += "\n"
-        
-        results_context += "\n💡 You can reference specific tips or products when answering user questions!"
-        system_prompt += results_context
+    # Debug dumps (user data) - only with app=DEBUG
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Screen Context: '%s'", screen_context)
+        logger.debug("Current Question: %s (%s)", current_question, type(current_question))
+        logger.debug("User Message: %s", user_message)
+        logger.debug("Full Request Data: %s", data)
     
-    # Add user's quiz answers if available
-    if user_answers and isinstance(user_answers, list):
-        try:
-            answers_context = f"\n\n📝 USER'S QUIZ ANSWERS:\n"
-            answers_context += "Here are the specific choices they made:\n"
-            
-            # Group answers by category
-            answers_by_category = {}
-            for answer in user_answers:
-                category = answer.get('category', 'Unknown')
-                if category not in answers_by_category:
-                    answers_by_category[category] = []
-                answers_by_category[category].append(answer)
-            
-            # Display answers by category
-            for category in ['Home', 'Mobility', 'Food', 'Consumption']:
-                if category in answers_by_category:
-                    answers_context += f"\n{category}:"
-                    for answer in answers_by_category[category]:
-                        q_num = answer.get('questionNumber', '?')
-                        q_text = answer.get('questionText', 'Unknown question')
-                        selected = answer.get('selectedOption', 'Unknown option')
-                        co2 = answer.get('co2', 0)
-                        
-                        answers_context += f"\n  • Question {q_num}: \"{q_text}\""
-                        answers_context += f"\n    Answered: \"{selected}\" (adds {co2} kg CO₂)"
-            
-            answers_context += "\n\n💡 Use this to explain EXACTLY which choices contributed to their emissions!"
-            answers_context += "\n   Example: 'Your high Mobility score comes from Question 5 where you chose \"Gasoline/Diesel car\"'"
-            answers_context += "\n   You can reference questions by their number (Question 1, Question 2, etc.)"
-            system_prompt += answers_context
-        except Exception as e:
-            print(f"Error processing user answers: {e}")
-            # Continue without answers context if there's an error
+    local = local_answer(data)
+    if local is not None:
+        return jsonify({
+            "success": True,
+            "message": local,
+            "session_id": session_id
+        }), 200
     
-    # Add user message to history
-    conversation_history[session_id].append({
-        "role": "user",
-        "content": user_message
-    })
+    session_id, system_prompt, cleaned_history, answer_key = prepare_chat(data)
     
-    # Debug: Log system prompt length
-    print(f"System prompt length: {len(system_prompt)} characters")
-    print(f"Conversation history length: {len(conversation_history[session_id])} messages")
-    
-    # Validate that messages alternate properly and clean up bad messages
-    cleaned_history = []
-    for i, msg in enumerate(conversation_history[session_id]):
-        if 'role' not in msg or 'content' not in msg:
-            print(f"WARNING: Message {i} missing required fields: {msg}")
-            continue
-        if not msg.get('content', '').strip():
-            print(f"WARNING: Message {i} has empty content, skipping")
-            continue
-        # Ensure content is a string
-        if not isinstance(msg['content'], str):
-            print(f"WARNING: Message {i} content is not a string: {type(msg['content'])}")
-            msg['content'] = str(msg['content'])
-        cleaned_history.append(msg)
-    
-    conversation_history[session_id] = cleaned_history
-    print(f"Cleaned history: {len(cleaned_history)} messages")
+    cached = cached_answer(answer_key, session_id, cleaned_history)
+    if cached is not None:
+        return jsonify({
+            "success": True,
+            "message": cached,
+            "session_id": session_id
+        }), 200
+    
+    if not api_key:
+        # Keep the user's message in the history, as a failed Claude call does
+        conversation_store.save(session_id, cleaned_history)
+        return jsonify(offline_payload(data)), 503
     
     try:
         # Call Claude API
-        response = anthropic_client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=1024,
-            system=system_prompt,
-            messages=conversation_history[session_id]
-        )
+        start = time.perf_counter()
+        with span('claude'):
+            response = anthropic_client.messages.create(
+                model=CHAT_MODEL,
+                max_tokens=CHAT_MAX_TOKENS,
+                system=system_prompt.blocks(),
+                messages=api_messages(cleaned_history)
+            )
         
         # Extract assistant's response
         assistant_message = response.content[0].text
         
-        # Add assistant response to history
-        conversation_history[session_id].append({
+        # Log latency and how much of the prompt came from the provider's cache
+        usage = getattr(response, 'usage', None)
+        elapsed = time.perf_counter() - start
+        metrics.record_upstream('create', elapsed, usage)
+        remember_answer(answer_key, assistant_message, getattr(response, 'stop_reason', None), elapsed)
+        logger.info("Claude reply", extra={
+            'claude_ms': round(elapsed * 1000, 1),
+            'input_tokens': getattr(usage, 'input_tokens', None),
+            'output_tokens': getattr(usage, 'output_tokens', None),
+            'cache_read_tokens': getattr(usage, 'cache_read_input_tokens', 0) or 0,
+            'cache_write_tokens': getattr(usage, 'cache_creation_input_tokens', 0) or 0,
+        })
+        
+        # Add assistant response to history (the store keeps the last 10 messages)
+        cleaned_history.append({
             "role": "assistant",
             "content": assistant_message
         })
+        with span('save'):
+            conversation_store.save(session_id, cleaned_history)
         
-        # Keep only last 10 messages to prevent context overflow
-        if len(conversation_history[session_id]) > 10:
-            conversation_history[session_id] = conversation_history[session_id][-10:]
-        
-        return jsonify({
-            "success": True,
-            "message": assistant_message,
-            "session_id": session_id
-        }), 200
+        with span('serialize'):
+            return jsonify({
+                "success": True,
+                "message": assistant_message,
+                "session_id": session_id
+            }), 200
     
     except Exception as e:
-        print(f"Error calling Claude API: {e}")
-        import traceback
-        traceback.print_exc()
+        status, payload, headers = chat_failure(e, data, 'create', start)
+        # Keep the user's message in the history, as before
+        conversation_store.save(session_id, cleaned_history)
         # Fallback response if API fails
+        return jsonify(payload), status, headers
+
+def sse_event(event, payload):
+    """Format one Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no"
+}
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Stream EcoCoach's reply as Server-Sent Events
+    Emits `token` events as text arrives, then `done` (or `error`). The
+    exchange is only added to the conversation history once the reply
+    completes; a failed or abandoned stream leaves the history untouched.
+    """
+    data = request.get_json(silent=True) or {}
+    local = local_answer(data)
+    if local is not None:
+        body = sse_event('token', {"text": local}) + \
+            sse_event('done', {"session_id": data.get('session_id', 'default')})
+        return Response(body, mimetype='text/event-stream', headers=SSE_HEADERS)
+    prepared = prepare_chat(data)
+    if prepared is None:
         return jsonify({
             "success": False,
-            "message": "I'm having trouble connecting right now. Please make sure your ANTHROPIC_API_KEY is set correctly. In the meantime, feel free to explore your results and try the quiz again!",
-            "error": str(e)
-        }), 500
+            "message": CHAT_EMPTY_MESSAGE
+        }), 400
+    session_id, system_prompt, messages, answer_key = prepared
+    cached = cached_answer(answer_key, session_id, messages)
+    if cached is not None:
+        body = sse_event('token', {"text": cached}) + sse_event('done', {"session_id": session_id})
+        return Response(body, mimetype='text/event-stream', headers=SSE_HEADERS)
+    if not api_key:
+        payload = offline_payload(data)
+        return Response(sse_event('error', {key: value for key, value in payload.items() if key != 'success'}),
+                        mimetype='text/event-stream', headers=SSE_HEADERS)
+    context = request_context.get()
+    
+    def stream_reply():
+        start = time.perf_counter()
+        reply = []
+        try:
+            with anthropic_client.messages.stream(
+                model=CHAT_MODEL,
+                max_tokens=CHAT_MAX_TOKENS,
+                system=system_prompt.blocks(),
+                messages=api_messages(messages)
+            ) as stream:
+                for text in stream.text_stream:
+                    reply.append(text)
+                    yield sse_event('token', {"text": text})
+                final = stream.get_final_message()
+        except GeneratorExit:
+            # Client disconnected: leaving the with-block closes the upstream stream
+            logger.info("Chat stream for session %s closed by client", session_id)
+            raise
+        except Exception as e:
+            _, payload, _ = chat_failure(e, data, 'stream', start)
+            yield sse_event('error', {key: value for key, value in payload.items() if key != 'success'})
+            return
+        
+        elapsed = time.perf_counter() - start
+        metrics.record_upstream('stream', elapsed, final.usage)
+        remember_answer(answer_key, "".join(reply), final.stop_reason, elapsed)
+        
+        # Commit the completed exchange (the store keeps the last 10 messages)
+        messages.append({"role": "assistant", "content": "".join(reply)})
+        conversation_store.save(session_id, messages)
+        logger.info("Chat stream complete", extra={
+            'session_id': session_id,
+            'stream_ms': round((time.perf_counter() - start) * 1000, 1),
+        })
+        yield sse_event('done', {"session_id": session_id})
+    
+    def generate():
+        # The body streams after the request hooks ran; keep its log context
+        token = request_context.set(context)
+        try:
+            yield from stream_reply()
+        finally:
+            request_context.reset(token)
+    
+    return Response(generate(), mimetype='text/event-stream', headers=SSE_HEADERS)
 
 @app.route('/clear-chat', methods=['POST'])
 def clear_chat():
@@ -783,8 +868,8 @@ def clear_chat():
     data = request.json
     session_id = data.get('session_id', 'default')
     
-    if session_id in conversation_history:
-        del conversation_history[session_id]
+    conversation_store.clear(session_id)
+    prompt_builder.forget(session_id)
     
     return jsonify({"success": True})
 
@@ -0,0 +1,393 @@
+"""
+ASGI Entry Point (async serving mode)
+Serves /chat and /chat/stream natively with AsyncAnthropic, so a pending
+Claude call holds a coroutine instead of a worker thread. Every other route
+runs the Flask app on a thread pool, which keeps the quiz endpoints
+responsive while chats are waiting on the upstream.
+
+In-flight upstream calls are capped by a semaphore (CHAT_MAX_CONCURRENCY);
+excess chats queue for up to CHAT_QUEUE_TIMEOUT seconds, then get the local
+coach's answer (or a tip) instead: a 503 on /chat, an `error` event on the stream.
+Intents the local coach is confident about never take a slot.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5001
+"""
+
+import asyncio
+import io
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import app as web
+import metrics
+import profiling
+import upstream
+from logging_setup import end_request, start_request
+
+logger = logging.getLogger(__name__)
+
+CHAT_MAX_CONCURRENCY = int(os.environ.get('CHAT_MAX_CONCURRENCY', 32))
+CHAT_QUEUE_TIMEOUT = float(os.environ.get('CHAT_QUEUE_TIMEOUT', 10))
+WSGI_THREADS = int(os.environ.get('WSGI_THREADS', 16))
+
+CHAT_BUSY_MESSAGE = "EcoCoach is helping a lot of people right now. Please try again in a moment!"
+
+SSE_HEADERS = [(b'content-type', b'text/event-stream; charset=utf-8'),
+               (b'cache-control', b'no-cache'),
+               (b'x-accel-buffering', b'no')]
+
+# Same pool settings, deadline and retries as the Flask client, and the same circuit breaker
+async_client = upstream.create_client(web.api_key, web.upstream_breaker, async_client=True)
+
+
+class ChatBusy(Exception):
+    """Raised when a chat waited longer than the queue timeout for a slot"""
+
+
+class ChatLimiter:
+    """
+    Cap concurrent upstream calls; callers wait up to queue_timeout seconds
+
+    The semaphore is created lazily so it binds to the server's event loop.
+    """
+
+    def __init__(self, max_concurrent, queue_timeout):
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._semaphore = None
+
+    async def acquire(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise ChatBusy() from None
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+
+chat_limiter = ChatLimiter(CHAT_MAX_CONCURRENCY, CHAT_QUEUE_TIMEOUT)
+
+
+# ===================================
+# ASGI helpers
+# ===================================
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+async def send_json(send, status, payload, headers=None):
+    body = json.dumps(payload).encode('utf-8')
+    extra = [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in (headers or {}).items()]
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode('ascii'))] + extra,
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_sse(send, body):
+    """Send a complete Server-Sent Events response"""
+    await send({'type': 'http.response.start', 'status': 200, 'headers': SSE_HEADERS})
+    await send({'type': 'http.response.body', 'body': body.encode('utf-8')})
+
+
+async def read_chat_request(receive):
+    """Parse the JSON body; returns a dict or None if it isn't a JSON object"""
+    try:
+        data = json.loads(await read_body(receive) or b'{}')
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+class WSGIBridge:
+    """Run a WSGI app from ASGI on a thread pool (responses are buffered)"""
+
+    def __init__(self, wsgi_app, max_workers):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        body = await read_body(receive)
+        loop = asyncio.get_running_loop()
+        status, headers, content = await loop.run_in_executor(
+            self.executor, self._run, self._environ(scope, body)
+        )
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': content})
+
+    @staticmethod
+    def _environ(scope, body):
+        server = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+            'QUERY_STRING': scope['query_string'].decode('latin1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        if scope.get('client'):
+            environ['REMOTE_ADDR'] = scope['client'][0]
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin1').upper().replace('-', '_')
+            value = value.decode('latin1')
+            if name == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+            elif name != 'CONTENT_LENGTH':
+                key = f'HTTP_{name}'
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    def _run(self, environ):
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(k.lower().encode('latin1'), v.encode('latin1')) for k, v in headers]
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            content = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return response['status'], response['headers'], content
+
+
+# ===================================
+# Async chat handlers
+# ===================================
+async def chat(scope, receive, send):
+    """Async /chat: same request and response as the Flask route"""
+    data = await read_chat_request(receive)
+    local = await asyncio.to_thread(web.local_answer, data) if data is not None else None
+    if local is not None:
+        await send_json(send, 200, {"success": True, "message": local, "session_id": data.get('session_id', 'default')})
+        return
+    prepared = await asyncio.to_thread(web.prepare_chat, data) if data is not None else None
+    if prepared is None:
+        await send_json(send, 400, {"success": False, "message": web.CHAT_EMPTY_MESSAGE})
+        return
+    session_id, system_prompt, messages, answer_key = prepared
+
+    cached = await asyncio.to_thread(web.cached_answer, answer_key, session_id, messages)
+    if cached is not None:
+        await send_json(send, 200, {"success": True, "message": cached, "session_id": session_id})
+        return
+    if not web.api_key:
+        await asyncio.to_thread(web.conversation_store.save, session_id, messages)
+        await send_json(send, 503, web.offline_payload(data))
+        return
+
+    start = time.perf_counter()
+    try:
+        async with chat_limiter:
+            start = time.perf_counter()  # upstream latency excludes time queued for a slot
+            with profiling.span('claude'):
+                response = await async_client.messages.create(
+                    model=web.CHAT_MODEL,
+                    max_tokens=web.CHAT_MAX_TOKENS,
+                    system=system_prompt.blocks(),
+                    messages=web.api_messages(messages)
+                )
+    except ChatBusy:
+        await send_json(send, 503, {"success": False, "message": web.fallback_reply(data, CHAT_BUSY_MESSAGE),
+                                    "fallback": True})
+        return
+    except Exception as e:
+        status, payload, headers = web.chat_failure(e, data, 'create', start)
+        # Keep the user's message in the history, as the Flask route does
+        await asyncio.to_thread(web.conversation_store.save, session_id, messages)
+        await send_json(send, status, payload, headers)
+        return
+
+    elapsed = time.perf_counter() - start
+    metrics.record_upstream('create', elapsed, getattr(response, 'usage', None))
+    assistant_message = response.content[0].text
+    web.remember_answer(answer_key, assistant_message, getattr(response, 'stop_reason', None), elapsed)
+    messages.append({"role": "assistant", "content": assistant_message})
+    with profiling.span('save'):
+        await asyncio.to_thread(web.conversation_store.save, session_id, messages)
+    await send_json(send, 200, {"success": True, "message": assistant_message, "session_id": session_id})
+
+
+async def _watch_disconnect(receive, disconnected):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+    disconnected.set()
+
+
+async def chat_stream(scope, receive, send):
+    """Async /chat/stream: tokens relayed as Server-Sent Events"""
+    data = await read_chat_request(receive)
+    local = await asyncio.to_thread(web.local_answer, data) if data is not None else None
+    if local is not None:
+        await send_sse(send, web.sse_event('token', {"text": local}) +
+                       web.sse_event('done', {"session_id": data.get('session_id', 'default')}))
+        return
+    prepared = await asyncio.to_thread(web.prepare_chat, data) if data is not None else None
+    if prepared is None:
+        await send_json(send, 400, {"success": False, "message": web.CHAT_EMPTY_MESSAGE})
+        return
+    session_id, system_prompt, messages, answer_key = prepared
+
+    cached = await asyncio.to_thread(web.cached_answer, answer_key, session_id, messages)
+    if cached is not None:
+        await send_sse(send, web.sse_event('token', {"text": cached}) +
+                       web.sse_event('done', {"session_id": session_id}))
+        return
+    if not web.api_key:
+        payload = web.offline_payload(data)
+        await send_sse(send, web.sse_event('error', {key: value for key, value in payload.items() if key != 'success'}))
+        return
+
+    try:
+        await chat_limiter.acquire()
+    except ChatBusy:
+        # The page only reads events from a 200 stream
+        await send_sse(send, web.sse_event('error', {"message": web.fallback_reply(data, CHAT_BUSY_MESSAGE),
+                                                     "fallback": True}))
+        return
+
+    disconnected = asyncio.Event()
+    watcher = asyncio.create_task(_watch_disconnect(receive, disconnected))
+
+    async def emit(event, payload, more_body=True):
+        body = web.sse_event(event, payload).encode('utf-8')
+        await send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
+
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': SSE_HEADERS})
+        reply = []
+        start = time.perf_counter()
+        try:
+            async with async_client.messages.stream(
+                model=web.CHAT_MODEL,
+                max_tokens=web.CHAT_MAX_TOKENS,
+                system=system_prompt.blocks(),
+                messages=web.api_messages(messages)
+            ) as stream:
+                async for text in stream.text_stream:
+                    if disconnected.is_set():
+                        # Leaving the with-block closes the upstream stream
+                        logger.info("Chat stream for session %s closed by client", session_id)
+                        return
+                    reply.append(text)
+                    await emit('token', {"text": text})
+                final = await stream.get_final_message()
+        except OSError:
+            logger.info("Chat stream for session %s closed by client", session_id)
+            return
+        except Exception as e:
+            _, payload, _ = web.chat_failure(e, data, 'stream', start)
+            await emit('error', {key: value for key, value in payload.items() if key != 'success'}, more_body=False)
+            return
+
+        elapsed = time.perf_counter() - start
+        metrics.record_upstream('stream', elapsed, final.usage)
+        web.remember_answer(answer_key, "".join(reply), final.stop_reason, elapsed)
+
+        # Commit the completed exchange
+        messages.append({"role": "assistant", "content": "".join(reply)})
+        await asyncio.to_thread(web.conversation_store.save, session_id, messages)
+        await emit('done', {"session_id": session_id}, more_body=False)
+    finally:
+        watcher.cancel()
+        chat_limiter.release()
+
+
+NATIVE_ROUTES = {
+    ('POST', '/chat'): chat,
+    ('POST', '/chat/stream'): chat_stream,
+}
+
+flask_bridge = WSGIBridge(web.app, WSGI_THREADS)
+
+
+async def app(scope, receive, send):
+    """ASGI application: native async chat routes, Flask for everything else"""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await async_client.close()
+                flask_bridge.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+
+    handler = NATIVE_ROUTES.get((scope['method'], scope['path']))
+    if handler is None:
+        await flask_bridge(scope, receive, send)
+        return
+
+    # Flask's request hooks don't run for the native routes; log and count them here
+    headers = dict(scope.get('headers', []))
+    request_id = headers.get(b'x-request-id', b'').decode('latin1') or None
+    started = start_request(scope['path'], request_id)
+    measured = metrics.request_started(scope['path'])
+    # Spans only: the handler runs on the event loop thread, shared with every other request
+    profile_header = headers.get(b'x-profile', b'').decode('latin1') or None
+    profile = profiling.begin(scope['path'], profile_header, sample=False)
+    status = []
+
+    async def send_logged(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+            extra = [(b'x-request-id', started[0].encode('latin1'))]
+            if profile is not None:
+                extra.append((b'server-timing', profiling.timing_header(profile).encode('latin1')))
+            message = dict(message, headers=list(message.get('headers', [])) + extra)
+        await send(message)
+
+    try:
+        await handler(scope, receive, send_logged)
+    except Exception as e:
+        metrics.record_error(e)
+        raise
+    finally:
+        end_request(logger, started, scope['method'], status[0] if status else 500)
+        metrics.request_finished(measured, scope['method'], status[0] if status else 500)
+        if profile is not None:
+            profiling.end(profile)
@@ -0,0 +1,4 @@
+"""
+EcoTrace benchmarks
+Run from the repository root, e.g. python -m benchmarks.bench_inference
+"""
@@ -0,0 +1,109 @@
+"""
+Answer cache: upstream calls and latency saved on first-turn quiz chats
+
+    python -m benchmarks.bench_answer_cache [--chats N] [--latency-ms MS]
+
+Replays first-turn chats on the quiz screen against the local fake Anthropic
+API: a random catalog question (random position in the quiz) and a message
+that is a suggestion click, a paraphrase of one, or a one-off question.
+Three runs: cache disabled, cache cold (runtime entries only) and cache
+pre-warmed (python -m answer_cache warm, run against the fake).
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+
+from benchmarks.fake_anthropic import start_fake_server
+
+SUGGESTIONS = ("What should I answer for this question?", "What's my biggest climate impact?", "Give me a quick win")
+PARAPHRASES = (
+    "what should i answer for this question", "What should I answer for this one?",
+    "Help: what should I answer for this question?", "what should I pick for this question?",
+    "Which option should I choose?", "which option is best for the planet",
+    "what's my biggest climate impact", "What is my biggest climate impact?",
+    "give me a quick win please", "Quick win?", "Any quick wins?",
+)
+ONE_OFF = ("Is {a} really that bad?", "How does {a} compare to {b}?", "Why does {a} matter?",
+           "Can you explain {a} in one line?")
+TOPICS = ("heating", "streaming", "a heat pump", "meat", "flying", "cycling", "fast fashion", "recycling", "solar")
+
+
+def workload(count, questions, seed=0, mix=(0.6, 0.25, 0.15)):
+    """[(current_question, message)]: suggestion clicks, paraphrases and one-off questions by mix"""
+    rng = random.Random(seed)
+    chats = []
+    for _ in range(count):
+        question = dict(rng.choice(questions), number=rng.randint(1, 12))
+        kind = rng.random()
+        if kind < mix[0]:
+            message = rng.choice(SUGGESTIONS)
+        elif kind < mix[0] + mix[1]:
+            message = rng.choice(PARAPHRASES)
+        else:
+            message = rng.choice(ONE_OFF).format(a=rng.choice(TOPICS), b=rng.choice(TOPICS))
+        chats.append((question, message))
+    return chats
+
+
+def run(web, cache, chats):
+    web.answer_cache = cache
+    client = web.app.test_client()
+    latencies = []
+    for index, (question, message) in enumerate(chats):
+        start = time.perf_counter()
+        response = client.post('/chat', json={'message': message, 'session_id': f'bench-{id(cache)}-{index}',
+                                              'screen_context': 'quiz', 'current_question': question})
+        assert response.status_code == 200, response.data
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chats', type=int, default=300)
+    parser.add_argument('--latency-ms', type=int, default=100, help="Fake upstream latency per call")
+    args = parser.parse_args()
+
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ['MODEL_RELOAD_INTERVAL'] = '0'
+    from anthropic import Anthropic
+
+    import answer_cache
+    import app as web
+
+    fake = start_fake_server(latency_ms=args.latency_ms, token_delay_ms=0)
+    try:
+        web.api_key = 'fake'  # an empty key gets the local offline reply
+        web.LOCAL_COACH = 'off'  # it would answer the suggestions before the cache
+        web.anthropic_client = Anthropic(api_key='fake', base_url=fake.url)
+        questions = [answer_cache.AnswerCache().question_context(known['id'])
+                     for known in answer_cache.catalog_questions().values()]
+        chats = workload(args.chats, questions)
+
+        warmed = answer_cache.AnswerCache()
+        for entry in answer_cache.warm(web.anthropic_client, warmed, web.prompt_builder, web.CHAT_MODEL,
+                                       web.CHAT_MAX_TOKENS):
+            warmed.warm(entry['screen'], entry['question_id'], entry['message'], entry['reply'],
+                        entry['upstream_ms'] / 1000)
+
+        print(f"\n{args.chats} first-turn quiz chats, fake upstream latency {args.latency_ms} ms\n")
+        print(f"{'cache':<10} {'upstream calls':>15} {'hit ratio':>10} {'near hits':>10} "
+              f"{'mean':>9} {'p50':>9} {'p95':>9} {'saved':>9}")
+        for name, cache in (('off', answer_cache.AnswerCache(max_entries=0)), ('cold', answer_cache.AnswerCache()),
+                            ('warmed', warmed)):
+            before = fake.config.requests
+            latencies = run(web, cache, chats)
+            stats = cache.stats()
+            quantiles = statistics.quantiles(latencies, n=100)
+            print(f"{name:<10} {fake.config.requests - before:>15} {stats['hit_ratio']:>10.1%} "
+                  f"{stats['near_hits']:>10} {statistics.fmean(latencies):>6.1f} ms {quantiles[49]:>6.1f} ms "
+                  f"{quantiles[94]:>6.1f} ms {stats['saved_seconds']:>7.1f} s")
+    finally:
+        fake.shutdown()
+
+
+if __name__ == '__main__':
+    main()
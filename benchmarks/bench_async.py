@@ -0,0 +1,161 @@
+"""
+Quiz-endpoint latency while many chats are waiting on a slow upstream
+
+Starts the fake Anthropic API, then for each serving mode launches the app,
+keeps --chats concurrent /chat requests in flight and measures
+/api/questions and /api/calculate latency, idle and under chat load.
+
+    python -m benchmarks.bench_async [--modes wsgi asgi] [--chats 64] [--latency-ms 2000]
+
+Modes:
+    wsgi - gunicorn with --workers sync workers (app:app)
+    asgi - uvicorn asgi:app (async chat handlers)
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.fake_anthropic import start_fake_server
+from benchmarks.synthetic import answer_sets
+from benchmarks.timing import format_row, summarize
+
+REQUEST_TIMEOUT = 5.0
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(mode, port, workers):
+    if mode == 'wsgi':
+        return [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-k', 'sync',
+                '-b', f'127.0.0.1:{port}', '--timeout', '120', 'app:app']
+    return [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1',
+            '--port', str(port), '--log-level', 'warning']
+
+
+def request(url, payload=None, timeout=REQUEST_TIMEOUT):
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        return response.read()
+
+
+def wait_ready(base_url, deadline=30):
+    end = time.time() + deadline
+    while time.time() < end:
+        try:
+            request(base_url + '/api/questions', timeout=1)
+            return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.2)
+    return False
+
+
+def measure(fn, count):
+    """Sequential latencies; failures/timeouts count as REQUEST_TIMEOUT"""
+    latencies, failures = [], 0
+    start = time.perf_counter()
+    for i in range(count):
+        t0 = time.perf_counter()
+        try:
+            fn(i)
+            latencies.append(time.perf_counter() - t0)
+        except (urllib.error.URLError, OSError):
+            failures += 1
+            latencies.append(REQUEST_TIMEOUT)
+    return summarize(latencies, time.perf_counter() - start), failures
+
+
+def chat_worker(base_url, session, stop, counters):
+    while not stop.is_set():
+        try:
+            request(base_url + '/chat', {'message': 'How do I cut my emissions?',
+                                         'session_id': session, 'screen_context': 'start'}, timeout=120)
+            counters['ok'] += 1
+        except urllib.error.HTTPError as e:
+            counters[str(e.code)] = counters.get(str(e.code), 0) + 1
+        except (urllib.error.URLError, OSError):
+            counters['failed'] += 1
+
+
+def run_mode(mode, args, fake_url):
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    env = dict(os.environ, ANTHROPIC_BASE_URL=fake_url, ANTHROPIC_API_KEY='fake-key',
+               CHAT_MAX_CONCURRENCY=str(args.max_concurrency))
+    server = subprocess.Popen(server_command(mode, port, args.workers), env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_ready(base_url):
+            print(f"{mode}: server did not start")
+            return
+
+        calc_payloads = [{'answers': answers} for answers in answer_sets(args.samples, seed=1)]
+        questions = lambda i: request(base_url + '/api/questions')
+        calculate = lambda i: request(base_url + '/api/calculate', calc_payloads[i])
+
+        idle_q, _ = measure(questions, args.samples)
+        idle_c, _ = measure(calculate, args.samples)
+
+        stop = threading.Event()
+        counters = {'ok': 0, 'failed': 0}
+        threads = [threading.Thread(target=chat_worker, args=(base_url, f'load-{i}', stop, counters), daemon=True)
+                   for i in range(args.chats)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.5)
+
+        loaded_q, failed_q = measure(questions, args.samples)
+        loaded_c, failed_c = measure(calculate, args.samples)
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=args.latency_ms / 1000 + REQUEST_TIMEOUT)
+
+        print(f"\n[{mode}] {args.chats} concurrent chats, upstream latency {args.latency_ms:.0f} ms")
+        print(format_row('/api/questions idle', idle_q))
+        print(format_row('/api/questions under chat load', loaded_q) + f"   failed {failed_q}")
+        print(format_row('/api/calculate idle', idle_c))
+        print(format_row('/api/calculate under chat load', loaded_c) + f"   failed {failed_c}")
+        print(f"chat requests: {counters}")
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--modes', nargs='+', default=['wsgi', 'asgi'], choices=['wsgi', 'asgi'])
+    parser.add_argument('--chats', type=int, default=64)
+    parser.add_argument('--latency-ms', type=float, default=2000)
+    parser.add_argument('--workers', type=int, default=4, help='sync workers for wsgi mode')
+    parser.add_argument('--max-concurrency', type=int, default=32, help='CHAT_MAX_CONCURRENCY for asgi mode')
+    parser.add_argument('--samples', type=int, default=20)
+    args = parser.parse_args()
+
+    fake = start_fake_server(latency_ms=args.latency_ms)
+    try:
+        for mode in args.modes:
+            runner = 'gunicorn' if mode == 'wsgi' else 'uvicorn'
+            if shutil.which(runner) is None and subprocess.call(
+                    [sys.executable, '-c', f'import {runner}'], stderr=subprocess.DEVNULL) != 0:
+                print(f"{mode}: {runner} is not installed, skipping")
+                continue
+            run_mode(mode, args, fake.url)
+    finally:
+        fake.shutdown()
+
+
+if __name__ == '__main__':
+    main()
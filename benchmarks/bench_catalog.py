@@ -0,0 +1,118 @@
+"""
+Results-screen prompt size and retrieval latency as the tips/products catalog grows
+
+    python -m benchmarks.bench_catalog [--sizes 12 1000 50000] [--queries N]
+
+For each catalog size (products; tips are twice as many, as in quiz_data) a
+synthetic catalog is grown from the real one: variants of the real products
+and tips with extra brand/model/feature words. Reports:
+
+    index build      - ResultsCatalog construction (once at startup)
+    lookup           - ResultsCatalog.context() per chat message (tips + products)
+    previous prompt  - estimated tokens of the results context listing each
+                       category's first 3 tips and all of its products
+    retrieval prompt - estimated tokens of totals + the retrieved top-k items
+"""
+
+import argparse
+import itertools
+import os
+import random
+import time
+
+from benchmarks.synthetic import answer_sets
+from benchmarks.timing import format_row, summarize, time_calls
+from catalog_index import ResultsCatalog
+from history_compactor import estimate_tokens
+from prompt_builder import FULL_DETAIL, SUMMARY_DETAIL, results_context
+from quiz_data import PRODUCTS, TIPS
+
+MESSAGES = (
+    "Why is my Mobility score so high?", "What should I change first?", "Is the smart thermostat worth it?",
+    "How much would going vegetarian save?", "Which LED bulbs should I buy?", "Any cheap insulation ideas?",
+    "What about flying less?", "How do I cut plastic waste?", "Is a compost bin worth it for a small flat?",
+    "Should I get an electric bike?",
+)
+BRANDS = ("Acme", "Verde", "Solis", "Northwind", "Greenleaf", "Terra", "Kestrel", "Boreal", "Lumen", "Fjord")
+FEATURES = ("eco", "compact", "pro", "family", "travel", "smart", "recycled", "solar", "lightweight", "durable",
+            "refillable", "modular", "organic", "efficient", "quiet", "portable", "premium", "budget")
+
+
+def synthetic_catalog(products_count, seed=0):
+    """({category: [tip]}, {category: [product]}) with products_count products and twice as many tips"""
+    if products_count <= sum(len(items) for items in PRODUCTS.values()):
+        return TIPS, PRODUCTS
+    rng = random.Random(seed)
+    categories = list(PRODUCTS)
+    tips = {category: list(TIPS[category]) for category in categories}
+    products = {category: list(PRODUCTS[category]) for category in categories}
+    for index in range(products_count - sum(len(items) for items in PRODUCTS.values())):
+        category = categories[index % len(categories)]
+        base = rng.choice(PRODUCTS[category])
+        features = ' '.join(rng.sample(FEATURES, 2))
+        products[category].append({
+            **base,
+            'name': f"{base['name']} {rng.choice(BRANDS)} {features} {rng.randint(100, 999)}",
+            'description': f"{base['description']} ({features} edition)",
+        })
+    for index in range(2 * products_count - sum(len(items) for items in TIPS.values())):
+        category = categories[index % len(categories)]
+        tips[category].append(f"{rng.choice(TIPS[category])} ({' '.join(rng.sample(FEATURES, 2))} option)")
+    return tips, products
+
+
+def previous_payload(results, tips, products):
+    """Results as the previous prompt listed them: first 3 tips and all products per category"""
+    return {
+        'total_emissions': results['total']['co2'],
+        'total_average': results['total']['average'],
+        'total_difference': round(results['total']['co2'] - results['total']['average']),
+        'results': [{
+            'category': category,
+            'emissions': results['categories'][category]['co2_annual'],
+            'average': results['categories'][category]['average'],
+            'difference': round(results['categories'][category]['difference']),
+            'tips': tips[category][:3],
+            'products': products[category],
+        } for category in results['priority_order']],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[12, 1000, 50000], help="Products in the catalog")
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ['MODEL_RELOAD_INTERVAL'] = '0'
+    import app as web
+
+    results = web.calculate_response(answer_sets(1, seed=3)[0])[0]
+    print(f"\n{len(MESSAGES)} chat messages on the results screen, top {web.results_catalog.top_tips} tips "
+          f"+ {web.results_catalog.top_products} products\n")
+    summary = []
+    for size in args.sizes:
+        tips, products = synthetic_catalog(size)
+        start = time.perf_counter()
+        catalog = ResultsCatalog(tips, products)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        payload = previous_payload(results, tips, products)
+        messages = itertools.cycle(MESSAGES)
+        latencies, elapsed = time_calls(lambda _: catalog.context(next(messages), payload), range(args.queries))
+        stats = summarize(latencies, elapsed)
+        previous = estimate_tokens(results_context(payload, FULL_DETAIL))
+        retrieval = max(estimate_tokens(results_context(payload, SUMMARY_DETAIL) + catalog.context(message, payload))
+                        for message in MESSAGES)
+        print(format_row(f"lookup, {len(catalog.products):,} products", stats))
+        summary.append((len(catalog.tips), len(catalog.products), build_ms, previous, retrieval))
+
+    print(f"\n{'products':>9} {'tips':>8} {'index build':>12} {'previous prompt':>16} {'retrieval prompt':>17}")
+    for tips_count, products_count, build_ms, previous, retrieval in summary:
+        print(f"{products_count:>9,} {tips_count:>8,} {build_ms:>9,.0f} ms {previous:>9,} tokens "
+              f"{retrieval:>10,} tokens")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Conversation store backends: behaviour checks and save/load/stats cost
+
+    python -m benchmarks.bench_conversation_store [--sessions N] [--calls N]
+
+Runs the same checks on every backend (round trip, trimming to max_messages,
+a leading summary entry kept, clear, stats) and then times save, load and
+the /metrics stats() call with --sessions sessions stored:
+
+    memory  - MemoryConversationStore
+    sqlite  - SQLiteConversationStore on a temporary file
+    redis   - RedisConversationStore on fakeredis (skipped if not installed),
+              stats() rescanned every call and cached (CHAT_STORE_STATS_INTERVAL)
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+
+from benchmarks.timing import summarize, time_calls
+from conversation_store import MemoryConversationStore, RedisConversationStore, SQLiteConversationStore
+
+
+def history(count, start=0):
+    return [{"role": "user" if index % 2 == 0 else "assistant", "content": f"message {index}"}
+            for index in range(start, start + count)]
+
+
+def exact_stats(store):
+    """Whether stats() reflects the latest writes (cached Redis scans lag by up to stats_interval)"""
+    return not isinstance(store, RedisConversationStore) or store.stats_interval == 0
+
+
+def check(store):
+    """Assert the behaviour every backend shares; raises AssertionError on a mismatch"""
+    assert store.load('check-missing') == []
+    store.save('check', history(4))
+    assert store.load('check') == history(4), "round trip"
+
+    store.save('check', history(store.max_messages + 3))
+    assert store.load('check') == history(store.max_messages, start=3), "trimmed to the last max_messages"
+
+    summary = {"role": "user", "content": "- They asked: earlier", "summary": True, "omitted": 0}
+    store.save('check', [summary] + history(store.max_messages + 2))
+    loaded = store.load('check')
+    assert loaded[0] == summary and len(loaded) == store.max_messages + 1, "summary entry kept"
+
+    store.save('check', history(2) + [{"role": "user", "content": "   "}, {"role": "assistant"}])
+    assert store.load('check') == history(2), "malformed messages cleaned"
+
+    before = store.stats()['sessions']
+    store.clear('check')
+    assert store.load('check') == []
+    if exact_stats(store):
+        assert store.stats()['sessions'] == before - 1, "stats follow clear"
+
+
+def backends(path):
+    yield 'memory', MemoryConversationStore()
+    yield 'sqlite', SQLiteConversationStore(path)
+    try:
+        import fakeredis
+    except ImportError:
+        print("redis   skipped (pip install fakeredis)")
+        return
+    server = fakeredis.FakeServer()
+    yield 'redis (scan)', RedisConversationStore(client=fakeredis.FakeRedis(server=server), stats_interval=0)
+    yield 'redis (cached)', RedisConversationStore(client=fakeredis.FakeRedis(server=server), prefix='cached:')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=2000, help="Sessions stored before timing stats()")
+    parser.add_argument('--calls', type=int, default=2000, help="Timed save/load calls")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)  # check() saves malformed messages on purpose
+    messages = history(10)
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"\n{args.sessions:,} sessions stored, p50 per call\n")
+        print(f"{'backend':<15} {'checks':<7} {'save':>10} {'load':>10} {'stats()':>10}")
+        for name, store in backends(os.path.join(directory, 'conversations.db')):
+            check(store)
+            for index in range(args.sessions):
+                store.save(f'bench-{index}', messages)
+            ids = [f'bench-{index % args.sessions}' for index in range(args.calls)]
+            save = summarize(*time_calls(lambda session_id: store.save(session_id, messages), ids))
+            load = summarize(*time_calls(store.load, ids))
+            stats = summarize(*time_calls(lambda _: store.stats(), range(20)))
+            if exact_stats(store):
+                assert store.stats()['sessions'] == args.sessions, store.stats()
+            print(f"{name:<15} {'ok':<7} {save['p50_ms']:>7.3f} ms {load['p50_ms']:>7.3f} ms "
+                  f"{stats['p50_ms']:>7.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
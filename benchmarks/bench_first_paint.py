@@ -0,0 +1,108 @@
+"""
+Quiz start-up on slow links: server-rendered page vs the old fetch-first flow
+
+    python -m benchmarks.bench_first_paint [--requests N]
+
+Byte sizes are measured from the app (static files with the encoding a
+browser would get: brotli/gzip when static_assets has been built). Times
+come from a simple network model per profile (connection setup of 2 RTTs,
+one RTT per dependent request, transfers share the bandwidth):
+
+    before:    HTML -> blocking style.css + fonts.css, script.js -> click -> GET /api/questions
+    before+br: the same with the HTML compressed (isolates the compression gain)
+    after:     HTML (compressed; critical CSS + questions inline) -> fonts.css, script.js -> click
+
+Reported per profile: first paint, script ready (interactive) and first
+question on screen for a user who clicks Start Quiz as soon as possible.
+Server-side render time of the page is measured too (Jinja per request vs
+the cached halves).
+"""
+
+import argparse
+import re
+
+from benchmarks.timing import format_row, summarize, time_calls
+
+# name: (round trip seconds, downlink bytes per second)
+PROFILES = {
+    'slow 3G (400 ms, 400 kbit/s)': (0.400, 400_000 / 8),
+    'slow 4G (150 ms, 1.6 Mbit/s)': (0.150, 1_600_000 / 8),
+    'fast (40 ms, 10 Mbit/s)': (0.040, 10_000_000 / 8),
+}
+
+
+def asset_sizes(client, html):
+    """Encoded size of every same-origin stylesheet/script the page references"""
+    sizes = {}
+    for tag in re.findall(r'<link [^>]*>|<script [^>]*src=[^>]*>', html):
+        href = re.search(r'(?:href|src)="(/static/[^"]+)"', tag)
+        if href and 'rel="preload" href' not in tag.replace(' as="font"', ''):
+            response = client.get(href.group(1), headers={'Accept-Encoding': 'br, gzip'})
+            sizes[href.group(1)] = len(response.data)
+            response.close()
+    return sizes
+
+
+def model(rtt, bandwidth, html, blocking_css, async_css, js, questions):
+    """(first paint, interactive, first question) seconds for one flow"""
+    html_done = 2 * rtt + rtt + html / bandwidth
+    paint = html_done + (rtt + blocking_css / bandwidth if blocking_css else 0)
+    interactive = html_done + rtt + (blocking_css + async_css + js) / bandwidth
+    first_question = interactive + (rtt + questions / bandwidth if questions else 0)
+    return paint, max(interactive, paint), max(first_question, paint)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000, help="Page renders timed per variant")
+    args = parser.parse_args()
+
+    import os
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ['MODEL_RELOAD_INTERVAL'] = '0'
+    import app as web
+    from flask import render_template
+    from index_page import IndexPage, compress
+
+    client = web.app.test_client()
+    before_page = IndexPage(web.app, inline_questions=False, inline_css=False).render()
+    after_page = IndexPage(web.app).render(web.question_catalog.payload(per_category=3))
+    accepted = {'br': 1, 'gzip': 1}
+    questions = len(client.get('/api/questions', headers={'Accept-Encoding': 'br, gzip'}).data)
+
+    flows = {}
+    for name, page, html_size, fetches_questions in (
+            ('before', before_page, len(before_page), True),
+            ('before+br', before_page, len(compress(before_page, accepted)[0]), True),
+            ('after', after_page, len(compress(after_page, accepted)[0]), False)):
+        page = page.decode()
+        sizes = asset_sizes(client, page)
+        css = sum(size for path, size in sizes.items() if 'style' in path)
+        fonts = sum(size for path, size in sizes.items() if 'fonts' in path)
+        js = sum(size for path, size in sizes.items() if path.endswith('.js'))
+        blocking = fonts + (css if fetches_questions else 0)
+        flows[name] = dict(html=html_size, blocking_css=blocking, async_css=0 if fetches_questions else css,
+                           js=js, questions=questions if fetches_questions else 0)
+        print(f"{name:<9} HTML {flows[name]['html']:>7,} B  render-blocking CSS {blocking:>7,} B  "
+              f"async CSS {flows[name]['async_css']:>7,} B  JS {js:>7,} B  "
+              f"requests before the first question: {len(sizes) + fetches_questions}")
+
+    print(f"\n{'profile':<30} {'flow':<9} {'first paint':>12} {'interactive':>12} {'1st question':>13}")
+    for profile, (rtt, bandwidth) in PROFILES.items():
+        for name, flow in flows.items():
+            times = model(rtt, bandwidth, **flow)
+            print(f"{profile:<30} {name:<9} " + ' '.join(f'{t * 1000:>9,.0f} ms' for t in times[:2])
+                  + f" {times[2] * 1000:>10,.0f} ms")
+
+    print()
+    with web.app.test_request_context('/'):
+        print(format_row('render_template per request',
+                         summarize(*time_calls(lambda _: render_template('index.html'), range(args.requests)))))
+    print(format_row('cached halves + question sample', summarize(*time_calls(
+        lambda _: web.index_page.render(web.question_catalog.payload(per_category=3)), range(args.requests)))))
+    print(format_row('  + compression', summarize(*time_calls(lambda _: compress(
+        web.index_page.render(web.question_catalog.payload(per_category=3)), accepted), range(args.requests)))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Chat input size per request: token-budgeted history compaction vs the last 10 messages in full
+
+    python -m benchmarks.bench_history [--turns N] [--reply-tokens N] [--budget N]
+
+Replays one long /chat conversation on the results screen (results with tips
+and products, and all quiz answers, as the page sends them) against the local
+fake Anthropic API, whose replies are about --reply-tokens long. It runs twice:
+with the HistoryCompactor, and with a stand-in for the old behaviour (the
+stored last 10 messages plus the new one, full results context). Per turn it
+reports the estimated input tokens and the size of the system prompt +
+messages JSON actually sent upstream.
+"""
+
+import argparse
+import json
+import os
+import time
+
+from benchmarks.fake_anthropic import DEFAULT_REPLY, start_fake_server
+from benchmarks.synthetic import answer_sets
+
+QUESTIONS_ASKED = (
+    "Why is my Mobility score so high?", "What should I change first?", "Is the smart thermostat worth it?",
+    "How much would going vegetarian save?", "Which of my answers hurt my score the most?",
+    "Give me a plan for the next month", "What about flying less?", "How do I compare to the average?",
+)
+
+
+def conversation(web, turns, payload, bodies):
+    """Per turn: (estimated tokens sent, uncompacted estimate, request JSON bytes)"""
+    client = web.app.test_client()
+    session_id = f'bench-history-{time.monotonic_ns()}'
+    rows = []
+    for turn in range(turns):
+        before = len(bodies)
+        response = client.post('/chat', json={**payload, 'session_id': session_id,
+                                              'message': QUESTIONS_ASKED[turn % len(QUESTIONS_ASKED)]})
+        assert response.status_code == 200, response.data
+        sent = web.metrics.prompt_tokens._series[('sent',)]
+        uncompacted = web.metrics.prompt_tokens._series[('uncompacted',)]
+        rows.append((sent, uncompacted, bodies[before] if len(bodies) > before else 0))
+    # Counters are cumulative: turn them into per-turn values
+    per_turn, previous = [], (0, 0)
+    for sent, uncompacted, body in rows:
+        per_turn.append((sent - previous[0], uncompacted - previous[1], body))
+        previous = (sent, uncompacted)
+    return per_turn
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--turns', type=int, default=15)
+    parser.add_argument('--reply-tokens', type=int, default=900, help="Approximate length of each fake reply")
+    parser.add_argument('--budget', type=int, help="CHAT_INPUT_BUDGET (default: the app's)")
+    args = parser.parse_args()
+
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ['MODEL_RELOAD_INTERVAL'] = '0'
+    from anthropic import Anthropic
+
+    import app as web
+    from history_compactor import Compaction, HistoryCompactor, estimate_tokens, message_tokens
+
+    reply = (DEFAULT_REPLY + ' ') * max(1, args.reply_tokens // estimate_tokens(DEFAULT_REPLY + ' '))
+    fake = start_fake_server(latency_ms=0, token_delay_ms=0, reply=reply)
+    web.api_key = 'fake'  # an empty key gets the local offline reply
+    web.LOCAL_COACH = 'off'  # every turn goes upstream
+    web.anthropic_client = Anthropic(api_key='fake', base_url=fake.url)
+    bodies = []  # JSON size of system + messages per upstream call
+    create = web.anthropic_client.messages.create
+
+    def measured_create(**kwargs):
+        bodies.append(len(json.dumps({'system': kwargs['system'], 'messages': kwargs['messages']}).encode('utf-8')))
+        return create(**kwargs)
+    web.anthropic_client.messages.create = measured_create
+
+    answers = answer_sets(1, seed=3)[0]
+    results = web.calculate_response(answers)[0]
+    payload = {'screen_context': 'results', 'results': results, 'user_answers': list(answers.values())}
+
+    class Uncompacted(HistoryCompactor):
+        """The old behaviour: full results context, the stored last 10 messages + the new one"""
+
+        def system_fits(self, system_prompt):
+            return True
+
+        def compact(self, system_prompt, messages, uncompacted_system_tokens=None):
+            tokens = estimate_tokens(system_prompt.text) + sum(message_tokens(message) for message in messages)
+            return Compaction(messages, '', tokens, tokens, 0)
+
+    compactor = HistoryCompactor(**({'budget': args.budget} if args.budget else {}),
+                                 max_messages=web.CHAT_HISTORY_LIMIT)
+    try:
+        runs = {}
+        for name, instance in (('compacted', compactor), ('previous', Uncompacted(max_messages=web.CHAT_HISTORY_LIMIT))):
+            web.history_compactor = instance
+            web.metrics.prompt_tokens._series.clear()
+            runs[name] = conversation(web, args.turns, payload, bodies)
+    finally:
+        fake.shutdown()
+
+    print(f"\n{args.turns} turns on the results screen, replies ~{estimate_tokens(reply)} tokens, "
+          f"budget {compactor.budget} tokens (summary {compactor.summary_budget})\n")
+    print(f"{'turn':>4} {'previous est':>13} {'compacted est':>14} {'uncompacted est':>16} "
+          f"{'previous body':>14} {'compacted body':>15}")
+    for turn, (previous, compacted) in enumerate(zip(runs['previous'], runs['compacted']), 1):
+        print(f"{turn:>4} {previous[0]:>13,} {compacted[0]:>14,} {compacted[1]:>16,} "
+              f"{previous[2]:>12,} B {compacted[2]:>13,} B")
+    total = {name: [sum(column) for column in zip(*rows)] for name, rows in runs.items()}
+    print(f"\ntotal est. input tokens: previous {total['previous'][0]:,}  compacted {total['compacted'][0]:,} "
+          f"({total['compacted'][0] / total['previous'][0] - 1:+.0%}; "
+          f"the compactor's own uncompacted estimate: {total['compacted'][1]:,})")
+    print(f"total request bytes:     previous {total['previous'][2]:,}  compacted {total['compacted'][2]:,} "
+          f"({total['compacted'][2] / total['previous'][2] - 1:+.0%})")
+
+    # Cost of compaction itself, on the largest history of the run
+    history = web.conversation_store.load(next(reversed(web.conversation_store._sessions)))
+    system_prompt = web.prompt_builder.build('bench', 'results', None, results, payload['user_answers'])
+    start, rounds = time.perf_counter(), 2000
+    for _ in range(rounds):
+        compactor.compact(system_prompt, history + [{'role': 'user', 'content': QUESTIONS_ASKED[0]}])
+    print(f"compact(): {(time.perf_counter() - start) / rounds * 1e6:.0f} µs per request "
+          f"({len(history)} stored messages)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Scoring latency: coefficient calculator vs served CatBoost model
+
+    python -m benchmarks.bench_inference [--model-dir DIR] [--requests N] [--concurrency C]
+
+The CatBoost rows are skipped when the model artifacts can't be loaded.
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.synthetic import answer_sets
+from benchmarks.timing import format_row, summarize, time_calls
+from inference import MODEL_DIR, load_inference_server
+from ml_calculator import calculate_emission
+
+
+def bench_concurrent(fn, inputs, concurrency):
+    """Drive fn from a thread pool; latency is measured per call"""
+    def timed(item):
+        t0 = time.perf_counter()
+        fn(item)
+        return time.perf_counter() - t0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(timed, inputs))
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    inputs = answer_sets(args.requests, seed=args.seed)
+
+    coefficient = summarize(*time_calls(calculate_emission, inputs))
+    print(format_row('coefficients (sequential)', coefficient))
+
+    server = load_inference_server(args.model_dir)
+    if server is None:
+        return
+
+    single = summarize(*time_calls(lambda answers: server.predict_many([answers]), inputs))
+    print(format_row('catboost direct (sequential)', single))
+
+    batched = summarize(*bench_concurrent(server.predict, inputs, args.concurrency))
+    print(format_row(f'catboost micro-batched (x{args.concurrency})', batched))
+
+    start = time.perf_counter()
+    server.predict_many(inputs)
+    elapsed = time.perf_counter() - start
+    print(f"{'catboost predict_many (one call)':<34} {len(inputs) / elapsed:>12,.0f}/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Training data ingestion: full pd.read_csv vs the chunked columnar cache
+
+    python -m benchmarks.bench_ingest [--rows 1000000 5000000] [--chunk-rows N] [--keep]
+
+Writes a synthetic survey CSV of each size (in chunks), then times three
+stages, each in a fresh child process so peak RSS is measured per stage:
+
+    read_csv    - pd.read_csv of the whole file (what train_model.py used to do)
+    build cache - dataset_cache.build_cache (chunked, one pass)
+    load cache  - dataset_cache.load_dataset, then a sum over every column
+"""
+
+import argparse
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from dataset_cache import DEFAULT_CHUNK_ROWS
+
+STAGES = ['read_csv', 'build cache', 'load cache']
+
+
+def write_csv(path, rows, chunk_rows=500_000, seed=0):
+    """Write a synthetic survey CSV without holding it all in memory"""
+    from benchmarks.synthetic import survey_frame
+
+    with open(path, 'w', newline='') as f:
+        for i, offset in enumerate(range(0, rows, chunk_rows)):
+            frame = survey_frame(min(chunk_rows, rows - offset), seed=seed + i)
+            frame.to_csv(f, header=i == 0, index=False)
+
+
+def peak_rss_mib():
+    """Peak RSS of this process (VmHWM; ru_maxrss would include the parent's peak across fork/exec)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_stage(stage, csv_path, cache_dir, chunk_rows):
+    """Run one stage in this process; returns seconds"""
+    import numpy as np
+    import pandas as pd
+
+    from dataset_cache import build_cache, load_dataset
+
+    start = time.perf_counter()
+    if stage == 'read_csv':
+        pd.read_csv(csv_path)
+    elif stage == 'build cache':
+        build_cache(csv_path, cache_dir, chunk_rows)
+    else:
+        df = load_dataset(cache_dir)
+        for column in df.columns:
+            values = df[column]
+            np.asarray(values.cat.codes if isinstance(values.dtype, pd.CategoricalDtype) else values).sum()
+    return time.perf_counter() - start
+
+
+def measure(stage, csv_path, cache_dir, chunk_rows):
+    """Run a stage in a child process; returns (seconds, peak RSS in MiB)"""
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_ingest', '--child', stage, csv_path, cache_dir, str(chunk_rows)],
+        check=True, capture_output=True, text=True,
+    ).stdout.split()
+    return float(output[0]), float(output[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 5_000_000])
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument('--dir', default=tempfile.gettempdir())
+    parser.add_argument('--keep', action='store_true', help="Keep the generated CSVs and caches")
+    parser.add_argument('--child', nargs=4, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        stage, csv_path, cache_dir, chunk_rows = args.child
+        seconds = run_stage(stage, csv_path, cache_dir, int(chunk_rows))
+        print(seconds, peak_rss_mib())
+        return
+
+    print(f"{'rows':>12} {'CSV MiB':>8} {'stage':>12} {'time':>10} {'peak RSS':>12}")
+    for rows in args.rows:
+        csv_path = os.path.join(args.dir, f'bench_ingest_{rows}.csv')
+        cache_dir = csv_path + '.cache'
+        write_csv(csv_path, rows)
+        size = os.path.getsize(csv_path) / 2 ** 20
+        try:
+            for stage in STAGES:
+                seconds, peak = measure(stage, csv_path, cache_dir, args.chunk_rows)
+                print(f"{rows:>12,} {size:>8,.0f} {stage:>12} {seconds:8.2f} s {peak:8,.0f} MiB")
+        finally:
+            if not args.keep:
+                os.remove(csv_path)
+                shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
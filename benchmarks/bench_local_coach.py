@@ -0,0 +1,125 @@
+"""
+Local coach: answer latency per intent, and /chat with and without it
+
+    python -m benchmarks.bench_local_coach [--chats N] [--latency-ms MS] [--calls N]
+
+First times LocalCoach.answer on each intent (and on a message it declines)
+with the app's catalog and real /api/calculate results. Then replays chats
+through the Flask test client against the local fake Anthropic API, on the
+quiz screen (bench_answer_cache's mix of suggestion clicks, paraphrases and
+one-off questions) and on the results screen (the same mix with the results
+suggestions), with LOCAL_COACH=off and LOCAL_COACH=first. The answer cache is
+disabled so the runs only differ by the local coach.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+
+from benchmarks.bench_answer_cache import ONE_OFF, TOPICS, workload
+from benchmarks.fake_anthropic import start_fake_server
+from benchmarks.synthetic import answer_sets
+from benchmarks.timing import summarize, time_calls
+
+RESULTS_SUGGESTIONS = ("What's my biggest climate impact?", "Give me a quick win", "What product should I buy?")
+RESULTS_PARAPHRASES = ("what's my biggest climate impact", "What is my biggest climate impact?",
+                       "Where does most of my footprint come from? biggest area?", "give me a quick win please",
+                       "Quick win?", "Any quick wins?", "Where do I start?", "Which product should I buy?",
+                       "any product recommendations?")
+
+
+def results_workload(count, results, answers, seed=0, mix=(0.6, 0.25, 0.15)):
+    """[chat request]: results-screen suggestion clicks, paraphrases and one-off questions by mix"""
+    rng = random.Random(seed)
+    chats = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < mix[0]:
+            message = rng.choice(RESULTS_SUGGESTIONS)
+        elif kind < mix[0] + mix[1]:
+            message = rng.choice(RESULTS_PARAPHRASES)
+        else:
+            message = rng.choice(ONE_OFF).format(a=rng.choice(TOPICS), b=rng.choice(TOPICS))
+        chats.append({'message': message, 'screen_context': 'results', 'results': results, 'user_answers': answers})
+    return chats
+
+
+def run(web, mode, chats):
+    """Send chats with LOCAL_COACH=mode; returns latencies in ms"""
+    web.LOCAL_COACH = mode
+    client = web.app.test_client()
+    latencies = []
+    for index, chat in enumerate(chats):
+        start = time.perf_counter()
+        response = client.post('/chat', json=dict(chat, session_id=f'bench-coach-{mode}-{index}'))
+        assert response.status_code == 200, response.data
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chats', type=int, default=300, help="Chats per screen")
+    parser.add_argument('--latency-ms', type=int, default=100, help="Fake upstream latency per call")
+    parser.add_argument('--calls', type=int, default=20000, help="LocalCoach.answer calls per intent")
+    args = parser.parse_args()
+
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ['MODEL_RELOAD_INTERVAL'] = '0'
+    from anthropic import Anthropic
+
+    import answer_cache
+    import app as web
+
+    answers = answer_sets(1, seed=3)[0]
+    results = web.calculate_response(answers)[0]
+    user_answers = list(answers.values())
+    questions = [answer_cache.AnswerCache().question_context(known['id'])
+                 for known in answer_cache.catalog_questions().values()]
+    quiz = {'screen_context': 'quiz', 'current_question': questions[0]}
+    on_results = {'screen_context': 'results', 'results': results, 'user_answers': user_answers}
+    cases = (
+        ('explain_question', dict(quiz, message="What should I answer for this question?")),
+        ('biggest_impact', dict(on_results, message="What's my biggest climate impact?")),
+        ('top_product', dict(on_results, message="What product should I buy?")),
+        ('quick_win', dict(on_results, message="Give me a quick win")),
+        ('declined (to Claude)', dict(on_results, message="How does flying compare to driving?")),
+    )
+    print(f"\nLocalCoach.answer, {args.calls:,} calls each\n")
+    print(f"{'intent':<22} {'p50':>9} {'p99':>9}  reply")
+    for name, data in cases:
+        answer = web.local_coach.answer(data)
+        latencies, elapsed = time_calls(web.local_coach.answer, [data] * args.calls)
+        stats = summarize(latencies, elapsed)
+        reply = answer.reply.splitlines()[0][:60] if answer else '-'
+        print(f"{name:<22} {stats['p50_ms'] * 1000:>6.1f} us {stats['p99_ms'] * 1000:>6.1f} us  {reply}")
+
+    fake = start_fake_server(latency_ms=args.latency_ms, token_delay_ms=0)
+    try:
+        web.api_key = 'fake'  # an empty key gets the local offline reply
+        web.anthropic_client = Anthropic(api_key='fake', base_url=fake.url)
+        web.answer_cache = answer_cache.AnswerCache(max_entries=0)
+        screens = (
+            ('quiz', [{'message': message, 'screen_context': 'quiz', 'current_question': current}
+                      for current, message in workload(args.chats, questions)]),
+            ('results', results_workload(args.chats, results, user_answers)),
+        )
+        print(f"\n{args.chats} chats per screen, fake upstream latency {args.latency_ms} ms, answer cache off\n")
+        print(f"{'screen':<8} {'LOCAL_COACH':<12} {'upstream calls':>15} {'local':>7} {'mean':>9} {'p50':>9} "
+              f"{'p95':>9}")
+        for screen, chats in screens:
+            for mode in ('off', 'first'):
+                before, local_before = fake.config.requests, sum(web.local_coach.stats()['answered'].values())
+                latencies = run(web, mode, chats)
+                local = sum(web.local_coach.stats()['answered'].values()) - local_before
+                quantiles = statistics.quantiles(latencies, n=100)
+                print(f"{screen:<8} {mode:<12} {fake.config.requests - before:>15} {local / len(chats):>7.0%} "
+                      f"{statistics.fmean(latencies):>6.1f} ms {quantiles[49]:>6.1f} ms {quantiles[94]:>6.1f} ms")
+    finally:
+        fake.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Request throughput with logging off, at INFO and at DEBUG
+
+    python -m benchmarks.bench_logging [--requests N] [--log-file PATH]
+
+Drives /api/calculate (response cache disabled) and /chat (with a stub
+Anthropic client) through the Flask test client. Log output goes to a real
+file so the I/O cost is included.
+
+Modes:
+    off          - LOG_LEVEL=CRITICAL
+    info (queue) - the default configuration
+    debug (queue) - every module at DEBUG (per-answer lines, payload dumps)
+    debug (sync) - DEBUG written straight from the request thread
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+from types import SimpleNamespace
+
+import app as web
+from benchmarks.synthetic import answer_sets
+from benchmarks.timing import format_row, summarize, time_calls
+from logging_setup import JsonFormatter, RequestContextFilter, configure_logging
+
+
+class StubMessages:
+    """Answers messages.create instantly, so only app overhead is measured"""
+
+    def create(self, **kwargs):
+        usage = SimpleNamespace(input_tokens=500, output_tokens=40,
+                                cache_read_input_tokens=0, cache_creation_input_tokens=0)
+        return SimpleNamespace(content=[SimpleNamespace(text="Try the bus twice a week! 🚌")], usage=usage)
+
+
+def use_sync_handler(stream):
+    """Replace the queue handler with a blocking one (the old print() behaviour)"""
+    configure_logging(level='DEBUG', stream=stream)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = logging.StreamHandler(stream)
+    handler.addFilter(RequestContextFilter())
+    handler.setFormatter(JsonFormatter())
+    root.addHandler(handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--log-file', default=os.path.join(tempfile.gettempdir(), 'bench_logging.log'))
+    args = parser.parse_args()
+
+    web.api_key = 'fake'  # an empty key gets the local offline reply
+    web.anthropic_client = SimpleNamespace(messages=StubMessages())
+    web.calculate_cache.max_entries = 0
+    client = web.app.test_client()
+    payloads = [{'answers': answers} for answers in answer_sets(args.requests, seed=2)]
+
+    def calculate(payload):
+        client.post('/api/calculate', json=payload)
+
+    def chat(i):
+        client.post('/chat', json={'message': 'How can I cut my emissions?', 'session_id': f'bench-{i % 100}',
+                                   'screen_context': 'start'})
+
+    modes = [
+        ('off', lambda stream: configure_logging(level='CRITICAL', stream=stream)),
+        ('info (queue)', lambda stream: configure_logging(level='INFO', stream=stream)),
+        ('debug (queue)', lambda stream: configure_logging(level='DEBUG', stream=stream)),
+        ('debug (sync)', use_sync_handler),
+    ]
+    with open(args.log_file, 'w') as stream:
+        for name, setup in modes:
+            setup(stream)
+            print(format_row(f'/api/calculate, {name}', summarize(*time_calls(calculate, payloads))))
+            print(format_row(f'/chat, {name}', summarize(*time_calls(chat, range(args.requests)))))
+    configure_logging()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Cost of collecting metrics
+
+    python -m benchmarks.bench_metrics [--calls N] [--requests N]
+
+- Recording: request_started + request_finished (what every request pays),
+  record_upstream with a usage object and record_error, called directly
+- Requests: GET /api/questions and cached POST /api/calculate through the
+  Flask test client, with the metrics hooks registered and removed
+- Scrape: rendering GET /metrics after the requests above
+"""
+
+import argparse
+import os
+import statistics
+import time
+from types import SimpleNamespace
+
+import metrics
+from benchmarks.synthetic import answer_sets
+from benchmarks.timing import format_row, summarize, time_calls
+
+
+def per_call_us(fn, calls, repeats=5):
+    """Median microseconds per call over repeats loops of calls"""
+    runs = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        runs.append((time.perf_counter() - start) / calls * 1e6)
+    return statistics.median(runs)
+
+
+def recording(calls):
+    usage = SimpleNamespace(input_tokens=1200, output_tokens=180, cache_read_input_tokens=900,
+                            cache_creation_input_tokens=0)
+    error = TimeoutError()
+    cases = [
+        ('request_started + request_finished',
+         lambda: metrics.request_finished(metrics.request_started('/api/calculate'), 'POST', 200)),
+        ('record_upstream (with usage)', lambda: metrics.record_upstream('create', 0.8, usage)),
+        ('record_error', lambda: metrics.record_error(error, '/chat')),
+    ]
+    for name, fn in cases:
+        print(f"{name:<40} {per_call_us(fn, calls):8.2f} µs/call")
+
+
+def metrics_hooks(web):
+    """The Flask hook lists with the metrics hooks in them"""
+    hooks = {web.begin_request_metrics: web.app.before_request_funcs[None],
+             web.end_request_metrics: web.app.after_request_funcs[None],
+             web.abort_request_metrics: web.app.teardown_request_funcs[None]}
+    return [(hook, funcs, funcs.index(hook)) for hook, funcs in hooks.items()]
+
+
+def requests(web, count):
+    client = web.app.test_client()
+    payloads = [{'answers': answers} for answers in answer_sets(50, seed=3)]
+    for payload in payloads:
+        client.post('/api/calculate', json=payload)
+    scenarios = [
+        ('GET /api/questions', lambda _: client.get('/api/questions')),
+        ('POST /api/calculate (hit)', lambda i: client.post('/api/calculate', json=payloads[i % len(payloads)])),
+    ]
+    hooks = metrics_hooks(web)
+    for name, fn in scenarios:
+        time_calls(fn, range(count // 10))
+        runs = {'on': [], 'off': []}
+        # Alternate hooks on/off so machine noise hits both equally
+        for _ in range(5):
+            for mode in ('off', 'on'):
+                for hook, funcs, index in hooks:
+                    if mode == 'off':
+                        funcs.remove(hook)
+                    else:
+                        funcs.insert(index, hook)
+                runs[mode].append(summarize(*time_calls(fn, range(count))))
+        medians = {mode: {key: statistics.median(run[key] for run in runs[mode]) for key in runs[mode][0]}
+                   for mode in runs}
+        print(format_row(f'{name}, metrics off', medians['off']))
+        print(format_row(f'{name}, metrics on', medians['on']))
+        print(f"{'':<34} overhead {(medians['on']['p50_ms'] - medians['off']['p50_ms']) * 1000:+.1f} µs at p50")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200_000)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ['MODEL_RELOAD_INTERVAL'] = '0'
+    import app as web
+
+    recording(args.calls)
+    print()
+    requests(web, args.requests)
+    print()
+    scrape = per_call_us(metrics.registry.render, 200)
+    print(f"{'GET /metrics render':<40} {scrape / 1000:8.2f} ms ({len(metrics.registry.render()):,} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Model startup time: model.cbm + pickles vs model.bundle
+
+    python -m benchmarks.bench_model_load --model-dir DIR [--repeats N]
+
+DIR must hold the older artifacts (model.cbm, encoders.pkl, scalers.pkl,
+feature_order.pkl); they are converted to a temporary bundle for the
+comparison. Every load runs in a fresh interpreter, so the time includes the
+imports each path pulls in (unpickling LabelEncoder/StandardScaler imports
+scikit-learn). The catboost import both paths need is timed separately.
+Times are medians over --repeats runs.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from model_bundle import convert_artifacts
+
+CHILD = '''
+import sys, time
+start = time.perf_counter()
+import inference
+imported = time.perf_counter()
+import catboost
+catboost_loaded = time.perf_counter()
+if sys.argv[1] == 'pickles':
+    inference.load_artifacts(sys.argv[2])
+else:
+    inference.load_bundle(sys.argv[2])
+done = time.perf_counter()
+print(imported - start, catboost_loaded - imported, done - catboost_loaded, done - start, 'sklearn' in sys.modules)
+'''
+
+
+def run(kind, path):
+    output = subprocess.run([sys.executable, '-c', CHILD, kind, path], check=True, capture_output=True,
+                            text=True, env={**os.environ, 'LOG_LEVEL': 'WARNING'}).stdout.split()
+    return [float(value) for value in output[:4]], output[4] == 'True'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model-dir', required=True)
+    parser.add_argument('--repeats', type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle = os.path.join(tmp, 'model.bundle')
+        convert_artifacts(args.model_dir, bundle)
+        pickle_bytes = sum(os.path.getsize(os.path.join(args.model_dir, name))
+                           for name in ('model.cbm', 'encoders.pkl', 'scalers.pkl', 'feature_order.pkl'))
+        print(f"{'artifacts':<10} {'size':>10} {'inference':>10} {'catboost':>10} {'load':>10} {'total':>10}"
+              f"  sklearn imported")
+        for kind, path, size in (('pickles', args.model_dir, pickle_bytes),
+                                 ('bundle', bundle, os.path.getsize(bundle))):
+            runs = [run(kind, path) for _ in range(args.repeats)]
+            medians = [statistics.median(times[i] for times, _ in runs) * 1000 for i in range(4)]
+            print(f"{kind:<10} {size / 1024:>7,.0f} KiB " + ' '.join(f"{ms:>7.1f} ms" for ms in medians)
+                  + f"  {runs[0][1]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+train_model.py preprocessing: per-row apply loops vs the vectorized pipeline
+
+    python -m benchmarks.bench_pipeline [--sizes 10000 1000000 10000000] [--legacy-max-rows N]
+
+Times the previous train_model.py preprocessing (literal_eval per row, one
+apply pass per list item, LabelEncoder/StandardScaler per column) against
+FeaturePipeline.fit_transform on synthetic survey frames. The legacy path
+is skipped above --legacy-max-rows.
+"""
+
+import argparse
+import ast
+import time
+
+import numpy as np
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from benchmarks.synthetic import survey_frame
+from feature_pipeline import CAT_COLUMNS, COLUMNS, NUM_COLUMNS, FeaturePipeline, prepare_frame
+
+
+def legacy_preprocess(df):
+    """The preprocessing train_model.py used to do"""
+    df = df.copy()
+    df.columns = COLUMNS
+    df.replace(np.nan, 'None', inplace=True)
+
+    df['Recycling'] = df['Recycling'].apply(ast.literal_eval)
+    recycling_items = list(set(item for sublist in df['Recycling'] for item in sublist))
+    df['Cooking'] = df['Cooking'].apply(ast.literal_eval)
+    cooking_items = list(set(item for sublist in df['Cooking'] for item in sublist))
+    for item in recycling_items:
+        df[item] = df['Recycling'].apply(lambda x: 1 if item in x else 0)
+    for item in cooking_items:
+        df[item] = df['Cooking'].apply(lambda x: 1 if item in x else 0)
+    df = df.drop(columns=['Recycling', 'Cooking'])
+
+    for col in CAT_COLUMNS:
+        df[col] = LabelEncoder().fit_transform(df[col])
+    for column in NUM_COLUMNS:
+        df[column] = StandardScaler().fit_transform(df[[column]])
+    return df
+
+
+def pipeline_preprocess(df):
+    return FeaturePipeline().fit_transform(prepare_frame(df))
+
+
+def timed(fn, df):
+    start = time.perf_counter()
+    fn(df)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument('--legacy-max-rows', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'legacy':>12} {'pipeline':>12} {'speedup':>9} {'pipeline rows/s':>17}")
+    for rows in args.sizes:
+        df = survey_frame(rows, seed=args.seed)
+        pipeline = timed(pipeline_preprocess, df)
+        if rows <= args.legacy_max_rows:
+            legacy = timed(legacy_preprocess, df)
+            legacy_text, speedup = f"{legacy:10.2f} s", f"{legacy / pipeline:8.1f}x"
+        else:
+            legacy_text, speedup = f"{'skipped':>12}", f"{'-':>9}"
+        print(f"{rows:>12,} {legacy_text} {pipeline:10.2f} s {speedup} {rows / pipeline:>17,.0f}")
+        del df
+
+
+if __name__ == '__main__':
+    main()
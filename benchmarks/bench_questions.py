@@ -0,0 +1,58 @@
+"""
+/api/questions cost: per-request sample + jsonify vs the pre-serialized catalog
+
+    python -m benchmarks.bench_questions [--requests N]
+
+Rows:
+    jsonify (old handler)    - copy, tag and jsonify the sampled questions
+    catalog.payload          - shuffle pre-serialized fragments and join them
+    GET /api/questions       - full request through the Flask test client
+"""
+
+import argparse
+import copy
+import random
+
+from flask import jsonify
+
+import app as web
+from benchmarks.timing import format_row, summarize, time_calls
+from quiz_data import QUESTIONS
+
+
+def old_handler(questions):
+    """The previous api_get_questions body (on a private copy of QUESTIONS)"""
+    all_questions = []
+    for category in questions:
+        picked = random.sample(questions[category], min(3, len(questions[category])))
+        for q in picked:
+            q['category'] = category
+        all_questions.extend(picked)
+    random.shuffle(all_questions)
+    return jsonify(all_questions).get_data()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20000)
+    args = parser.parse_args()
+
+    inputs = range(args.requests)
+    questions = copy.deepcopy(QUESTIONS)
+
+    with web.app.app_context():
+        old = summarize(*time_calls(lambda _: old_handler(questions), inputs))
+    print(format_row('jsonify (old handler)', old))
+
+    catalog = summarize(*time_calls(lambda _: web.question_catalog.payload(per_category=3), inputs))
+    print(format_row('catalog.payload', catalog))
+
+    client = web.app.test_client()
+    route = summarize(*time_calls(lambda _: client.get('/api/questions'), inputs))
+    print(format_row('GET /api/questions', route))
+
+    print(f"\nPer-request build cost: {old['p50_ms'] * 1000:.1f} µs -> {catalog['p50_ms'] * 1000:.1f} µs (p50)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+/chat tail latency with a healthy, erroring, stalling and failed upstream: SDK defaults vs upstream.py
+
+    python -m benchmarks.bench_upstream [--chats N] [--deadline S] [--stall-ms MS]
+
+Sends results-screen chats one after another through the Flask test client,
+against the local fake Anthropic API, in four scenarios:
+
+    healthy  - 200-300 ms replies
+    errors   - 20% of calls answered 529 (overloaded)
+    tail     - 10% of calls stall for --stall-ms
+    outage   - every call answered 529
+
+"before" is the previous client, Anthropic(api_key=...) with the SDK's
+defaults (2 retries, 600 s timeout). "after" is upstream.create_client with
+a --deadline second budget (scaled down with the stall so a run stays short)
+and a fresh circuit breaker per scenario.
+"""
+
+import argparse
+import os
+import random
+import time
+
+from benchmarks.fake_anthropic import start_fake_server
+from benchmarks.timing import summarize
+
+SCENARIOS = (
+    ('healthy', {}, 1),
+    ('errors', {'error_rate': 0.2}, 1),
+    ('tail', {'slow_rate': 0.1}, 1),
+    ('outage', {'error_rate': 1.0}, 0.5),  # share of --chats
+)
+
+
+def run(web, chats):
+    """Send chats; returns (latencies, status counts)"""
+    client = web.app.test_client()
+    latencies, statuses = [], {}
+    for index in range(chats):
+        start = time.perf_counter()
+        response = client.post('/chat', json={'message': 'What should I change first?', 'screen_context': 'results',
+                                              'session_id': f'bench-upstream-{time.monotonic_ns()}-{index}'})
+        latencies.append(time.perf_counter() - start)
+        body = response.get_json() or {}
+        outcome = 'fallback' if body.get('fallback') else str(response.status_code)
+        statuses[outcome] = statuses.get(outcome, 0) + 1
+    return latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chats', type=int, default=50)
+    parser.add_argument('--deadline', type=float, default=3, help="CHAT_DEADLINE for the 'after' client")
+    parser.add_argument('--stall-ms', type=float, default=6000, help="Delay of the stalled calls (tail)")
+    args = parser.parse_args()
+
+    os.environ.setdefault('LOG_LEVEL', 'CRITICAL')
+    os.environ['MODEL_RELOAD_INTERVAL'] = '0'
+    from anthropic import Anthropic
+
+    import app as web
+    import upstream
+
+    web.api_key = 'fake'  # an empty key gets the local offline reply
+    fake = start_fake_server(latency_ms=200, jitter_ms=100, token_delay_ms=0, slow_ms=args.stall_ms)
+    clients = {
+        'before': lambda: Anthropic(api_key='fake', base_url=fake.url),
+        'after': lambda: upstream.create_client('fake', upstream.CircuitBreaker(), base_url=fake.url,
+                                                deadline=args.deadline),
+    }
+    print(f"\n{args.chats} sequential /chat requests per scenario, 'after' deadline {args.deadline:g} s\n")
+    print(f"{'scenario':<9} {'client':<7} {'upstream':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  outcomes")
+    try:
+        for scenario, config, share in SCENARIOS:
+            for name, make_client in clients.items():
+                fake.config.error_rate = config.get('error_rate', 0.0)
+                fake.config.slow_rate = config.get('slow_rate', 0.0)
+                fake.config.rng = random.Random(1)  # both clients see the same errors and stalls
+                web.anthropic_client = make_client()
+                before = fake.config.requests
+                latencies, statuses = run(web, max(1, int(args.chats * share)))
+                stats = summarize(latencies, sum(latencies))
+                outcomes = ', '.join(f'{outcome} x{count}' for outcome, count in sorted(statuses.items()))
+                print(f"{scenario:<9} {name:<7} {fake.config.requests - before:>9} {stats['p50_ms']:>6.0f} ms "
+                      f"{stats['p95_ms']:>6.0f} ms {stats['p99_ms']:>6.0f} ms {max(latencies) * 1000:>6.0f} ms  "
+                      f"{outcomes}")
+                web.anthropic_client.close()
+    finally:
+        fake.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""
+Local fake of the Anthropic Messages API for load tests
+Answers POST /v1/messages (plain and streaming) after a configurable delay,
+optionally failing a share of requests or stalling them (slow tail).
+
+    python -m benchmarks.fake_anthropic --port 8089 --latency-ms 1500
+
+Point the app at it with ANTHROPIC_BASE_URL=http://127.0.0.1:8089 and any
+ANTHROPIC_API_KEY.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = ("Great question! Switching to public transport a few days a week could cut your "
+                 "Mobility emissions by ~400 kg a year - that's like planting 20 trees. 🌳")
+
+
+class FakeAnthropicConfig:
+    """
+    Behaviour of the fake server
+
+    Args:
+        latency_ms: Delay before the response starts
+        jitter_ms: Extra uniform random delay on top of latency_ms
+        token_delay_ms: Delay between streamed text chunks
+        error_rate: Share of requests answered with error_status
+        error_status: HTTP status used for injected errors (529 = overloaded)
+        slow_rate: Share of requests delayed by slow_ms on top of the latency
+        slow_ms: Extra delay of the slow requests
+        reply: Assistant text returned for every request
+    """
+
+    def __init__(self, latency_ms=1000, jitter_ms=0, token_delay_ms=20, error_rate=0.0,
+                 error_status=529, slow_rate=0.0, slow_ms=10000, reply=DEFAULT_REPLY, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.token_delay_ms = token_delay_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.reply = reply
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+
+ERROR_TYPES = {
+    400: 'invalid_request_error',
+    401: 'authentication_error',
+    429: 'rate_limit_error',
+    500: 'api_error',
+    529: 'overloaded_error',
+}
+
+
+class FakeAnthropicHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; without TCP_NODELAY, Nagle +
+    # delayed ACK would add ~40 ms to every response
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up (e.g. its deadline passed)
+
+    def _sse(self, event, payload):
+        self.wfile.write(f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+    def do_POST(self):
+        config = self.server.config
+        length = int(self.headers.get('Content-Length', 0))
+        raw = self.rfile.read(length)
+        if not self.path.startswith('/v1/messages'):
+            self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+            return
+
+        request = json.loads(raw or b'{}')
+        with config.lock:
+            config.requests += 1
+            fail = config.rng.random() < config.error_rate
+            delay = config.latency_ms + config.rng.uniform(0, config.jitter_ms)
+            if config.slow_rate and config.rng.random() < config.slow_rate:
+                delay += config.slow_ms
+            if fail:
+                config.errors += 1
+        time.sleep(delay / 1000)
+
+        if fail:
+            status = config.error_status
+            self._send_json(status, {"type": "error", "error": {
+                "type": ERROR_TYPES.get(status, 'api_error'), "message": "Injected failure"}})
+            return
+
+        input_tokens = max(1, len(raw) // 4)
+        words = config.reply.split(' ')
+        output_tokens = len(words)
+        message = {
+            "id": "msg_fake",
+            "type": "message",
+            "role": "assistant",
+            "model": request.get('model', 'fake'),
+            "content": [],
+            "stop_reason": None,
+            "stop_sequence": None,
+            "usage": {"input_tokens": input_tokens, "output_tokens": 0,
+                      "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0},
+        }
+
+        if not request.get('stream'):
+            message["content"] = [{"type": "text", "text": config.reply}]
+            message["stop_reason"] = "end_turn"
+            message["usage"]["output_tokens"] = output_tokens
+            self._send_json(200, message)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        try:
+            self._sse('message_start', {"type": "message_start", "message": message})
+            self._sse('content_block_start', {"type": "content_block_start", "index": 0,
+                                              "content_block": {"type": "text", "text": ""}})
+            for i, word in enumerate(words):
+                text = word if i == 0 else ' ' + word
+                self._sse('content_block_delta', {"type": "content_block_delta", "index": 0,
+                                                  "delta": {"type": "text_delta", "text": text}})
+                time.sleep(config.token_delay_ms / 1000)
+            self._sse('content_block_stop', {"type": "content_block_stop", "index": 0})
+            self._sse('message_delta', {"type": "message_delta",
+                                        "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                        "usage": {"output_tokens": output_tokens}})
+            self._sse('message_stop', {"type": "message_stop"})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def start_fake_server(host='127.0.0.1', port=0, **config):
+    """
+    Start the fake API on a background thread
+
+    Returns:
+        ThreadingHTTPServer: with .url and .config; call shutdown() to stop
+    """
+    server = ThreadingHTTPServer((host, port), FakeAnthropicHandler)
+    server.daemon_threads = True
+    server.config = FakeAnthropicConfig(**config)
+    server.url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, name='fake-anthropic', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency-ms', type=float, default=1000)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--token-delay-ms', type=float, default=20)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=529)
+    parser.add_argument('--slow-rate', type=float, default=0.0)
+    parser.add_argument('--slow-ms', type=float, default=10000)
+    args = parser.parse_args()
+
+    server = start_fake_server(args.host, args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                               token_delay_ms=args.token_delay_ms, error_rate=args.error_rate,
+                               error_status=args.error_status, slow_rate=args.slow_rate, slow_ms=args.slow_ms)
+    print(f"Fake Anthropic API listening on {server.url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
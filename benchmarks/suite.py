@@ -0,0 +1,219 @@
+"""
+Hot-path benchmark suite with saved baselines and a regression gate
+
+    python -m benchmarks.suite [--save] [--baseline PATH] [--threshold 0.25] [--only NAME ...]
+                               [--requests N] [--rounds N] [--chat-requests N] [--chat-latency-ms MS]
+
+Scenarios (inputs from the seeded answer generator in benchmarks.synthetic):
+    calculate_emission         - ml_calculator.calculate_emission, called directly
+    prompt build               - PromptBuilder.build for a new session with results and answers
+    GET /api/questions         - Flask test client
+    POST /api/calculate (miss) - response cache disabled, every request scored
+    POST /api/calculate (hit)  - the same answer sets again with the cache on
+    POST /calculate-results    - legacy route
+    POST /chat                 - against a local fake Anthropic API (--chat-latency-ms), answer
+                                 cache and local coach off
+
+Each scenario reports throughput and p50/p95/p99 latency after a short
+warm-up, as the median of --rounds runs interleaved across scenarios
+(sub-millisecond tails are noisy on a single pass). --save writes the results to the baseline file. Otherwise, if a
+baseline exists, every --metrics value is compared with it and the run exits
+with status 1 when any gated metric is more than --threshold worse.
+Baselines are machine-specific; record one before a change and compare after.
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+from benchmarks.fake_anthropic import start_fake_server
+from benchmarks.synthetic import answer_sets
+from benchmarks.timing import format_row, summarize, time_calls
+from ml_calculator import calculate_emission
+from response_cache import ResponseCache
+
+DEFAULT_BASELINE = os.path.join('.benchmarks', 'baseline.json')
+LATENCY_METRICS = ('p50_ms', 'p95_ms', 'p99_ms')
+CHAT_MESSAGE = 'How can I cut my emissions?'
+
+
+def load_app(fake_url):
+    """
+    Import the app quietly, with its Claude client (upstream.py, as served) pointed at the fake server
+    The answer cache and the local coach are off, so every chat measures the upstream path.
+    """
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ['MODEL_RELOAD_INTERVAL'] = '0'
+    import app as web
+    import upstream
+    from answer_cache import AnswerCache
+
+    web.api_key = 'fake-key'
+    web.anthropic_client = upstream.create_client(web.api_key, web.upstream_breaker, base_url=fake_url)
+    web.answer_cache = AnswerCache(max_entries=0)
+    web.LOCAL_COACH = 'off'
+    return web
+
+
+def scenarios(web, args):
+    """Yield (name, fn, inputs) for every scenario"""
+    client = web.app.test_client()
+    sets = answer_sets(args.requests, seed=args.seed)
+
+    yield 'calculate_emission', calculate_emission, sets
+
+    results_payloads = [web.calculate_response(answers)[0] for answers in sets[:50]]
+
+    session_ids = itertools.count()
+
+    def build_prompt(i):
+        session_id = f'bench-prompt-{next(session_ids)}'
+        web.prompt_builder.build(session_id, 'results', None, results_payloads[i % len(results_payloads)],
+                                 list(sets[i].values()))
+        web.prompt_builder.forget(session_id)
+    yield 'prompt build', build_prompt, range(len(sets))
+
+    yield 'GET /api/questions', lambda _: client.get('/api/questions'), range(args.requests)
+
+    calculate_payloads = [{'answers': answers} for answers in sets]
+    shared_cache, no_cache = web.calculate_cache, ResponseCache(max_entries=0)
+
+    def calculate_miss(payload):
+        web.calculate_cache = no_cache
+        try:
+            client.post('/api/calculate', json=payload)
+        finally:
+            web.calculate_cache = shared_cache
+
+    yield 'POST /api/calculate (miss)', calculate_miss, calculate_payloads
+
+    shared_cache.clear()
+    for payload in calculate_payloads:
+        client.post('/api/calculate', json=payload)
+    yield 'POST /api/calculate (hit)', lambda payload: client.post('/api/calculate', json=payload), calculate_payloads
+
+    legacy_payloads = [{'answers': list(answers.values())} for answers in sets]
+    yield 'POST /calculate-results', lambda payload: client.post('/calculate-results', json=payload), legacy_payloads
+
+    def chat(i):
+        response = client.post('/chat', json={'message': CHAT_MESSAGE, 'session_id': f'bench-chat-{i % 50}',
+                                              'screen_context': 'start'})
+        if response.status_code != 200 or not response.json.get('success'):
+            raise RuntimeError(f"/chat failed: {response.status_code} {response.get_data(as_text=True)[:200]}")
+    yield 'POST /chat', chat, range(args.chat_requests)
+
+
+def run(args):
+    """Run the selected scenarios; returns {name: stats}"""
+    fake = start_fake_server(latency_ms=args.chat_latency_ms, token_delay_ms=0)
+    try:
+        web = load_app(fake.url)
+        selected = [(name, fn, list(inputs)) for name, fn, inputs in scenarios(web, args)
+                    if not args.only or name in args.only]
+        for _, fn, inputs in selected:
+            for item in inputs[:max(1, len(inputs) // 20)]:
+                fn(item)
+
+        # Rounds are interleaved across scenarios so a slow patch on the
+        # machine doesn't land on a single scenario
+        rounds = {name: [] for name, _, _ in selected}
+        for _ in range(args.rounds):
+            for name, fn, inputs in selected:
+                gc.collect()
+                rounds[name].append(summarize(*time_calls(fn, inputs)))
+
+        results = {}
+        for name, runs in rounds.items():
+            results[name] = {metric: statistics.median(run_[metric] for run_ in runs) for metric in runs[0]}
+            print(format_row(name, results[name]))
+        return results
+    finally:
+        fake.shutdown()
+
+
+def machine_info():
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()}
+
+
+def compare(results, baseline, metrics, threshold):
+    """
+    Compare results with a baseline
+
+    Returns:
+        list: (scenario, metric, baseline value, current value, relative change, regressed) rows
+    """
+    rows = []
+    for name, stats in results.items():
+        reference = baseline['results'].get(name)
+        if reference is None:
+            continue
+        for metric in metrics:
+            before, after = reference[metric], stats[metric]
+            if not before:
+                continue
+            change = (after - before) / before
+            # Latency regresses upwards, throughput downwards
+            worse = change if metric in LATENCY_METRICS else -change
+            rows.append((name, metric, before, after, change, worse > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000, help="Calls per scenario (except /chat)")
+    parser.add_argument('--rounds', type=int, default=5, help="Runs per scenario; the median is reported")
+    parser.add_argument('--chat-requests', type=int, default=100)
+    parser.add_argument('--chat-latency-ms', type=float, default=50, help="Fake Anthropic API response delay")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='+', help="Run only these scenarios (names as printed)")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save', action='store_true', help="Write the results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.25, help="Allowed relative regression (0.25 = 25%%)")
+    parser.add_argument('--metrics', nargs='+', default=['throughput', 'p50_ms'],
+                        choices=['throughput', *LATENCY_METRICS], help="Metrics the gate checks")
+    args = parser.parse_args()
+
+    config = {'requests': args.requests, 'rounds': args.rounds, 'chat_requests': args.chat_requests,
+              'chat_latency_ms': args.chat_latency_ms, 'seed': args.seed}
+    results = run(args)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump({'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'machine': machine_info(), 'config': config,
+                       'results': results}, f, indent=2)
+        print(f"\n💾 Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline} - run with --save to record one")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get('config') != config:
+        print(f"\n⚠️  Baseline was recorded with {baseline.get('config')}, this run used {config}")
+    if baseline.get('machine') != machine_info():
+        print(f"⚠️  Baseline was recorded on {baseline.get('machine')}")
+
+    rows = compare(results, baseline, args.metrics, args.threshold)
+    print(f"\nCompared with {args.baseline} ({baseline.get('created')}), threshold {args.threshold:.0%}:")
+    for name, metric, before, after, change, regressed in rows:
+        status = '❌ REGRESSED' if regressed else 'ok'
+        print(f"{name:<34} {metric:>10} {before:>12,.3f} -> {after:>12,.3f} {change:>+8.1%}  {status}")
+
+    regressions = [row for row in rows if row[-1]]
+    if regressions:
+        print(f"\n❌ {len(regressions)} metric(s) regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+    print("\n✅ No regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Seeded synthetic data for the benchmarks
+- Quiz answer sets shaped like the /api/calculate payload (from QUESTIONS)
+- Survey frames shaped like the raw Carbon Emission CSV (for train_model.py)
+"""
+
+import itertools
+import random
+
+from quiz_data import QUESTIONS
+
+
+def generate_answers(rng):
+    """Generate one answer set keyed by question id (as the frontend posts it)"""
+    answers = {}
+    questions = [(category, q) for category, qs in QUESTIONS.items() for q in qs]
+    rng.shuffle(questions)
+
+    for number, (category, question) in enumerate(questions, 1):
+        answer = {
+            'category': category,
+            'questionText': question['question'],
+            'questionNumber': number,
+            'type': question.get('type', 'multiple_choice'),
+        }
+        if question.get('type') == 'slider':
+            value = rng.randint(question['min'], question['max'])
+            answer['sliderValue'] = value
+            answer['selectedOption'] = f"{value} {question['unit']}"
+            answer['co2'] = round(value * question['co2_per_unit'])
+        else:
+            option = rng.choice(question['options'])
+            answer['selectedOption'] = option['text']
+            answer['co2'] = option['co2']
+        answers[str(question['id'])] = answer
+
+    return answers
+
+
+def answer_sets(count, seed=0):
+    """Return a reproducible list of count answer sets"""
+    rng = random.Random(seed)
+    return [generate_answers(rng) for _ in range(count)]
+
+
+# Raw survey values per column (raw CSV column order, list/target columns aside)
+SURVEY_VALUES = {
+    'Body Type': ['normal', 'obese', 'overweight', 'underweight'],
+    'Sex': ['female', 'male'],
+    'Diet': ['omnivore', 'pescatarian', 'vegan', 'vegetarian'],
+    'How Often Shower': ['daily', 'less frequently', 'more frequently', 'twice a day'],
+    'Heating Energy Source': ['coal', 'electricity', 'natural gas', 'wood'],
+    'Transport': ['private', 'public', 'walk/bicycle'],
+    'Vehicle Type': [None, 'diesel', 'electric', 'hybrid', 'lpg', 'petrol'],
+    'Social Activity': ['never', 'often', 'sometimes'],
+    'Monthly Grocery Bill': (50, 300),
+    'Frequency of Traveling by Air': ['frequently', 'never', 'rarely', 'very frequently'],
+    'Vehicle Monthly Distance Km': (0, 10000),
+    'Waste Bag Size': ['extra large', 'large', 'medium', 'small'],
+    'Waste Bag Weekly Count': (1, 8),
+    'How Long TV PC Daily Hour': (0, 25),
+    'How Many New Clothes Monthly': (0, 51),
+    'How Long Internet Daily Hour': (0, 25),
+    'Energy efficiency': ['No', 'Sometimes', 'Yes'],
+}
+RECYCLING_ITEMS = ['Paper', 'Plastic', 'Glass', 'Metal']
+COOKING_ITEMS = ['Stove', 'Oven', 'Microwave', 'Grill', 'Airfryer']
+
+
+def _list_strings(items, min_size, rng):
+    """Every subset of items as the CSV writes it (shuffled item order)"""
+    strings = []
+    for size in range(min_size, len(items) + 1):
+        for combo in itertools.combinations(items, size):
+            combo = list(combo)
+            rng.shuffle(combo)
+            strings.append(repr(combo))
+    return strings
+
+
+def survey_frame(rows, seed=0):
+    """
+    Raw survey DataFrame with the Carbon Emission CSV's columns
+
+    Values are drawn independently per column (vectorized), with a target
+    loosely driven by heating, flights, distance and spending.
+    """
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for column, values in SURVEY_VALUES.items():
+        if isinstance(values, tuple):
+            columns[column] = rng.integers(values[0], values[1], rows)
+        else:
+            columns[column] = np.array(values, dtype=object)[rng.integers(0, len(values), rows)]
+
+    list_rng = random.Random(seed)
+    for column, items, min_size in (('Recycling', RECYCLING_ITEMS, 0), ('Cooking_With', COOKING_ITEMS, 1)):
+        strings = np.array(_list_strings(items, min_size, list_rng), dtype=object)
+        columns[column] = strings[rng.integers(0, len(strings), rows)]
+
+    heating = {'coal': 900, 'electricity': 300, 'natural gas': 500, 'wood': 700}
+    flight = {'frequently': 900, 'never': 0, 'rarely': 300, 'very frequently': 1600}
+    target = (300 + pd.Series(columns['Heating Energy Source']).map(heating).to_numpy()
+              + pd.Series(columns['Frequency of Traveling by Air']).map(flight).to_numpy()
+              + 0.2 * columns['Vehicle Monthly Distance Km'] + 2 * columns['Monthly Grocery Bill']
+              + 40 * columns['Waste Bag Weekly Count'] + 10 * columns['How Many New Clothes Monthly']
+              + rng.normal(0, 50, rows))
+    columns['CarbonEmission'] = target.round().astype(np.int64)
+    return pd.DataFrame(columns)
@@ -0,0 +1,47 @@
+"""
+Latency/throughput helpers shared by the benchmarks
+"""
+
+import time
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, round(pct / 100 * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+def summarize(latencies, elapsed):
+    """
+    Summarize per-call latencies (seconds) and total wall time
+
+    Returns:
+        dict: count, throughput (calls/s) and p50/p95/p99 latency in ms
+    """
+    ordered = sorted(latencies)
+    return {
+        'count': len(ordered),
+        'throughput': len(ordered) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(ordered, 50) * 1000,
+        'p95_ms': percentile(ordered, 95) * 1000,
+        'p99_ms': percentile(ordered, 99) * 1000,
+    }
+
+
+def time_calls(fn, inputs):
+    """Call fn on each input sequentially; returns (latencies, elapsed)"""
+    latencies = []
+    start = time.perf_counter()
+    for item in inputs:
+        t0 = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - t0)
+    return latencies, time.perf_counter() - start
+
+
+def format_row(name, stats):
+    """One aligned report line"""
+    return (f"{name:<34} {stats['throughput']:>12,.0f}/s   p50 {stats['p50_ms']:8.3f} ms   "
+            f"p95 {stats['p95_ms']:8.3f} ms   p99 {stats['p99_ms']:8.3f} ms")
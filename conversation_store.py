@@ -0,0 +1,301 @@
+"""
+EcoCoach Conversation Store
+Per-session chat history with pluggable backends:
+
+- MemoryConversationStore: in-process LRU with TTL and a memory cap
+- SQLiteConversationStore: one file shared by every worker on a host
+- RedisConversationStore: any Redis-protocol server (or a stand-in such as fakeredis)
+
+Every backend cleans and trims history on save, so callers just load,
+append and save.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Seconds a Redis session scan (for /metrics) is reused before rescanning
+CHAT_STORE_STATS_INTERVAL = float(os.environ.get('CHAT_STORE_STATS_INTERVAL', 30))
+
+
+def clean_history(messages):
+    """Drop malformed or empty messages and make sure content is a string"""
+    cleaned_history = []
+    for i, msg in enumerate(messages):
+        if 'role' not in msg or 'content' not in msg:
+            logger.warning("Message %d missing required fields: %s", i, msg)
+            continue
+        if not str(msg.get('content', '')).strip():
+            logger.warning("Message %d has empty content, skipping", i)
+            continue
+        # Ensure content is a string
+        if not isinstance(msg['content'], str):
+            logger.warning("Message %d content is not a string: %s", i, type(msg['content']))
+            msg['content'] = str(msg['content'])
+        cleaned_history.append(msg)
+    return cleaned_history
+
+
+def history_size(messages):
+    """Approximate stored size of a history in bytes"""
+    return sum(len(msg['content'].encode('utf-8')) + len(msg['role']) for msg in messages)
+
+
+class ConversationStore:
+    """
+    Base class for conversation backends
+
+    Args:
+        max_messages: Messages kept per session (older ones are trimmed on save)
+        ttl_seconds: Idle time after which a session expires (None = never)
+    """
+
+    def __init__(self, max_messages=10, ttl_seconds=None):
+        self.max_messages = max_messages
+        self.ttl_seconds = ttl_seconds
+
+    def prepare(self, messages):
+        """Clean a history and trim it to the last max_messages (a leading summary entry is kept)"""
+        messages = clean_history(messages)
+        if messages and messages[0].get('summary'):
+            return messages[:1] + messages[1:][-self.max_messages:]
+        return messages[-self.max_messages:]
+
+    def load(self, session_id):
+        """Return the stored history for a session (empty list if none)"""
+        raise NotImplementedError
+
+    def save(self, session_id, messages):
+        """Clean, trim and store a session's history"""
+        raise NotImplementedError
+
+    def clear(self, session_id):
+        """Forget a session"""
+        raise NotImplementedError
+
+    def stats(self):
+        """Return {'sessions': live session count, 'bytes': total message bytes}"""
+        raise NotImplementedError
+
+
+class MemoryConversationStore(ConversationStore):
+    """
+    In-process LRU store with TTL expiry and a memory cap
+
+    Least recently used sessions are evicted once there are more than
+    max_sessions or their messages exceed max_bytes in total.
+    """
+
+    def __init__(self, max_messages=10, ttl_seconds=3600, max_sessions=10000,
+                 max_bytes=64 * 1024 * 1024):
+        super().__init__(max_messages, ttl_seconds)
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._sessions = OrderedDict()  # session_id -> (expires_at, messages, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _expires_at(self):
+        return time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+
+    def _drop(self, session_id):
+        _, _, size = self._sessions.pop(session_id)
+        self._bytes -= size
+
+    def load(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return []
+            expires_at, messages, _ = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._drop(session_id)
+                return []
+            # Touching a session refreshes its TTL and LRU position
+            self._sessions[session_id] = (self._expires_at(), messages, entry[2])
+            self._sessions.move_to_end(session_id)
+            return list(messages)
+
+    def save(self, session_id, messages):
+        messages = self.prepare(messages)
+        size = history_size(messages)
+        with self._lock:
+            if session_id in self._sessions:
+                self._drop(session_id)
+            self._sessions[session_id] = (self._expires_at(), messages, size)
+            self._bytes += size
+            self._evict()
+
+    def _evict(self):
+        # Expired sessions first (oldest are at the front), then LRU over the caps
+        now = time.monotonic()
+        while self._sessions:
+            session_id, (expires_at, _, _) = next(iter(self._sessions.items()))
+            over_cap = len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes
+            expired = expires_at is not None and expires_at <= now
+            if not (over_cap or expired):
+                break
+            self._drop(session_id)
+
+    def clear(self, session_id):
+        with self._lock:
+            if session_id in self._sessions:
+                self._drop(session_id)
+
+    def stats(self):
+        with self._lock:
+            return {'sessions': len(self._sessions), 'bytes': self._bytes}
+
+
+class SQLiteConversationStore(ConversationStore):
+    """
+    SQLite-backed store that several worker processes on one host can share
+
+    Uses WAL mode and one connection per thread. Expired rows are ignored on
+    read and purged periodically on write.
+    """
+
+    PURGE_INTERVAL = 60  # seconds between expired-row purges
+
+    def __init__(self, path='conversations.db', max_messages=10, ttl_seconds=3600):
+        super().__init__(max_messages, ttl_seconds)
+        self.path = path
+        self._local = threading.local()
+        self._last_purge = 0.0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                "session_id TEXT PRIMARY KEY, messages TEXT NOT NULL, "
+                "size INTEGER NOT NULL, expires_at REAL)"
+            )
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, session_id):
+        row = self._connection().execute(
+            "SELECT messages FROM conversations WHERE session_id = ? "
+            "AND (expires_at IS NULL OR expires_at > ?)",
+            (session_id, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else []
+
+    def save(self, session_id, messages):
+        messages = self.prepare(messages)
+        now = time.time()
+        expires_at = now + self.ttl_seconds if self.ttl_seconds else None
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO conversations (session_id, messages, size, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                (session_id, json.dumps(messages), history_size(messages), expires_at)
+            )
+            if now - self._last_purge > self.PURGE_INTERVAL:
+                self._last_purge = now
+                conn.execute("DELETE FROM conversations WHERE expires_at <= ?", (now,))
+
+    def clear(self, session_id):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM conversations WHERE session_id = ?", (session_id,))
+
+    def stats(self):
+        sessions, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM conversations "
+            "WHERE expires_at IS NULL OR expires_at > ?",
+            (time.time(),)
+        ).fetchone()
+        return {'sessions': sessions, 'bytes': size}
+
+
+class RedisConversationStore(ConversationStore):
+    """
+    Redis-backed store; expiry is handled by Redis key TTLs
+
+    Only needs get/set(ex=)/delete/scan_iter/strlen from the client, so a
+    local stand-in (e.g. fakeredis) can be passed as client.
+    """
+
+    def __init__(self, client=None, url='redis://localhost:6379/0', prefix='ecotrace:chat:',
+                 max_messages=10, ttl_seconds=3600, stats_interval=CHAT_STORE_STATS_INTERVAL):
+        super().__init__(max_messages, ttl_seconds)
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        self.stats_interval = stats_interval
+        self._stats = None
+        self._stats_at = 0.0
+        self._stats_lock = threading.Lock()
+
+    def load(self, session_id):
+        raw = self.client.get(self.prefix + session_id)
+        return json.loads(raw) if raw else []
+
+    def save(self, session_id, messages):
+        self.client.set(self.prefix + session_id, json.dumps(self.prepare(messages)),
+                        ex=self.ttl_seconds or None)
+
+    def clear(self, session_id):
+        self.client.delete(self.prefix + session_id)
+
+    def stats(self):
+        """
+        Session count and bytes, rescanned at most every stats_interval seconds
+        A scan costs a round trip per session (strlen), and keys expire on the
+        server, so /metrics scrapes reuse the last scan instead of counting on save.
+        """
+        with self._stats_lock:
+            if self._stats is not None and time.monotonic() - self._stats_at < self.stats_interval:
+                return self._stats
+            sessions = size = 0
+            for key in self.client.scan_iter(match=self.prefix + '*', count=1000):
+                sessions += 1
+                size += self.client.strlen(key)
+            self._stats, self._stats_at = {'sessions': sessions, 'bytes': size}, time.monotonic()
+            return self._stats
+
+
+def create_conversation_store(max_messages=10):
+    """
+    Build the store selected by the environment
+
+    CHAT_STORE: memory (default), sqlite or redis
+    CHAT_SESSION_TTL: idle seconds before a session expires (default 3600)
+    CHAT_STORE_PATH: SQLite file (default conversations.db)
+    CHAT_STORE_MAX_SESSIONS / CHAT_STORE_MAX_BYTES: memory backend caps
+    REDIS_URL: Redis server for the redis backend
+    CHAT_STORE_STATS_INTERVAL: seconds a Redis session scan is reused by /metrics
+    """
+    backend = os.environ.get('CHAT_STORE', 'memory').lower()
+    ttl_seconds = int(os.environ.get('CHAT_SESSION_TTL', 3600)) or None
+
+    if backend == 'sqlite':
+        return SQLiteConversationStore(
+            os.environ.get('CHAT_STORE_PATH', 'conversations.db'),
+            max_messages=max_messages, ttl_seconds=ttl_seconds
+        )
+    if backend == 'redis':
+        return RedisConversationStore(
+            url=os.environ.get('REDIS_URL', 'redis://localhost:6379/0'),
+            max_messages=max_messages, ttl_seconds=ttl_seconds
+        )
+    if backend != 'memory':
+        logger.warning("⚠️  Unknown CHAT_STORE '%s', using in-memory conversation store", backend)
+    return MemoryConversationStore(
+        max_messages=max_messages, ttl_seconds=ttl_seconds,
+        max_sessions=int(os.environ.get('CHAT_STORE_MAX_SESSIONS', 10000)),
+        max_bytes=int(os.environ.get('CHAT_STORE_MAX_BYTES', 64 * 1024 * 1024))
+    )
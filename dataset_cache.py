@@ -0,0 +1,180 @@
+"""
+Dataset Cache
+Streams the Carbon Emission survey CSV into a columnar on-disk cache of
+memory-mappable NumPy arrays, so training never has to hold the raw CSV in
+memory and later runs skip parsing altogether.
+
+- The CSV is read in chunks with explicit compact dtypes (float32 numbers,
+  text columns dictionary-encoded to small integer codes)
+- Each column is appended to its own file, then finalized as a .npy array;
+  peak memory depends on the chunk size, not the file size
+- meta.json records the source file's size and mtime, the row count and the
+  categories of every text column; a changed source rebuilds the cache
+
+    cache_dir/
+        meta.json
+        <column index>.npy
+
+load_dataset() returns a DataFrame in feature_pipeline's column layout:
+numeric columns backed by the memory-mapped arrays, text columns as pandas
+Categoricals built from the stored codes.
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from feature_pipeline import COLUMNS, NUM_COLUMNS, TARGET
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+DEFAULT_CHUNK_ROWS = 200_000
+
+# Explicit dtypes: numbers as float32 (exact for the survey's integer values,
+# NaN-safe), everything else read as text and dictionary-encoded
+NUMERIC_COLUMNS = NUM_COLUMNS + [TARGET]
+TEXT_COLUMNS = [column for column in COLUMNS if column not in NUMERIC_COLUMNS]
+CSV_DTYPES = {column: (np.float32 if column in NUMERIC_COLUMNS else str) for column in COLUMNS}
+
+
+def _source_stamp(csv_path):
+    stat = os.stat(csv_path)
+    return {'path': os.path.abspath(csv_path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def _code_dtype(count):
+    return np.int8 if count < 127 else np.int16 if count < 32767 else np.int32
+
+
+def _column_file(cache_dir, index, suffix):
+    return os.path.join(cache_dir, f"{index}{suffix}")
+
+
+def cache_is_fresh(csv_path, cache_dir):
+    """True if cache_dir holds a complete cache built from csv_path as it is now"""
+    try:
+        with open(os.path.join(cache_dir, 'meta.json')) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return meta.get('version') == CACHE_VERSION and meta.get('source') == _source_stamp(csv_path)
+
+
+def build_cache(csv_path, cache_dir, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Convert a survey CSV into the columnar cache
+
+    Args:
+        csv_path: Raw CSV (header row, columns in the survey's order)
+        cache_dir: Directory for the cache (replaced if it exists)
+        chunk_rows: Rows parsed per chunk (bounds peak memory)
+
+    Returns:
+        dict: the cache metadata
+    """
+    start = time.perf_counter()
+    tmp_dir = cache_dir.rstrip(os.sep) + '.partial'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    vocabularies = {column: {} for column in TEXT_COLUMNS}
+    outputs = {column: open(_column_file(tmp_dir, i, '.bin'), 'wb') for i, column in enumerate(COLUMNS)}
+    rows = 0
+    try:
+        reader = pd.read_csv(csv_path, header=0, names=COLUMNS, dtype=CSV_DTYPES, chunksize=chunk_rows)
+        for chunk in reader:
+            for column in NUMERIC_COLUMNS:
+                outputs[column].write(chunk[column].to_numpy(dtype=np.float32).tobytes())
+            for column in TEXT_COLUMNS:
+                # Codes in first-seen order while streaming; sorted on finalize
+                codes, uniques = pd.factorize(chunk[column].fillna('None'))
+                vocabulary = vocabularies[column]
+                lookup = np.array([vocabulary.setdefault(value, len(vocabulary)) for value in uniques],
+                                  dtype=np.int32)
+                outputs[column].write(lookup[codes].tobytes())
+            rows += len(chunk)
+            logger.debug("Ingested %d rows", rows)
+    finally:
+        for output in outputs.values():
+            output.close()
+
+    categories = {}
+    for i, column in enumerate(COLUMNS):
+        raw_path = _column_file(tmp_dir, i, '.bin')
+        raw_dtype = np.float32 if column in NUMERIC_COLUMNS else np.int32
+        source = np.memmap(raw_path, dtype=raw_dtype, mode='r') if rows else np.empty(0, raw_dtype)
+        if column in NUMERIC_COLUMNS:
+            dtype, remap = np.float32, None
+        else:
+            # Re-number codes so they follow sorted category order
+            values = list(vocabularies[column])
+            order = sorted(range(len(values)), key=lambda code: values[code])
+            categories[column] = [values[code] for code in order]
+            dtype = _code_dtype(len(values))
+            remap = np.empty(len(values), dtype=dtype)
+            remap[order] = np.arange(len(values), dtype=dtype)
+
+        target = np.lib.format.open_memmap(_column_file(tmp_dir, i, '.npy'), mode='w+', dtype=dtype, shape=(rows,))
+        for offset in range(0, rows, chunk_rows):
+            block = source[offset:offset + chunk_rows]
+            target[offset:offset + chunk_rows] = remap[block] if remap is not None else block
+        target.flush()
+        del target, source
+        os.remove(raw_path)
+
+    meta = {
+        'version': CACHE_VERSION,
+        'source': _source_stamp(csv_path),
+        'rows': rows,
+        'columns': COLUMNS,
+        'categories': categories,
+    }
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+    logger.info("Cached %d rows from %s in %.1f s", rows, csv_path, time.perf_counter() - start,
+                extra={'rows': rows, 'cache_dir': cache_dir})
+    return meta
+
+
+def load_dataset(cache_dir, mmap=True):
+    """
+    Load a cache as a DataFrame with feature_pipeline's column names
+
+    Args:
+        mmap: Memory-map the arrays (pages are read on first use)
+    """
+    with open(os.path.join(cache_dir, 'meta.json')) as f:
+        meta = json.load(f)
+
+    data = {}
+    for i, column in enumerate(meta['columns']):
+        values = np.load(_column_file(cache_dir, i, '.npy'), mmap_mode='r' if mmap else None)
+        if column in meta['categories']:
+            dtype = pd.CategoricalDtype(meta['categories'][column])
+            data[column] = pd.Categorical.from_codes(values, dtype=dtype, validate=False)
+        else:
+            data[column] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def load_or_build(csv_path, cache_dir=None, chunk_rows=DEFAULT_CHUNK_ROWS, rebuild=False):
+    """
+    Load the cache for csv_path, building it first if missing or stale
+
+    Args:
+        cache_dir: Defaults to '<csv_path>.cache'
+        rebuild: Rebuild even if the cache is fresh
+    """
+    cache_dir = cache_dir or csv_path + '.cache'
+    if rebuild or not cache_is_fresh(csv_path, cache_dir):
+        build_cache(csv_path, cache_dir, chunk_rows)
+    return load_dataset(cache_dir)
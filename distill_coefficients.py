@@ -0,0 +1,239 @@
+"""
+Coefficient Distillation
+Fits the fast calculator's additive table (ml_calculator.COEFFICIENTS) to the
+trained CatBoost model, so /api/calculate can keep the cheap path and still
+agree with the model.
+
+- Sample answer sets over the quiz's feature grid (every option and slider
+  value equally likely, questions independent) and predict each with the model
+- Fit an additive surrogate by least squares: one value per option of each
+  multiple choice question, one kg-per-unit slope per slider, plus a baseline.
+  With independent sampling the option values are the model's centred
+  partial dependence curves, jointly re-weighted to minimise the total error
+- Shift every question so its cheapest option scores 0 (the difference moves
+  into the baseline) so category breakdowns stay non-negative
+- Score a fresh holdout sample with the distilled and the hand-tuned tables
+  and record the fidelity gap (MAE, RMSE, max error, R² against the model)
+
+The result is written as JSON (default: coefficients.json next to
+ml_calculator.py), which ml_calculator loads at import.
+
+    python -m distill_coefficients [--bundle PATH | --model-dir DIR] [--output PATH] [--samples N]
+"""
+
+import json
+import logging
+import time
+
+import numpy as np
+
+from ml_calculator import (COEFFICIENTS_FILE, EMISSION_RANGE, HAND_TUNED_BASELINE, HAND_TUNED_COEFFICIENTS,
+                           compile_scoring_table)
+from quiz_data import QUESTIONS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLES = 20_000
+
+
+def quiz_grid(questions=QUESTIONS):
+    """[(question, option texts or None, (min, max) or None)] for every quiz question"""
+    grid = []
+    for category_questions in questions.values():
+        for question in category_questions:
+            if question.get('type') == 'slider':
+                grid.append((question, None, (question['min'], question['max'])))
+            else:
+                grid.append((question, [option['text'] for option in question['options']], None))
+    return grid
+
+
+def sample_answer_sets(count, seed=0, questions=QUESTIONS):
+    """count random answer sets, keyed by question id like the /api/calculate payload"""
+    rng = np.random.default_rng(seed)
+    grid = quiz_grid(questions)
+    draws = []
+    for question, options, bounds in grid:
+        if options is None:
+            draws.append(rng.integers(bounds[0], bounds[1] + 1, count).tolist())
+        else:
+            draws.append([options[i] for i in rng.integers(0, len(options), count)])
+
+    answer_sets = []
+    for values in zip(*draws):
+        answers = {}
+        for (question, options, _), value in zip(grid, values):
+            key = 'sliderValue' if options is None else 'selectedOption'
+            answers[str(question['id'])] = {'questionText': question['question'], key: value}
+        answer_sets.append(answers)
+    return answer_sets
+
+
+def design_matrix(answer_sets, grid):
+    """
+    Surrogate inputs: an indicator per non-reference option, the raw slider values
+
+    Returns:
+        tuple: (matrix, [(question id, option text or None)] per column)
+    """
+    columns = []
+    for question, options, _ in grid:
+        if options is None:
+            columns.append((question['id'], None))
+        else:
+            columns.extend((question['id'], option) for option in options[1:])
+
+    index = {column: i for i, column in enumerate(columns)}
+    matrix = np.zeros((len(answer_sets), len(columns)))
+    for row, answers in enumerate(answer_sets):
+        for question, options, _ in grid:
+            answer = answers[str(question['id'])]
+            if options is None:
+                matrix[row, index[(question['id'], None)]] = answer['sliderValue']
+            elif answer['selectedOption'] != options[0]:
+                matrix[row, index[(question['id'], answer['selectedOption'])]] = 1
+    return matrix, columns
+
+
+def fit_coefficients(answer_sets, predictions, questions=QUESTIONS):
+    """
+    Least-squares additive fit of the model's predictions
+
+    Returns:
+        tuple: ({question id: {'default', 'options'} or {'per_unit'}}, baseline)
+    """
+    grid = quiz_grid(questions)
+    matrix, columns = design_matrix(answer_sets, grid)
+    solution, *_ = np.linalg.lstsq(np.column_stack([np.ones(len(matrix)), matrix]), predictions, rcond=None)
+    weights = dict(zip(columns, solution[1:]))
+    baseline = float(solution[0])
+
+    coefficients = {}
+    for question, options, _ in grid:
+        question_id = question['id']
+        if options is None:
+            coefficients[question_id] = {'per_unit': round(float(weights[(question_id, None)]), 4)}
+            continue
+        values = [0.0] + [float(weights[(question_id, option)]) for option in options[1:]]
+        floor = min(values)
+        baseline += floor
+        values = [round(value - floor, 1) for value in values]
+        coefficients[question_id] = {
+            'default': round(sum(values) / len(values), 1),  # unknown option: the average option
+            'options': dict(zip(options, values)),
+        }
+    return coefficients, round(baseline, 1)
+
+
+def score_totals(answer_sets, coefficients, baseline, questions=QUESTIONS):
+    """Totals exactly as ml_calculator.calculate_emission computes them for a table"""
+    table = compile_scoring_table(questions, {
+        question_id: dict(coefficients[question_id], label='{}') for question_id in coefficients
+    })
+    totals = np.empty(len(answer_sets))
+    for i, answers in enumerate(answer_sets):
+        total = baseline
+        for key, answer in answers.items():
+            entry = table[int(key)]
+            if entry.per_unit is None:
+                total += entry.options.get(answer['selectedOption'], entry.default)
+            else:
+                total += (answer['sliderValue'] or 0) * entry.per_unit
+        totals[i] = total
+    return np.clip(totals, *EMISSION_RANGE)
+
+
+def fidelity(totals, predictions):
+    """Error of calculator totals against the model's predictions"""
+    errors = totals - predictions
+    return {
+        'mae': round(float(np.mean(np.abs(errors))), 1),
+        'rmse': round(float(np.sqrt(np.mean(errors ** 2))), 1),
+        'max_error': round(float(np.max(np.abs(errors))), 1),
+        'r2': round(float(1 - np.sum(errors ** 2) / np.sum((predictions - predictions.mean()) ** 2)), 4),
+    }
+
+
+def distill(model, encoder, samples=DEFAULT_SAMPLES, seed=0, model_version=None):
+    """
+    Distill a served model (inference.load_bundle / load_artifacts output)
+
+    Args:
+        model: CatBoost model
+        encoder: inference.QuizEncoder for that model
+        samples: Answer sets used for the fit (the holdout uses a quarter as many)
+        seed: Sampling seed
+        model_version: Recorded in the output
+
+    Returns:
+        dict: JSON-ready table with coefficients, baseline and fidelity report
+    """
+    start = time.perf_counter()
+    answer_sets = sample_answer_sets(samples, seed)
+    predictions = np.asarray(model.predict([encoder.encode(answers) for answers in answer_sets]))
+    coefficients, baseline = fit_coefficients(answer_sets, predictions)
+
+    holdout = sample_answer_sets(max(samples // 4, 1), seed + 1)
+    holdout_predictions = np.asarray(model.predict([encoder.encode(answers) for answers in holdout]))
+    report = {
+        'holdout_samples': len(holdout),
+        'distilled': fidelity(score_totals(holdout, coefficients, baseline), holdout_predictions),
+        'hand_tuned': fidelity(score_totals(holdout, HAND_TUNED_COEFFICIENTS, HAND_TUNED_BASELINE),
+                               holdout_predictions),
+    }
+    logger.info("Distilled %d coefficients from %d samples in %.1f s", len(coefficients), samples,
+                time.perf_counter() - start, extra=report['distilled'])
+    return {
+        'generated_by': 'distill_coefficients.py',
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'model_version': model_version,
+        'samples': samples,
+        'seed': seed,
+        'baseline': baseline,
+        'coefficients': {str(question_id): values for question_id, values in coefficients.items()},
+        'fidelity': report,
+    }
+
+
+def write_table(table, path=COEFFICIENTS_FILE):
+    with open(path, 'w') as f:
+        json.dump(table, f, indent=2)
+        f.write('\n')
+
+
+def format_report(table):
+    """Fidelity gap as an aligned text table"""
+    lines = [f"Fidelity vs the model on {table['fidelity']['holdout_samples']:,} holdout answer sets (kg CO2/year)",
+             f"{'table':<12} {'MAE':>8} {'RMSE':>8} {'max err':>9} {'R²':>8}"]
+    for name in ('distilled', 'hand_tuned'):
+        stats = table['fidelity'][name]
+        lines.append(f"{name:<12} {stats['mae']:8.1f} {stats['rmse']:8.1f} {stats['max_error']:9.1f} "
+                     f"{stats['r2']:8.4f}")
+    return '\n'.join(lines)
+
+
+def main():
+    import argparse
+
+    from inference import MODEL_BUNDLE, load_artifacts, load_bundle
+
+    parser = argparse.ArgumentParser(description="Distill the calculator's coefficient table from the trained model")
+    parser.add_argument('--bundle', default=MODEL_BUNDLE, help="model.bundle to distill")
+    parser.add_argument('--model-dir', help="Directory of older model.cbm + pickle artifacts (instead of --bundle)")
+    parser.add_argument('--output', default=COEFFICIENTS_FILE)
+    parser.add_argument('--samples', type=int, default=DEFAULT_SAMPLES)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.model_dir:
+        (model, encoder), version = load_artifacts(args.model_dir), None
+    else:
+        model, encoder, version = load_bundle(args.bundle)
+    table = distill(model, encoder, args.samples, args.seed, version)
+    write_table(table, args.output)
+    print(format_report(table))
+    print(f"✅ Coefficient table written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""
+Feature Pipeline
+Vectorized preprocessing for the Carbon Emission survey data, shared by
+train_model.py (fit + transform) and inference.py (fitted lookup tables).
+
+- Recycling/Cooking lists are parsed once per distinct string and expanded
+  into multi-hot columns in a single pass
+- Categorical columns are encoded through pandas categorical dtypes, with
+  sorted categories (the same codes LabelEncoder would assign)
+- Numeric columns are standardized together from one mean/std computation
+  (the same values StandardScaler would produce)
+
+The fitted state (categories, mean, scale, feature_order) is what
+train_model.py stores in model.bundle. It also converts to and from the
+encoders.pkl/scalers.pkl objects older artifacts used, so those keep loading.
+"""
+
+import ast
+
+import numpy as np
+import pandas as pd
+
+# Dataset columns, in CSV order, after renaming
+COLUMNS = ['Body Type', 'Sex', 'Diet', 'Shower', 'Heating', 'Transport', 'Vehicle', 'Social', 'Grocery', 'Flight',
+           'Vehicle Distance', 'Bag Size', 'Waste Weekly', 'TV Daily Hour', 'Clothes Monthly', 'Internet Daily',
+           'Energy Eff', 'Recycling', 'Cooking', 'CarbonEmission']
+TARGET = 'CarbonEmission'
+
+# Columns holding stringified lists ("['Paper', 'Glass']")
+LIST_COLUMNS = ['Recycling', 'Cooking']
+
+CAT_COLUMNS = ['Body Type', 'Sex', 'Diet', 'Shower', 'Heating', 'Transport', 'Vehicle', 'Social', 'Flight', 'Bag Size',
+               'Energy Eff', 'Plastic', 'Glass', 'Metal', 'Paper', 'Microwave', 'Oven', 'Stove', 'Airfryer', 'Grill']
+NUM_COLUMNS = ['Grocery', 'Vehicle Distance', 'Waste Weekly', 'TV Daily Hour', 'Internet Daily', 'Clothes Monthly']
+
+
+def prepare_frame(df):
+    """Rename raw CSV columns and fill missing categorical values with 'None'"""
+    df = df.set_axis(COLUMNS, axis=1)
+    for column in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[column]) and df[column].hasnans:
+            df[column] = df[column].fillna('None')
+    return df
+
+
+def parse_list_column(series):
+    """
+    Parse a column of stringified lists, once per distinct string
+
+    Returns:
+        tuple: (codes array, list of parsed lists indexed by code)
+    """
+    codes, uniques = pd.factorize(series, sort=False)
+    return codes, [ast.literal_eval(value) for value in uniques]
+
+
+def multi_hot(series, items=None):
+    """
+    Expand a stringified-list column into 0/1 columns
+
+    Args:
+        series: Column of stringified lists
+        items: Column names to produce (default: every item seen, sorted)
+
+    Returns:
+        pd.DataFrame: one uint8 column per item
+    """
+    codes, parsed = parse_list_column(series)
+    if items is None:
+        items = sorted({item for values in parsed for item in values})
+    position = {item: i for i, item in enumerate(items)}
+
+    # Multi-hot rows for each distinct list, then one gather over all rows
+    table = np.zeros((len(parsed), len(items)), dtype=np.uint8)
+    for row, values in enumerate(parsed):
+        for item in values:
+            if item in position:
+                table[row, position[item]] = 1
+    return pd.DataFrame(table[codes], columns=items, index=series.index)
+
+
+def _compact(codes, count):
+    """Store category codes in the smallest signed integer type that fits"""
+    return codes.astype(np.int8 if count < 127 else np.int16 if count < 32767 else np.int32)
+
+
+class FeaturePipeline:
+    """
+    Fit/transform preprocessing for the survey data
+
+    After fit(): list_items {list column: items}, categories {column: sorted
+    values}, mean/scale {column: float} and feature_order.
+    """
+
+    def __init__(self, cat_columns=CAT_COLUMNS, num_columns=NUM_COLUMNS, list_columns=LIST_COLUMNS):
+        self.cat_columns = list(cat_columns)
+        self.num_columns = list(num_columns)
+        self.list_columns = list(list_columns)
+        self.list_items = {}
+        self.categories = {}
+        self.mean = {}
+        self.scale = {}
+        self.feature_order = []
+
+    def _expand_lists(self, df):
+        expanded = [multi_hot(df[column], self.list_items.get(column)) for column in self.list_columns]
+        return pd.concat([df.drop(columns=self.list_columns)] + expanded, axis=1)
+
+    def _fit_lists(self, df):
+        """Learn the items of each list column; returns the expanded frame"""
+        self.list_items = {}
+        for column in self.list_columns:
+            _, parsed = parse_list_column(df[column])
+            self.list_items[column] = sorted({item for values in parsed for item in values})
+        return self._expand_lists(df)
+
+    def _fit_expanded(self, expanded):
+        """Learn categories and mean/scale; returns {column: category codes}"""
+        # A sorted factorize gives both the categories and LabelEncoder's codes
+        codes = {}
+        self.categories = {}
+        for column in self.cat_columns:
+            column_codes, uniques = pd.factorize(expanded[column], sort=True)
+            self.categories[column] = uniques.tolist()
+            codes[column] = _compact(column_codes, len(uniques))
+
+        values = expanded[self.num_columns].to_numpy(dtype=np.float64)
+        mean = values.mean(axis=0)
+        scale = values.std(axis=0)
+        scale[scale == 0] = 1.0
+        self.mean = dict(zip(self.num_columns, mean.tolist()))
+        self.scale = dict(zip(self.num_columns, scale.tolist()))
+
+        self.feature_order = [column for column in expanded.columns if column != TARGET]
+        return codes
+
+    def _encode(self, out, codes=None):
+        for column in self.cat_columns:
+            if codes is not None:
+                out[column] = codes[column]
+            else:
+                dtype = pd.CategoricalDtype(self.categories[column])
+                out[column] = _compact(out[column].astype(dtype).cat.codes.to_numpy(), len(self.categories[column]))
+        mean = np.array([self.mean[column] for column in self.num_columns])
+        scale = np.array([self.scale[column] for column in self.num_columns])
+        out[self.num_columns] = (out[self.num_columns].to_numpy(dtype=np.float64) - mean) / scale
+        return out
+
+    def fit(self, df):
+        """Learn list items, category sets and numeric mean/scale from a prepared frame"""
+        self._fit_expanded(self._fit_lists(df))
+        return self
+
+    def transform(self, df):
+        """
+        Encode a prepared frame (target column, if present, is kept)
+
+        Unseen categories are encoded as -1.
+        """
+        return self._encode(self._expand_lists(df))
+
+    def fit_transform(self, df):
+        """fit() and transform() with a single list expansion"""
+        expanded = self._fit_lists(df)
+        return self._encode(expanded, self._fit_expanded(expanded))
+
+    @property
+    def category_codes(self):
+        """{column: {raw value: code}} lookup tables for serving"""
+        return {column: {value: code for code, value in enumerate(values)}
+                for column, values in self.categories.items()}
+
+    @property
+    def scaling(self):
+        """{column: (mean, scale)} lookup tables for serving"""
+        return {column: (self.mean[column], self.scale[column]) for column in self.num_columns}
+
+    def to_sklearn(self):
+        """
+        Export the fitted state as the LabelEncoder/StandardScaler dicts that
+        train_model.py pickles to encoders.pkl and scalers.pkl
+        """
+        from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+        encoders = {}
+        for column, values in self.categories.items():
+            encoder = LabelEncoder()
+            encoder.classes_ = np.array(values)
+            encoders[column] = encoder
+
+        scalers = {}
+        for column in self.num_columns:
+            scaler = StandardScaler()
+            scaler.mean_ = np.array([self.mean[column]])
+            scaler.scale_ = np.array([self.scale[column]])
+            scaler.var_ = scaler.scale_ ** 2
+            scaler.n_features_in_ = 1
+            scalers[column] = scaler
+        return encoders, scalers
+
+    @classmethod
+    def from_sklearn(cls, encoders, scalers, feature_order=()):
+        """Rebuild a fitted pipeline from encoders.pkl/scalers.pkl contents"""
+        pipeline = cls(cat_columns=list(encoders), num_columns=list(scalers), list_columns=())
+        pipeline.categories = {
+            column: [value.item() if hasattr(value, 'item') else value for value in encoder.classes_]
+            for column, encoder in encoders.items()
+        }
+        pipeline.mean = {column: float(scaler.mean_[0]) for column, scaler in scalers.items()}
+        pipeline.scale = {column: float(scaler.scale_[0]) for column, scaler in scalers.items()}
+        pipeline.feature_order = list(feature_order)
+        return pipeline
@@ -0,0 +1,158 @@
+"""
+History Compactor
+Keeps a chat's input (system prompt + history) inside a token budget
+instead of re-sending the last 10 messages in full:
+
+- Tokens are estimated locally (UTF-8 bytes / 3.5 plus a few per message),
+  no tokenizer or API call; close enough to decide what to fold
+- When the system prompt plus history is over CHAT_INPUT_BUDGET, or the
+  history holds more messages than the store keeps, the oldest turns are
+  folded into a rolling summary: one line per turn (the question and the
+  start of EcoCoach's reply), oldest lines dropped once the summary is over
+  CHAT_SUMMARY_BUDGET. Nothing is lost to the count limit any more
+- The summary is stored as a flagged first message of the history and sent
+  at the end of the system prompt (after the cached prefix); api_messages()
+  strips it from the messages sent to Claude
+- A system prompt over half the budget is rebuilt with less results
+  context (tips only, then totals only) before history is folded
+
+Each request also estimates what the uncompacted history (the last 11
+messages, as before) would have cost, so the saving is logged and exported.
+"""
+
+import math
+import os
+import re
+from collections import namedtuple
+
+CHAT_INPUT_BUDGET = int(os.environ.get('CHAT_INPUT_BUDGET', 3000))
+CHAT_SUMMARY_BUDGET = int(os.environ.get('CHAT_SUMMARY_BUDGET', 300))
+
+BYTES_PER_TOKEN = 3.5
+MESSAGE_OVERHEAD = 4  # role and separators
+SYSTEM_SHARE = 0.5  # of the budget, before results context is shortened
+
+SUMMARY_HEADER = "\n\n🧾 EARLIER IN THIS CHAT (summary of older turns, oldest first):"
+
+Compaction = namedtuple('Compaction', ['messages', 'summary', 'tokens', 'uncompacted_tokens', 'folded'])
+
+
+def estimate_tokens(text):
+    """Rough Claude token count for text (UTF-8 bytes / 3.5, rounded up)"""
+    return math.ceil(len(text.encode('utf-8')) / BYTES_PER_TOKEN)
+
+
+def message_tokens(message):
+    return estimate_tokens(message['content']) + MESSAGE_OVERHEAD
+
+
+def api_messages(messages):
+    """Messages to send to Claude: the stored history without the summary entry or extra keys"""
+    return [{"role": message['role'], "content": message['content']}
+            for message in messages if not message.get('summary')]
+
+
+def _clip(text, limit):
+    text = ' '.join(text[:limit * 4].split())  # only the start can be kept
+    if len(text) <= limit:
+        return text
+    return text[:limit - 1].rsplit(' ', 1)[0] + '…'
+
+
+def _lead(reply, limit):
+    """The first sentences of a reply, up to about limit characters"""
+    head = ' '.join(reply[:limit * 4].split())[:limit + 1]
+    ends = [match.end() for match in re.finditer(r'[.!?](?= |$)', head)]
+    return head[:ends[-1]] if ends else _clip(head, limit)
+
+
+def summarize_turn(turn):
+    """One summary line for a folded user message and the reply that followed it"""
+    asked = [message['content'] for message in turn if message['role'] == 'user']
+    replied = [message['content'] for message in turn if message['role'] == 'assistant']
+    line = '- They asked: ' + (_clip(' '.join(asked), 140) if asked else '(nothing)')
+    if replied:
+        line += ' | You said: ' + _lead(' '.join(replied), 220)
+    return line
+
+
+class HistoryCompactor:
+    """
+    Folds old turns into a summary so system prompt + history fit a budget
+
+    Args:
+        budget: Estimated input tokens per request (system prompt + history)
+        summary_budget: Estimated tokens the summary may use
+        max_messages: Messages the conversation store keeps per session;
+            older ones are folded (not dropped) and the reply still has to fit
+    """
+
+    def __init__(self, budget=CHAT_INPUT_BUDGET, summary_budget=CHAT_SUMMARY_BUDGET, max_messages=10):
+        self.budget = budget
+        self.summary_budget = summary_budget
+        self.max_messages = max_messages
+
+    def system_fits(self, system_prompt):
+        """Whether a system prompt leaves enough of the budget for history"""
+        return estimate_tokens(system_prompt.text) <= self.budget * SYSTEM_SHARE
+
+    def render(self, lines, omitted):
+        """System prompt block for summary lines ('' when there are none)"""
+        if not lines:
+            return ''
+        note = f"\n(+{omitted} earlier turns not shown)" if omitted else ''
+        return SUMMARY_HEADER + note + '\n' + '\n'.join(lines)
+
+    def compact(self, system_prompt, messages, uncompacted_system_tokens=None):
+        """
+        Fold the oldest turns of a history until it fits
+
+        Args:
+            system_prompt: The SystemPrompt the request will use
+            messages: Stored history (summary entry first, if any) + the new user message
+            uncompacted_system_tokens: Estimate for the full-detail system prompt, when a
+                shorter one is used (for the uncompacted comparison)
+
+        Returns:
+            Compaction: messages (to store; first entry is the summary), summary
+                (block for the system prompt), tokens and uncompacted_tokens
+                (estimates), folded (messages folded by this call)
+        """
+        summary = messages[0] if messages and messages[0].get('summary') else None
+        recent = list(messages[1:] if summary else messages)
+        lines = summary['content'].splitlines() if summary else []
+        omitted = summary.get('omitted', 0) if summary else 0
+        # Sizes of messages folded earlier, for what the uncompacted history would hold
+        folded_tokens = list(summary.get('folded_tokens', [])) if summary else []
+
+        system_tokens = estimate_tokens(system_prompt.text)
+        tokens = [message_tokens(message) for message in recent]
+        kept_tokens = sum(tokens)
+        uncompacted = (folded_tokens + tokens)[-(self.max_messages + 1):]
+        summary_tokens = estimate_tokens(self.render(lines, omitted))
+        folded = 0
+
+        # Fold until it fits; the reply must fit in the store too, and the first message must be the user's
+        while len(recent) > 1 and (system_tokens + summary_tokens + kept_tokens > self.budget
+                                   or len(recent) > self.max_messages - 1 or recent[0]['role'] != 'user'):
+            take = 2 if len(recent) > 2 and recent[0]['role'] == 'user' and recent[1]['role'] == 'assistant' else 1
+            lines.append(summarize_turn(recent[:take]))
+            folded_tokens.extend(tokens[:take])
+            kept_tokens -= sum(tokens[:take])
+            del recent[:take], tokens[:take]
+            folded += take
+            while len(lines) > 1 and estimate_tokens('\n'.join(lines)) > self.summary_budget:
+                lines.pop(0)
+                omitted += 1
+            summary_tokens = estimate_tokens(self.render(lines, omitted))
+
+        if lines:
+            recent.insert(0, {"role": "user", "content": '\n'.join(lines), "summary": True, "omitted": omitted,
+                              "folded_tokens": folded_tokens[-(self.max_messages + 1):]})
+        return Compaction(
+            messages=recent,
+            summary=self.render(lines, omitted),
+            tokens=system_tokens + summary_tokens + kept_tokens,
+            uncompacted_tokens=(uncompacted_system_tokens or system_tokens) + sum(uncompacted),
+            folded=folded,
+        )
@@ -0,0 +1,220 @@
+"""
+Index Page
+Server-rendered first paint for the quiz:
+
+- index.html is rendered once per process (per deploy), at startup, and
+  split around a placeholder; a request only joins the cached halves with a
+  freshly sampled question set, embedded as inline JSON, so Start Quiz needs
+  no /api/questions round trip
+- The CSS rules the start screen needs are extracted from the stylesheet
+  and inlined in a <style> block (with the built icon/font CSS, which is
+  small); the full stylesheet loads without blocking render
+- The page is compressed per request (brotli quality 4 or gzip 6, ~0.4 ms
+  for ~22 KB -> ~5.5 KB) since the payload makes every response different
+
+Critical CSS is chosen by tokens: a rule is kept when one of its selectors
+only uses classes and ids that appear in the initially visible markup
+(subtrees of inactive .screen elements and the closed chatbot are skipped,
+but their own classes are kept so the rules that hide them come along).
+@media blocks are filtered the same way and @keyframes are kept when a kept
+rule uses them.
+"""
+
+import gzip
+import html.parser
+import os
+import re
+import urllib.parse
+
+from markupsafe import Markup
+
+PLACEHOLDER = '\x00inline-questions\x00'
+
+# Elements whose children aren't visible at first paint (tested on class names)
+HIDDEN_ROOTS = ('chatbot-widget',)
+
+
+class _VisibleTokens(html.parser.HTMLParser):
+    """Collects class names and ids outside hidden subtrees"""
+
+    VOID = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+    def __init__(self):
+        super().__init__()
+        self.tokens = set()
+        self._stack = []  # True for elements that hide their subtree
+        self._hidden = 0
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or '').split()
+        if not self._hidden:
+            self.tokens.update(classes)
+            if attrs.get('id'):
+                self.tokens.add(attrs['id'])
+        if tag in self.VOID:
+            return
+        hides = ('screen' in classes and 'active' not in classes) or any(name in classes for name in HIDDEN_ROOTS)
+        self._stack.append(hides)
+        self._hidden += hides
+
+    def handle_endtag(self, tag):
+        if tag not in self.VOID and self._stack:
+            self._hidden -= self._stack.pop()
+
+
+def visible_tokens(markup):
+    parser = _VisibleTokens()
+    parser.feed(markup)
+    return parser.tokens
+
+
+def _blocks(css):
+    """Yield (prelude, body) for each top-level block of comment-free CSS"""
+    position = 0
+    while True:
+        start = css.find('{', position)
+        if start == -1:
+            return
+        depth, end = 1, start + 1
+        while depth and end < len(css):
+            depth += {'{': 1, '}': -1}.get(css[end], 0)
+            end += 1
+        yield css[position:start].strip(), css[start + 1:end - 1]
+        position = end
+
+
+def _selector_visible(selector, tokens):
+    selector = re.sub(r'\([^)]*\)|\[[^\]]*\]', '', selector)  # :not(...), [attr=...]
+    return all(token in tokens for token in re.findall(r'[.#](-?[_a-zA-Z][\w-]*)', selector))
+
+
+def _filter_rules(css, tokens, keyframes, used_animations):
+    kept = []
+    for prelude, body in _blocks(css):
+        if prelude.startswith('@media') or prelude.startswith('@supports'):
+            inner = _filter_rules(body, tokens, keyframes, used_animations)
+            if inner:
+                kept.append(f'{prelude}{{{inner}}}')
+        elif re.match(r'@(-webkit-)?keyframes\s', prelude):
+            keyframes[prelude.split()[-1]] = f'{prelude}{{{body}}}'
+        elif prelude.startswith('@'):
+            continue  # @font-face lives in fonts.css; nothing else is needed for first paint
+        elif any(_selector_visible(selector, tokens) for selector in prelude.split(',')):
+            kept.append(f'{prelude}{{{body.strip()}}}')
+            for declaration in re.findall(r'animation(?:-name)?\s*:([^;]+)', body):
+                used_animations.update(re.findall(r'[_a-zA-Z][\w-]*', declaration))
+    return ''.join(kept)
+
+
+def critical_css(css, markup):
+    """
+    The subset of css the initially visible part of markup needs
+
+    Args:
+        css: Stylesheet text
+        markup: Rendered page HTML
+
+    Returns:
+        str: Minified-ish critical CSS
+    """
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    keyframes, used_animations = {}, set()
+    rules = _filter_rules(css, visible_tokens(markup), keyframes, used_animations)
+    rules += ''.join(block for name, block in keyframes.items() if name in used_animations)
+    return re.sub(r'\s*([{};,>])\s*', r'\1', rules)
+
+
+def script_json(payload):
+    """JSON bytes made safe inside a <script> element (no '</script>' or '<!--' breakouts)"""
+    return payload.replace(b'<', b'\\u003c').replace(b'>', b'\\u003e').replace(b'&', b'\\u0026')
+
+
+def compress(body, accept_encodings):
+    """
+    Compress a response body for the client
+
+    Args:
+        body: Response bytes
+        accept_encodings: The request's parsed Accept-Encoding (request.accept_encodings)
+
+    Returns:
+        tuple: (body, Content-Encoding or None)
+    """
+    if accept_encodings['br']:
+        try:
+            import brotli
+            return brotli.compress(body, quality=4), 'br'
+        except ImportError:
+            pass
+    if accept_encodings['gzip']:
+        return gzip.compress(body, 6, mtime=0), 'gzip'
+    return body, None
+
+
+class IndexPage:
+    """
+    index.html rendered once, with the question payload spliced in per request
+
+    Args:
+        app: Flask app (templates/index.html is rendered here, outside any request, so a nested
+            request context can't run the app's teardown hooks against a live request)
+        stylesheet: Static path of the stylesheet to take critical CSS from
+        inline_questions: Embed a sampled question set (False: the client fetches /api/questions)
+        inline_css: Inline the critical CSS (and fonts.css) and load the stylesheet asynchronously
+    """
+
+    def __init__(self, app, stylesheet='css/style.css', inline_questions=True, inline_css=True):
+        self.app = app
+        self.stylesheet = stylesheet
+        self.inline_questions = inline_questions
+        self.inline_css = inline_css
+        self._parts = self._build_parts()
+
+    def _render(self, **context):
+        from flask import render_template
+        with self.app.test_request_context('/'):
+            return render_template('index.html', **context)
+
+    def _static_text(self, filename):
+        """Text of a static file as served (the built version when there is one), and its URL"""
+        from flask import url_for
+        with self.app.test_request_context('/'):
+            path = url_for('static', filename=filename)
+        relative = path[len(self.app.static_url_path) + 1:]
+        with open(os.path.join(self.app.static_folder, relative), encoding='utf-8') as f:
+            return f.read(), path
+
+    def _font_css(self):
+        """Built fonts.css with its url()s made absolute, so it can be inlined (None when not built)"""
+        from static_assets import StaticAssets
+        assets = self.app.jinja_env.globals.get('assets') or StaticAssets(self.app.static_folder)
+        if not assets.resolve('css/fonts.css'):
+            return None
+        text, path = self._static_text('css/fonts.css')
+        return re.sub(r'url\((["\']?)([^)"\']+)\1\)',
+                      lambda m: f'url({m.group(1)}{urllib.parse.urljoin(path, m.group(2))}{m.group(1)})', text)
+
+    def _build_parts(self):
+        context = {'inline_questions': Markup(PLACEHOLDER) if self.inline_questions else None,
+                   'critical_css': None, 'font_css': None}
+        if self.inline_css:
+            # Render once to see what's visible, then again with the rules it needs
+            stylesheet, _ = self._static_text(self.stylesheet)
+            context['critical_css'] = Markup(critical_css(stylesheet, self._render(**context)))
+            font_css = self._font_css()
+            context['font_css'] = font_css and Markup(font_css)
+        head, _, tail = self._render(**context).partition(PLACEHOLDER)
+        return head.encode('utf-8'), tail.encode('utf-8')
+
+    def parts(self):
+        """(head, tail) bytes around the question payload"""
+        return self._parts
+
+    def render(self, questions_payload=b''):
+        """Page bytes with questions_payload (a JSON array) inlined"""
+        head, tail = self.parts()
+        if not self.inline_questions:
+            return head + tail
+        return head + script_json(questions_payload.rstrip()) + tail
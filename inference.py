@@ -0,0 +1,356 @@
+"""
+CatBoost Inference Server
+Serves the model exported by train_model.py: a model.bundle (see
+model_bundle.py), or the older model.cbm + encoders.pkl/scalers.pkl/
+feature_order.pkl artifacts.
+
+Artifacts are loaded once. The category arrays and mean/scale vectors are
+flattened into plain lookup tables at load time, so encoding a request is a
+handful of dict lookups. Concurrent requests are coalesced into single
+predict calls by a background micro-batcher.
+
+A BundleWatcher can poll the bundle file and hand a freshly loaded server to
+the app whenever it changes (hot swap, no restart).
+"""
+
+import logging
+import os
+import pickle
+import queue
+import threading
+from concurrent.futures import Future
+
+from ml_calculator import SCORING_TABLE
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = os.environ.get('MODEL_DIR', os.path.dirname(os.path.abspath(__file__)))
+MODEL_BUNDLE = os.environ.get('MODEL_BUNDLE') or os.path.join(MODEL_DIR, 'model.bundle')
+MODEL_RELOAD_INTERVAL = float(os.environ.get('MODEL_RELOAD_INTERVAL', 5))
+
+# Dataset column and raw dataset values for each quiz question, keyed by
+# question id. Slider questions map straight onto a numeric column.
+QUIZ_FEATURES = {
+    1: ('Heating', {'Electricity': 'electricity', 'Natural gas': 'natural gas',
+                    'Wood': 'wood', 'Coal': 'coal'}),
+    2: ('TV Daily Hour', None),
+    3: ('Internet Daily', None),
+    4: ('Transport', {'Walk/Bicycle': 'walk/bicycle', 'Public transport': 'public',
+                      'Private vehicle': 'private'}),
+    5: ('Vehicle Distance', None),
+    6: ('Flight', {'Never': 'never', 'Rarely': 'rarely', 'Frequently': 'frequently',
+                   'Very frequently': 'very frequently'}),
+    7: ('Diet', {'Vegan': 'vegan', 'Vegetarian': 'vegetarian',
+                 'Pescatarian': 'pescatarian', 'Omnivore': 'omnivore'}),
+    8: ('Grocery', None),
+    9: ('Waste Weekly', None),
+    10: ('Clothes Monthly', None),
+    11: ('Bag Size', {'Small': 'small', 'Medium': 'medium', 'Large': 'large',
+                      'Extra large': 'extra large'}),
+    12: ('Shower', {'Less frequently (every 2-3 days)': 'less frequently', 'Daily': 'daily',
+                    'More frequently (1.5x/day)': 'more frequently', 'Twice a day': 'twice a day'}),
+}
+
+# Answers that also imply a value for a column the quiz doesn't ask about
+IMPLIED_FEATURES = {
+    (4, 'Private vehicle'): {'Vehicle': 'petrol'},
+}
+
+# Raw values used for categorical columns the quiz doesn't cover. Unlisted
+# categorical columns (the recycling/cooking flags) default to 0, unanswered
+# numeric columns to the training mean.
+FEATURE_DEFAULTS = {
+    'Body Type': 'normal',
+    'Sex': 'female',
+    'Vehicle': 'None',
+    'Social': 'sometimes',
+    'Energy Eff': 'Sometimes',
+}
+
+
+class QuizEncoder:
+    """
+    Encode quiz answers into model feature rows using precomputed lookups
+
+    Args:
+        feature_order: Model column order
+        category_codes: {column: {raw value: label code}}
+        scaling: {column: (mean, scale)}
+    """
+
+    def __init__(self, feature_order, category_codes, scaling):
+        self.feature_order = list(feature_order)
+        index = {column: i for i, column in enumerate(self.feature_order)}
+
+        # Base row: defaults for every column, encoded once
+        self.base_row = []
+        for column in self.feature_order:
+            if column in scaling:
+                self.base_row.append(0.0)
+            else:
+                codes = category_codes.get(column, {})
+                self.base_row.append(codes.get(FEATURE_DEFAULTS.get(column, 0), 0))
+
+        # Per-question lookups, reachable by int id, JSON string id or question text
+        self._choices = {}
+        self._sliders = {}
+        for question_id, (column, option_values) in QUIZ_FEATURES.items():
+            if column not in index:
+                continue
+            entry = SCORING_TABLE.get(question_id)
+            keys = (question_id, str(question_id)) + ((entry.question,) if entry else ())
+
+            if option_values is None:
+                mean, scale = scaling[column]
+                target = (index[column], mean, scale or 1.0)
+                for key in keys:
+                    self._sliders[key] = target
+            else:
+                codes = category_codes[column]
+                options = {}
+                for option, raw_value in option_values.items():
+                    updates = [(index[column], codes.get(raw_value, 0))]
+                    for implied_column, implied_value in IMPLIED_FEATURES.get((question_id, option), {}).items():
+                        if implied_column in index:
+                            updates.append((index[implied_column],
+                                            category_codes[implied_column].get(implied_value, 0)))
+                    options[option] = updates
+                for key in keys:
+                    self._choices[key] = options
+
+    def encode(self, answers):
+        """Encode one answer set (dict keyed by question id, or a list) into a feature row"""
+        row = self.base_row.copy()
+        if isinstance(answers, dict):
+            items = answers.items()
+        else:
+            items = ((answer.get('questionId') if answer else None, answer) for answer in answers)
+
+        for key, answer in items:
+            if not answer:
+                continue
+            text = answer.get('questionText')
+
+            options = self._choices.get(key) or self._choices.get(text)
+            if options is not None:
+                for i, code in options.get(answer.get('selectedOption'), ()):
+                    row[i] = code
+                continue
+
+            slider = self._sliders.get(key) or self._sliders.get(text)
+            if slider is not None:
+                i, mean, scale = slider
+                row[i] = ((answer.get('sliderValue') or 0) - mean) / scale
+        return row
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent predictions into single batched model calls
+
+    Requests queue up while a batch is being predicted; the worker then takes
+    everything waiting (up to max_batch_size). max_wait_ms optionally holds a
+    batch open a little longer to collect more requests.
+    """
+
+    _STOP = object()
+
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=0.0):
+        self._predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name='inference-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, row):
+        """Queue a feature row; returns a Future resolving to its prediction"""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("micro-batcher is closed")
+            self._queue.put((row, future))
+        return future
+
+    def close(self):
+        """Stop the worker once everything already queued is predicted"""
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(self._STOP)
+
+    def _collect(self):
+        """Next batch, and whether the stop marker was reached"""
+        batch = [self._queue.get()]
+        while len(batch) < self.max_batch_size and batch[-1] is not self._STOP:
+            try:
+                if self.max_wait:
+                    batch.append(self._queue.get(timeout=self.max_wait))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch[-1] is self._STOP:
+            return batch[:-1], True
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect()
+            if not batch:
+                continue
+            try:
+                predictions = self._predict_fn([row for row, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), prediction in zip(batch, predictions):
+                future.set_result(float(prediction))
+
+
+class InferenceServer:
+    """Trained CatBoost model plus the encoder and batcher needed to serve it"""
+
+    def __init__(self, model, encoder, max_batch_size=64, max_wait_ms=0.0, timeout=5.0, version=None):
+        self.model = model
+        self.encoder = encoder
+        self.timeout = timeout
+        self.version = version
+        self.batcher = MicroBatcher(model.predict, max_batch_size, max_wait_ms)
+
+    def predict(self, answers):
+        """Predict annual kg CO2 for one answer set via the micro-batcher"""
+        row = self.encoder.encode(answers)
+        return round(self.batcher.submit(row).result(self.timeout), 2)
+
+    def predict_many(self, answer_sets):
+        """Predict a whole list of answer sets in one direct model call"""
+        return self.model.predict([self.encoder.encode(answers) for answers in answer_sets])
+
+    def close(self):
+        """Retire this server (after a hot swap); queued predictions still complete"""
+        self.batcher.close()
+
+
+def load_bundle(path=MODEL_BUNDLE):
+    """
+    Load a model.bundle and flatten it into lookup tables
+
+    Returns:
+        tuple: (CatBoostRegressor, QuizEncoder, bundle version)
+    """
+    from model_bundle import ModelBundle
+
+    bundle = ModelBundle(path)
+    encoder = QuizEncoder(bundle.feature_order, bundle.category_codes, bundle.scaling)
+    return bundle.load_model(), encoder, bundle.version
+
+
+def load_artifacts(model_dir=MODEL_DIR):
+    """
+    Load the older model.cbm + pickle artifacts and flatten them into lookup tables
+
+    Returns:
+        tuple: (CatBoostRegressor, QuizEncoder)
+    """
+    import catboost as cb
+    from feature_pipeline import FeaturePipeline
+
+    model = cb.CatBoostRegressor()
+    model.load_model(os.path.join(model_dir, 'model.cbm'))
+
+    with open(os.path.join(model_dir, 'encoders.pkl'), 'rb') as f:
+        encoders = pickle.load(f)
+    with open(os.path.join(model_dir, 'scalers.pkl'), 'rb') as f:
+        scalers = pickle.load(f)
+    with open(os.path.join(model_dir, 'feature_order.pkl'), 'rb') as f:
+        feature_order = pickle.load(f)
+
+    pipeline = FeaturePipeline.from_sklearn(encoders, scalers, feature_order)
+    return model, QuizEncoder(feature_order, pipeline.category_codes, pipeline.scaling)
+
+
+def load_inference_server(model_dir=MODEL_DIR, bundle_path=None, **kwargs):
+    """
+    Load the CatBoost inference server, or return None if the artifacts or
+    catboost aren't available (the app then uses the coefficient calculator)
+
+    A model.bundle (bundle_path, default MODEL_BUNDLE) is preferred over the
+    pickle artifacts in model_dir.
+    """
+    if bundle_path is None:
+        bundle_path = MODEL_BUNDLE if model_dir == MODEL_DIR else os.path.join(model_dir, 'model.bundle')
+    try:
+        if os.path.exists(bundle_path):
+            model, encoder, version = load_bundle(bundle_path)
+            source = bundle_path
+        elif os.path.exists(os.path.join(model_dir, 'model.cbm')):
+            (model, encoder), version = load_artifacts(model_dir), None
+            source = model_dir
+        else:
+            logger.info("ℹ️  No model artifacts in %s - using coefficient calculator", model_dir)
+            return None
+    except Exception as e:
+        logger.warning("⚠️  Could not load CatBoost model (%s) - using coefficient calculator", e)
+        return None
+
+    logger.info("✅ CatBoost model %sloaded from %s (%d features)", f"{version} " if version else "", source,
+                len(encoder.feature_order), extra={'model_version': version})
+    return InferenceServer(model, encoder, version=version, **kwargs)
+
+
+class BundleWatcher:
+    """
+    Poll a bundle file and hot-swap the model when it changes
+
+    Each time the file's size/mtime changes, the bundle is loaded (checksum
+    verified) and on_swap(server) is called with the new InferenceServer.
+    A bundle that fails to load is logged and skipped; the current model
+    keeps serving.
+    """
+
+    def __init__(self, path, on_swap, interval=MODEL_RELOAD_INTERVAL, **server_kwargs):
+        self.path = path
+        self.on_swap = on_swap
+        self.interval = interval
+        self.server_kwargs = server_kwargs
+        self._stamp = self._read_stamp()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+
+    def _read_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def check(self):
+        """Swap in the bundle if it changed since the last check; returns True on a swap"""
+        stamp = self._read_stamp()
+        if stamp is None or stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        try:
+            model, encoder, version = load_bundle(self.path)
+        except Exception as e:
+            logger.warning("⚠️  Ignoring model bundle %s: %s", self.path, e)
+            return False
+        self.on_swap(InferenceServer(model, encoder, version=version, **self.server_kwargs))
+        logger.info("🔄 Hot-swapped CatBoost model %s from %s", version, self.path, extra={'model_version': version})
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
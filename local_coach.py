@@ -0,0 +1,318 @@
+"""
+Local Coach
+Deterministic EcoCoach answers for the most common chat intents, built in
+process from the quiz catalog and the user's own answers and results. No
+LLM call; an answer takes a few microseconds (python -m benchmarks.bench_local_coach).
+
+Intents (each needs one of its anchor words in the message):
+
+- explain_question: "What should I answer for this question?" on the quiz
+  screen: the question's options and their CO₂ from QUESTIONS
+- biggest_impact: "What's my biggest climate impact?": the category furthest
+  above average in the results (or the largest so far in the answers), and
+  the answer that adds the most to it
+- top_product: "What should I buy?": the catalog product that best fits the
+  message and the biggest category
+- quick_win: "Give me a quick win": the first tips for the biggest category
+
+Confidence is the share of the message's content words the intent covers
+(halved when another intent also matches, and when the answer can only be
+generic because there are no answers or results yet). It is 0 when one of
+the intent's anchor words follows a negation ("Should I not buy a
+product?"), so those messages go to Claude. With LOCAL_COACH=first
+/chat answers locally at LOCAL_COACH_CONFIDENCE or more and asks Claude
+otherwise; without an API key, or while Claude is unavailable or busy, any
+recognised intent is answered locally.
+"""
+
+import os
+import re
+import threading
+from collections import Counter, namedtuple
+
+from catalog_index import STOP_WORDS, category_weights
+from quiz_data import AVERAGE_EMISSIONS, PRODUCTS, QUESTIONS, TIPS
+
+LOCAL_COACH = os.environ.get('LOCAL_COACH', 'first')  # first, fallback (only when Claude can't answer) or off
+LOCAL_COACH_CONFIDENCE = float(os.environ.get('LOCAL_COACH_CONFIDENCE', 0.75))
+
+GENERIC = 0.5  # certainty of an answer that can't use the user's own answers or results
+
+# "not buy", "don't want to buy", "without buying": an anchor up to NEGATION_WINDOW words after these is negated
+NEGATIONS = frozenset({'not', 'no', 'never', 'without', 'nor', 'cannot', 'dont', 'doesnt', 'didnt', 'shouldnt',
+                       'wont', 'cant'})
+NEGATION_WINDOW = 3
+
+LocalAnswer = namedtuple('LocalAnswer', ['intent', 'confidence', 'reply'])
+
+# intent -> (anchor words, words the intent covers)
+INTENTS = {
+    'explain_question': (
+        {'answer', 'pick', 'choose', 'select', 'option', 'explain', 'help'},
+        {'answer', 'pick', 'choose', 'select', 'option', 'explain', 'help', 'question', 'mean', 'choice', 'planet',
+         'greenest', 'lowest', 'best', 'which', 'one', 'eco', 'friendly', 'right', 'correct'},
+    ),
+    'biggest_impact': (
+        {'biggest', 'largest', 'worst', 'highest', 'main'},
+        {'biggest', 'largest', 'worst', 'highest', 'main', 'impact', 'climate', 'carbon', 'co2', 'emission',
+         'footprint', 'category', 'source', 'problem', 'area'},
+    ),
+    'top_product': (
+        {'product', 'buy', 'purchase', 'gadget', 'shop'},
+        {'product', 'buy', 'purchase', 'gadget', 'shop', 'recommend', 'recommendation', 'suggest', 'suggestion',
+         'worth', 'get', 'eco', 'green', 'sustainable', 'best', 'top', 'which', 'one'},
+    ),
+    'quick_win': (
+        {'quick', 'easy', 'simple', 'start'},
+        {'quick', 'easy', 'simple', 'start', 'give', 'win', 'first', 'step', 'change', 'tip', 'thing', 'today',
+         'fast', 'where', 'action'},
+    ),
+}
+
+INTENT_WORDS = frozenset().union(*(vocabulary for _, vocabulary in INTENTS.values()))
+# Retrieval stop words minus the ones that signal an intent ("which", "best", "give", ...)
+IGNORED_WORDS = (STOP_WORDS - INTENT_WORDS) | {'please', 'pls', 'hey', 'hi', 'hello', 'ecocoach', 'thanks', 'thank',
+                                               'want', 'need', 'know', 'like', 'really', 'im', 'lol'}
+
+
+def _words(message):
+    """Lowercase words with plural 's' dropped and "n't" spelled out (don't -> do not)"""
+    words = []
+    for word in re.findall(r'[a-z0-9]+', re.sub(r"n['’]t\b", ' not', message.lower())):
+        if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'is', 'us')):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def content_words(message, words=None):
+    """Lowercase words of a message that carry meaning (stop words, 1-letter words and plural 's' dropped)"""
+    return [word for word in words or _words(message) if len(word) > 1 and word not in IGNORED_WORDS]
+
+
+def negated_words(words):
+    """Words (from _words) that come up to NEGATION_WINDOW words after a negation"""
+    if NEGATIONS.isdisjoint(words):
+        return set()
+    return {word for index, word in enumerate(words)
+            if not NEGATIONS.isdisjoint(words[max(0, index - NEGATION_WINDOW):index])}
+
+
+def classify(message):
+    """
+    Intents of a message with their confidence, best first
+
+    Returns:
+        list: [(intent, confidence)] for intents whose anchor word appears (confidence 0 when
+            one of them is negated)
+    """
+    all_words = _words(message)
+    words = content_words(message, all_words)
+    if not words:
+        return []
+    negated = negated_words(all_words)
+    scores = []
+    for intent, (anchors, vocabulary) in INTENTS.items():
+        present = anchors.intersection(words)
+        if not present:
+            continue
+        if not present.isdisjoint(negated):
+            scores.append((intent, 0.0))  # "Should I not buy a product?" isn't asking for one
+            continue
+        scores.append((intent, sum(word in vocabulary for word in words) / len(words)))
+    scores.sort(key=lambda score: -score[1])
+    if len(scores) > 1:
+        scores[0] = (scores[0][0], scores[0][1] * GENERIC)  # asks for two things: Claude does that better
+    return scores
+
+
+def _numeric(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _number(value):
+    return f'{value:,.0f}' if _numeric(value) else str(value)
+
+
+class LocalCoach:
+    """
+    Answers the common intents from the quiz catalog, answers and results
+
+    Args:
+        questions, tips, products, averages: The quiz_data tables
+        catalog: ResultsCatalog to pick products by message (None: each category's first product)
+    """
+
+    def __init__(self, questions=QUESTIONS, tips=TIPS, products=PRODUCTS, averages=AVERAGE_EMISSIONS, catalog=None):
+        self.tips = tips
+        self.products = products
+        self.averages = averages
+        self.catalog = catalog
+        self.questions = {question['question']: dict(question, category=category)
+                          for category, category_questions in questions.items() for question in category_questions}
+        self.answered = Counter()
+        self.declined = 0
+        self._lock = threading.Lock()
+
+    def answer(self, data, threshold=LOCAL_COACH_CONFIDENCE):
+        """
+        Local reply to a chat request, or None when no intent is confident enough
+
+        Args:
+            data: The chat request JSON (message, screen_context, current_question, results, user_answers)
+            threshold: Smallest confidence answered (0 answers any recognised intent)
+
+        Returns:
+            LocalAnswer or None
+        """
+        answer = None
+        for intent, confidence in classify(str(data.get('message', '')))[:1]:
+            built = getattr(self, f'_{intent}')(data)
+            if built is not None and confidence * built[1] >= max(threshold, 1e-9):
+                answer = LocalAnswer(intent, confidence * built[1], built[0])
+        with self._lock:
+            if answer is None:
+                self.declined += 1
+            else:
+                self.answered[answer.intent] += 1
+        return answer
+
+    def stats(self):
+        with self._lock:
+            return {'answered': dict(self.answered), 'declined': self.declined}
+
+    # Context
+
+    def _standings(self, data):
+        """
+        Categories worst first, from the results or else from the answers so far
+
+        Returns:
+            tuple: ([(category, emissions, average, difference)], 'results' | 'answers' | None);
+                average and difference are None for answers
+        """
+        results = data.get('results') if isinstance(data.get('results'), dict) else {}
+        rows = []
+        if isinstance(results.get('categories'), dict):
+            for category, result in results['categories'].items():
+                if isinstance(result, dict):
+                    rows.append((category, result.get('co2_annual'), result.get('average'), result.get('difference')))
+        elif isinstance(results.get('results'), list):
+            for result in results['results']:
+                if isinstance(result, dict):
+                    rows.append((result.get('category'), result.get('emissions'), result.get('average'),
+                                 result.get('difference')))
+        # The reply quotes emissions, average and difference: rows missing any of them can't be used
+        rows = [row for row in rows if isinstance(row[0], str) and all(_numeric(value) for value in row[1:])]
+        if rows:
+            return sorted(rows, key=lambda row: -row[3]), 'results'
+
+        totals = Counter()
+        for answer in self._answers(data):
+            if isinstance(answer.get('category'), str):
+                totals[answer['category']] += answer['co2']
+        if totals:
+            return [(category, co2, None, None) for category, co2 in totals.most_common()], 'answers'
+        return [], None
+
+    @staticmethod
+    def _answers(data):
+        answers = data.get('user_answers')
+        if not isinstance(answers, list):
+            return []
+        return [answer for answer in answers if isinstance(answer, dict) and _numeric(answer.get('co2'))]
+
+    def _biggest_category(self, data):
+        """(category, certainty): the user's worst category, or the largest average one"""
+        standings, source = self._standings(data)
+        if standings and standings[0][0] in self.tips:
+            return standings[0][0], 1.0
+        return max(self.averages, key=self.averages.get), GENERIC
+
+    def _biggest_answer(self, data, category):
+        answers = [answer for answer in self._answers(data) if answer.get('category') == category]
+        if not answers:
+            return ""
+        answer = max(answers, key=lambda answer: answer['co2'])
+        return (f"\n\nThe biggest piece is Question {answer.get('questionNumber', '?')}, where you chose "
+                f"\"{answer.get('selectedOption', '?')}\" (+{_number(answer['co2'])} kg CO₂).")
+
+    # Intents: (reply, certainty) or None when the intent can't be answered here
+
+    def _explain_question(self, data):
+        current = data.get('current_question')
+        if data.get('screen_context') != 'quiz' or not isinstance(current, dict) \
+                or not isinstance(current.get('question'), str):
+            return None
+        question = self.questions.get(current.get('question'))
+        if question is None or current.get('category') != question['category']:
+            return None
+        number = current.get('number', '?')
+        reply = f"Question {number} is about {question['category'].lower()}: \"{question['question']}\"\n"
+        if question.get('options'):
+            reply += "\nHere's what each option adds per year:\n"
+            for option in question['options']:
+                reply += f"\n• {option['text']}: {_number(option['co2'])} kg CO₂"
+            lowest = min(question['options'], key=lambda option: option['co2'])
+            reply += f"\n\n🌱 \"{lowest['text']}\" is the lightest on the planet."
+        else:
+            unit = question.get('unit', '')
+            per_unit = question.get('co2_per_unit', 0)
+            reply += (f"\nSlide from {_number(question['min'])} to {_number(question['max'])} {unit}: each "
+                      f"{unit[:-1] if unit.endswith('s') else unit} "
+                      f"adds about {per_unit:g} kg CO₂ a year, so the maximum adds "
+                      f"{_number(question['max'] * per_unit)} kg.")
+        reply += " Pick what honestly matches your habits so your results are accurate!"
+        return reply, 1.0
+
+    def _biggest_impact(self, data):
+        standings, source = self._standings(data)
+        if source == 'results':
+            category, emissions, average, difference = standings[0]
+            if difference > 0:
+                reply = (f"🔍 Your biggest climate impact is {category}: {_number(emissions)} kg CO₂ a year, "
+                         f"{_number(difference)} kg above the {_number(average)} kg average.")
+            else:
+                reply = (f"🎉 Every category is at or below average! {category} is still your largest at "
+                         f"{_number(emissions)} kg CO₂ a year.")
+        elif source == 'answers':
+            category, emissions = standings[0][:2]
+            reply = f"🔍 So far, {category} adds the most to your footprint: {_number(emissions)} kg CO₂ a year."
+        else:
+            category = max(self.averages, key=self.averages.get)
+            return (f"🔍 For most people it's {category}, at {_number(self.averages[category])} kg CO₂ a year on "
+                    f"average. Take the quiz and I'll tell you what yours is!", GENERIC)
+        if category not in self.tips:
+            return None
+        reply += self._biggest_answer(data, category)
+        reply += f"\n\n🎯 A good first step: {self.tips[category][0]}"
+        return reply, 1.0
+
+    def _top_product(self, data):
+        category, certainty = self._biggest_category(data)
+        if self.catalog is not None:
+            weights = category_weights(data.get('results')) or {category: 1.0}
+            picked = self.catalog.products.search(str(data.get('message', '')), weights, 1)
+            if picked:
+                category, product = picked[0]
+            else:
+                return None
+        elif self.products.get(category):
+            product = self.products[category][0]
+        else:
+            return None
+        footprint = f"your {category}" if certainty == 1 else f"the {category}"  # generic: the largest average
+        reply = (f"🛒 For {footprint} footprint, try the {product['name']} ({product.get('price', '')}): "
+                 f"{product.get('description', '')}.")
+        return reply, certainty
+
+    def _quick_win(self, data):
+        category, certainty = self._biggest_category(data)
+        tips = self.tips.get(category) or []
+        if not tips:
+            return None
+        for_whom = "" if certainty == 1 else " (the biggest footprint for most people)"
+        reply = f"🎯 Quick win for {category}{for_whom}: {tips[0]}"
+        if len(tips) > 1:
+            reply += f"\n\nThen, when you're ready: {tips[1]}"
+        return reply, certainty
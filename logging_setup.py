@@ -0,0 +1,173 @@
+"""
+Logging Setup
+Structured, non-blocking logging for the app:
+
+- Records are handed to a QueueHandler and written by a background
+  QueueListener, so request threads never block on stdout
+- Every record carries the current request id and route (set per request
+  by the Flask hooks / ASGI router) plus any extra= fields
+- Output is one JSON object per line (LOG_FORMAT=json, default) or a
+  readable line (LOG_FORMAT=text)
+
+Levels come from the environment:
+
+    LOG_LEVEL=INFO                                   # root level (default INFO)
+    LOG_LEVELS=ml_calculator=DEBUG,app=WARNING       # per-module overrides
+
+Per-request debug dumps (payloads, answers, prompts) are logged at DEBUG,
+so they're off unless a module is explicitly set to DEBUG.
+"""
+
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+import uuid
+
+# Request id and route of the request being handled ('-' outside requests)
+request_context = contextvars.ContextVar('request_context', default=('-', '-'))
+
+# LogRecord attributes that aren't user-supplied extra= fields
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id', 'route'}
+
+_listener = None
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the current request id and route"""
+
+    def filter(self, record):
+        record.request_id, record.route = request_context.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including extra= fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'request_id': getattr(record, 'request_id', '-'),
+            'route': getattr(record, 'route', '-'),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = record.stack_info
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that keeps the traceback out of the message
+
+    The stock prepare() formats the record, folding the traceback into msg, and
+    drops exc_info. Here msg is only merged with its args and the traceback is
+    rendered into exc_text (in the calling thread, while its frames are
+    alive), so the formatter can write it to its own field.
+    """
+
+    _traceback_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self._traceback_formatter.formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+TEXT_FORMAT = '%(asctime)s %(levelname)-7s %(name)s [%(request_id)s %(route)s] %(message)s'
+
+
+def parse_levels(spec):
+    """'a=DEBUG,b.c=WARNING' -> {'a': 'DEBUG', 'b.c': 'WARNING'}"""
+    levels = {}
+    for item in (spec or '').split(','):
+        name, sep, level = item.partition('=')
+        if sep and name.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level=None, levels=None, fmt=None, stream=None):
+    """
+    Install the queue-based handler on the root logger (safe to call again)
+
+    Args:
+        level: Root level (default LOG_LEVEL or INFO)
+        levels: {logger name: level} overrides (default parsed from LOG_LEVELS)
+        fmt: 'json' or 'text' (default LOG_FORMAT or json)
+        stream: Where the listener writes (default stdout)
+    """
+    global _listener
+    level = level or os.environ.get('LOG_LEVEL', 'INFO')
+    levels = parse_levels(os.environ.get('LOG_LEVELS')) if levels is None else levels
+    fmt = fmt or os.environ.get('LOG_FORMAT', 'json')
+
+    if _listener is not None:
+        _listener.stop()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+
+    # The filter runs in the logging thread, where the request context lives
+    handler = StructuredQueueHandler(queue.SimpleQueue())
+    handler.addFilter(RequestContextFilter())
+    _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=False)
+    _listener.start()
+
+    root = logging.getLogger()
+    for old in list(root.handlers):
+        if isinstance(old, logging.handlers.QueueHandler):
+            root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+    for name, module_level in levels.items():
+        logging.getLogger(name).setLevel(module_level)
+    return _listener
+
+
+@atexit.register
+def _flush_on_exit():
+    if _listener is not None:
+        _listener.stop()
+
+
+def start_request(route, request_id=None):
+    """
+    Enter a request: sets the context stamped on log records
+
+    Returns:
+        tuple: (request id, context token, start time) for end_request
+    """
+    request_id = request_id or uuid.uuid4().hex[:16]
+    token = request_context.set((request_id, route))
+    return request_id, token, time.perf_counter()
+
+
+def end_request(logger, started, method, status):
+    """Log the request summary and leave the request context"""
+    request_id, token, start = started
+    logger.info("%s %s %s", method, request_context.get()[1], status, extra={
+        'status': status,
+        'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+    })
+    request_context.reset(token)
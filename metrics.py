@@ -0,0 +1,234 @@
+"""
+Metrics
+In-process counters, gauges and histograms exposed at GET /metrics in the
+Prometheus text format (no prometheus_client dependency).
+
+- Per-route request counts, latency histograms and in-flight gauges, recorded
+  by the Flask request hooks and by the ASGI router for its native routes
+- Claude call latency, retries and token usage (from the response's usage field)
+- Error counts by exception type and route
+- Values that are cheap to read on demand (conversation store size, cache hit
+  ratios, model version) come from collectors called at scrape time
+
+Recording is a dict update under a lock, a few microseconds per request
+(python -m benchmarks.bench_metrics). Every worker process keeps its own
+registry, so with several gunicorn workers each scrape sees one worker.
+"""
+
+import bisect
+import threading
+import time
+
+from logging_setup import request_context
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; request buckets cover cached hits (sub-ms) to slow chats
+REQUEST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+UPSTREAM_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+
+UNMATCHED_ROUTE = '<unmatched>'  # 404s share one label so unknown paths can't grow the series count
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A named metric family; series are keyed by a tuple of label values"""
+
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _header(self):
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+
+    def render(self):
+        with self._lock:
+            series = sorted(self._series.items())
+        return self._header() + [f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}'
+                                 for labels, value in series]
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, labels=(), amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) - amount
+
+
+class Histogram(Metric):
+    """
+    Fixed-bucket histogram; per-bucket counts are cumulated when rendered
+
+    Args:
+        buckets: Ascending upper bounds (a +Inf bucket is added)
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=REQUEST_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+        self._bounds = [repr(float(bound)) for bound in self.buckets] + ['+Inf']
+
+    def observe(self, value, labels=()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        with self._lock:
+            series = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        lines = self._header()
+        names = self.labelnames + ('le',)
+        for labels, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self._bounds, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_labels(names, labels + (bound,))} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+class Registry:
+    """Metric families plus scrape-time collectors, rendered in registration order"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """
+        Register a function called on every scrape
+
+        It returns [(name, kind, help, [(labels dict, value), ...]), ...]
+        """
+        self._collectors.append(collect)
+        return collect
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            for name, kind, help_text, samples in collect():
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+                lines += [f'{name}{_labels(tuple(labels), tuple(labels.values()))} {_number(value)}'
+                          for labels, value in samples]
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    'ecotrace_http_requests_total', 'HTTP requests by route, method and status', ('route', 'method', 'status')))
+http_duration = registry.register(Histogram(
+    'ecotrace_http_request_duration_seconds', 'HTTP request latency by route', ('route',)))
+http_in_flight = registry.register(Gauge(
+    'ecotrace_http_requests_in_flight', 'HTTP requests currently being handled', ('route',)))
+upstream_duration = registry.register(Histogram(
+    'ecotrace_claude_request_duration_seconds', 'Claude API call latency by call type and outcome',
+    ('call', 'outcome'), buckets=UPSTREAM_BUCKETS))
+upstream_retries = registry.register(Counter(
+    'ecotrace_claude_retries_total', 'Claude API retries by call type and reason (status code, timeout, connection)',
+    ('call', 'reason')))
+upstream_tokens = registry.register(Counter(
+    'ecotrace_claude_tokens_total', 'Claude API tokens by type (from the response usage field)', ('type',)))
+prompt_tokens = registry.register(Counter(
+    'ecotrace_chat_input_tokens_estimated_total',
+    'Estimated chat input tokens (system prompt + history): as sent, and as the uncompacted last-11-message '
+    'history would have been', ('prompt',)))
+errors = registry.register(Counter(
+    'ecotrace_errors_total', 'Errors by exception type and route', ('route', 'exception')))
+
+# usage field -> token type label
+USAGE_FIELDS = (('input_tokens', 'input'), ('output_tokens', 'output'),
+                ('cache_read_input_tokens', 'cache_read'), ('cache_creation_input_tokens', 'cache_write'))
+
+
+def request_started(route):
+    """
+    Count a request as in flight
+
+    Returns:
+        tuple: (route, start time) for request_finished
+    """
+    http_in_flight.inc((route,))
+    return route, time.perf_counter()
+
+
+def request_finished(started, method, status):
+    """Record a finished request's status and latency"""
+    route, start = started
+    http_duration.observe(time.perf_counter() - start, (route,))
+    http_requests.inc((route, method, str(status)))
+    http_in_flight.dec((route,))
+
+
+def record_error(exc, route=None):
+    """Count an exception (route defaults to the current request's, from the logging context)"""
+    errors.inc((route or request_context.get()[1], type(exc).__name__))
+
+
+def record_upstream(call, seconds, usage=None, outcome='ok'):
+    """
+    Record one Claude API call
+
+    Args:
+        call: 'create' or 'stream'
+        seconds: Wall time of the call
+        usage: The response's usage object (None for failed calls)
+        outcome: 'ok' or 'error'
+    """
+    upstream_duration.observe(seconds, (call, outcome))
+    if usage is not None:
+        for field, token_type in USAGE_FIELDS:
+            tokens = getattr(usage, field, None)
+            if tokens:
+                upstream_tokens.inc((token_type,), tokens)
+
+
+def record_retry(call, reason):
+    """Count a retried Claude API attempt"""
+    upstream_retries.inc((call, reason))
+
+
+def record_prompt_tokens(sent, uncompacted):
+    """Record a chat request's estimated input tokens, and the estimate without history compaction"""
+    prompt_tokens.inc(('sent',), sent)
+    prompt_tokens.inc(('uncompacted',), uncompacted)
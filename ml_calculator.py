@@ -7,191 +7,271 @@ Dataset Statistics:
 - Mean emission: 2,269 kg CO2/year
 - Std dev: 1,017 kg
 - Range: 306 - 8,377 kg
+
+The coefficient table is loaded from coefficients.json (COEFFICIENTS_FILE)
+when distill_coefficients.py has generated one from the trained model;
+otherwise the hand-tuned table below is used.
 """
 
+import json
+import logging
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from quiz_data import QUESTIONS
+
+logger = logging.getLogger(__name__)
+
 # Dataset statistics
 DATASET_MEAN = 2269.15
 DATASET_STD = 1017.68
 
-# Emission coefficients derived from CatBoost model and dataset correlations
-# These are calibrated to produce realistic annual emissions
+# Baseline for features not in quiz (Social Activity, Recycling, Cooking, etc.)
+# Dataset mean is 2269, our questions cover ~80% of variance
+HAND_TUNED_BASELINE = 250
+
+# Observed range of the dataset, used to keep totals realistic
+EMISSION_RANGE = (306, 8377)
+
+CATEGORIES = ('Home', 'Mobility', 'Food', 'Consumption')
+CATEGORY_ICONS = {'Home': '🏠', 'Mobility': '🚗', 'Food': '🍽️', 'Consumption': '🛍️'}
+
+# Hand-tuned emission coefficients, calibrated by eye against CatBoost model
+# insights and dataset correlations (used when no distilled table exists)
+#
+# Keyed by question id. Multiple choice questions map each option to kg CO2/year
+# ('default' covers options we don't know about); slider questions add
+# 'per_unit' kg CO2/year for every unit of the slider value.
+HAND_TUNED_COEFFICIENTS = {
+    # Heating energy source
+    1: {'label': 'Heating: {}', 'default': 400,
+        'options': {'Electricity': 200, 'Natural gas': 380, 'Wood': 520, 'Coal': 850}},
+    # TV/Computer hours: 15 kg per hour per year
+    2: {'label': 'TV/PC: {}h', 'per_unit': 15},
+    # Internet hours: 10 kg per hour per year
+    3: {'label': 'Internet: {}h', 'per_unit': 10},
+    # Transportation mode
+    4: {'label': 'Transport: {}', 'default': 400,
+        'options': {'Walk/Bicycle': 50, 'Public transport': 350, 'Private vehicle': 850}},
+    # Vehicle distance: 0.2 kg CO2 per km driven per month
+    5: {'label': 'Vehicle km: {}/month', 'per_unit': 0.2},
+    # Air travel
+    6: {'label': 'Flight: {}', 'default': 200,
+        'options': {'Never': 0, 'Rarely': 250, 'Frequently': 800, 'Very frequently': 1600}},
+    # Diet type
+    7: {'label': 'Diet: {}', 'default': 600,
+        'options': {'Vegan': 300, 'Vegetarian': 450, 'Pescatarian': 600, 'Omnivore': 950}},
+    # Monthly grocery bill: $1 = ~4 kg CO2 per year (food production and transport)
+    8: {'label': 'Grocery: ${}/month', 'per_unit': 4},
+    # Waste bags per week: each bag = ~40 kg CO2 per year
+    9: {'label': 'Waste bags: {}/week', 'per_unit': 40},
+    # New clothes per month: each item = ~12 kg CO2 per year (manufacturing + transport)
+    10: {'label': 'Clothes: {}/month', 'per_unit': 12},
+    # Waste bag size
+    11: {'label': 'Bag size: {}', 'default': 300,
+         'options': {'Small': 150, 'Medium': 280, 'Large': 420, 'Extra large': 580}},
+    # Shower frequency
+    12: {'label': 'Shower: {}', 'default': 220,
+         'options': {'Less frequently (every 2-3 days)': 120, 'Daily': 220,
+                     'More frequently (1.5x/day)': 320, 'Twice a day': 420}},
+}
+
+# Generated by distill_coefficients.py from the trained model (optional)
+COEFFICIENTS_FILE = os.environ.get('COEFFICIENTS_FILE',
+                                   os.path.join(os.path.dirname(os.path.abspath(__file__)), 'coefficients.json'))
+
+
+def load_coefficients(path=COEFFICIENTS_FILE):
+    """
+    Load a distilled coefficient table, falling back to the hand-tuned one
+
+    Labels always come from the hand-tuned table; the generated file only
+    supplies the numbers.
+
+    Returns:
+        tuple: (coefficients keyed by question id, baseline, source description)
+    """
+    try:
+        with open(path) as f:
+            generated = json.load(f)
+        coefficients = {}
+        for question_id, coeffs in HAND_TUNED_COEFFICIENTS.items():
+            values = generated['coefficients'][str(question_id)]
+            coefficients[question_id] = dict(values, label=coeffs['label'])
+        baseline = float(generated['baseline'])
+    except FileNotFoundError:
+        return HAND_TUNED_COEFFICIENTS, HAND_TUNED_BASELINE, 'hand-tuned'
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning("⚠️  Ignoring coefficient table %s (%s) - using hand-tuned coefficients", path, e)
+        return HAND_TUNED_COEFFICIENTS, HAND_TUNED_BASELINE, 'hand-tuned'
+
+    source = f"distilled from model {generated.get('model_version') or '(unversioned)'}"
+    logger.info("📐 Coefficient table %s (holdout MAE vs model: %s kg)", source,
+                generated.get('fidelity', {}).get('distilled', {}).get('mae', '?'))
+    return coefficients, baseline, source
+
+
+COEFFICIENTS, BASELINE_EMISSION, COEFFICIENTS_SOURCE = load_coefficients()
+
+# One compiled row of the scoring table. Multiple choice entries carry an
+# option -> kg lookup (per_unit is None); slider entries carry per_unit.
+ScoringEntry = namedtuple(
+    'ScoringEntry',
+    ['question_id', 'question', 'category', 'label', 'options', 'default', 'per_unit']
+)
+
+
+def compile_scoring_table(questions=QUESTIONS, coefficients=COEFFICIENTS):
+    """
+    Compile the quiz catalog and coefficients into a scoring table
+
+    Args:
+        questions: Quiz catalog ({category: [question, ...]})
+        coefficients: Per-question coefficients keyed by question id
+
+    Returns:
+        dict: ScoringEntry keyed by question id
+    """
+    table = {}
+    for category, category_questions in questions.items():
+        for question in category_questions:
+            coeffs = coefficients.get(question['id'])
+            if coeffs is None:
+                continue
+
+            if question.get('type') == 'slider':
+                options, default, per_unit = None, 0, coeffs['per_unit']
+            else:
+                default = coeffs['default']
+                options = {
+                    opt['text']: coeffs['options'].get(opt['text'], default)
+                    for opt in question['options']
+                }
+                per_unit = None
+
+            table[question['id']] = ScoringEntry(
+                question['id'], question['question'], category,
+                coeffs['label'], options, default, per_unit
+            )
+    return table
+
+
+def _build_entry_lookup(table):
+    """Index entries by int id, JSON string id and question text"""
+    lookup = {}
+    for question_id, entry in table.items():
+        lookup[question_id] = entry
+        lookup[str(question_id)] = entry
+        lookup[entry.question] = entry
+    return lookup
+
+
+SCORING_TABLE = compile_scoring_table()
+_ENTRY_LOOKUP = _build_entry_lookup(SCORING_TABLE)
+
+
+def _iter_answers(user_answers):
+    """Yield (key, answer) pairs from a dict keyed by question id or a plain list"""
+    if isinstance(user_answers, dict):
+        return user_answers.items()
+    return ((answer.get('questionId') if answer else None, answer) for answer in user_answers)
+
+
+def canonicalize_answers(user_answers):
+    """
+    Canonical, hashable form of an answer set for caching
+
+    Answers are matched to the scoring table the same way calculate_emission
+    does and reduced to sorted (question id, selected option or slider value)
+    pairs, so the same choices give the same key whether they were keyed by
+    id, id string or question text.
+
+    Returns:
+        tuple or None: None when the answers can't be canonicalized safely
+        (a question answered twice, a non-numeric slider value, malformed
+        entries); callers should then skip the cache.
+    """
+    canonical = {}
+    try:
+        for key, answer in _iter_answers(user_answers):
+            if not answer:
+                continue
+            entry = _ENTRY_LOOKUP.get(key) or _ENTRY_LOOKUP.get(answer.get('questionText'))
+            if entry is None:
+                continue
+            if entry.question_id in canonical:
+                return None
+
+            if entry.per_unit is None:
+                value = answer.get('selectedOption', '')
+                if not isinstance(value, str):
+                    return None
+            else:
+                value = answer.get('sliderValue') or 0
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    return None
+                value = float(value)
+            canonical[entry.question_id] = value
+    except (AttributeError, TypeError):
+        return None
+    return tuple(sorted(canonical.items()))
+
 
 def calculate_emission(user_answers):
     """
     Calculate total CO2 emission based on user answers using ML-derived coefficients
     
     Args:
-        user_answers: List of answer dictionaries
+        user_answers: Answer dictionaries, either keyed by question id (as posted
+            to /api/calculate) or as a list. Answers are matched to the scoring
+            table by id, falling back to the question text.
     
     Returns:
         dict: Detailed emission breakdown by category
     """
     
     # Initialize emissions by category
-    emissions = {
-        'Home': 0,
-        'Mobility': 0,
-        'Food': 0,
-        'Consumption': 0
-    }
+    emissions = dict.fromkeys(CATEGORIES, 0)
     
     features_used = []
     
-    print(f"\n📊 Processing {len(user_answers)} answers...")
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug("📊 Processing %d answers...", len(user_answers))
     
-    for answer in user_answers:
+    for key, answer in _iter_answers(user_answers):
         if not answer:
             continue
-            
-        category = answer.get('category', '')
-        question_text = answer.get('questionText', '').lower()
-        selected_option = answer.get('selectedOption', '')
-        slider_value = answer.get('sliderValue', 0)
-        answer_type = answer.get('type', 'multiple_choice')
         
-        emission = 0
+        entry = _ENTRY_LOOKUP.get(key) or _ENTRY_LOOKUP.get(answer.get('questionText'))
+        if entry is None:
+            continue
         
-        # HOME CATEGORY
-        if category == 'Home':
-            # Heating energy source
-            if 'heating' in question_text:
-                heating_map = {
-                    'Electricity': 200,
-                    'Natural gas': 380,
-                    'Wood': 520,
-                    'Coal': 850
-                }
-                emission = heating_map.get(selected_option, 400)
-                features_used.append(f"Heating: {selected_option}")
-                print(f"  🏠 Heating ({selected_option}): +{emission} kg")
-                
-            # TV/Computer hours
-            elif 'tv' in question_text or 'computer' in question_text:
-                emission = slider_value * 15  # 15 kg per hour per year
-                features_used.append(f"TV/PC: {slider_value}h")
-                print(f"  🏠 TV/Computer ({slider_value}h): +{emission} kg")
-                
-            # Internet hours  
-            elif 'internet' in question_text:
-                emission = slider_value * 10  # 10 kg per hour per year
-                features_used.append(f"Internet: {slider_value}h")
-                print(f"  🏠 Internet ({slider_value}h): +{emission} kg")
-                
-            emissions['Home'] += emission
-            
-        # MOBILITY CATEGORY
-        elif category == 'Mobility':
-            # Transportation mode
-            if 'mode' in question_text or 'transportation' in question_text:
-                transport_map = {
-                    'Walk/Bicycle': 50,
-                    'Public transport': 350,
-                    'Private vehicle': 850
-                }
-                emission = transport_map.get(selected_option, 400)
-                features_used.append(f"Transport: {selected_option}")
-                print(f"  🚗 Transport ({selected_option}): +{emission} kg")
-                
-            # Vehicle distance
-            elif 'kilometer' in question_text or 'vehicle' in question_text:
-                # 0.2 kg CO2 per km per month * 12 months = 2.4 kg per km per year
-                emission = slider_value * 0.2
-                features_used.append(f"Vehicle km: {slider_value}/month")
-                print(f"  🚗 Vehicle distance ({slider_value}km/month): +{emission} kg")
-                
-            # Air travel
-            elif 'air' in question_text or 'travel by air' in question_text or 'fly' in question_text:
-                flight_map = {
-                    'Never': 0,
-                    'Rarely': 250,
-                    'Frequently': 800,
-                    'Very frequently': 1600
-                }
-                emission = flight_map.get(selected_option, 200)
-                features_used.append(f"Flight: {selected_option}")
-                print(f"  🚗 Air travel ({selected_option}): +{emission} kg")
-                
-            emissions['Mobility'] += emission
-            
-        # FOOD CATEGORY
-        elif category == 'Food':
-            # Diet type
-            if 'diet' in question_text:
-                diet_map = {
-                    'Vegan': 300,
-                    'Vegetarian': 450,
-                    'Pescatarian': 600,
-                    'Omnivore': 950
-                }
-                emission = diet_map.get(selected_option, 600)
-                features_used.append(f"Diet: {selected_option}")
-                print(f"  🍽️ Diet ({selected_option}): +{emission} kg")
-                
-            # Monthly grocery bill
-            elif 'grocery' in question_text:
-                # $1 = ~4 kg CO2 per year (food production and transport)
-                emission = slider_value * 4
-                features_used.append(f"Grocery: ${slider_value}/month")
-                print(f"  🍽️ Grocery (${slider_value}/month): +{emission} kg")
-                
-            # Waste bags per week
-            elif 'waste' in question_text and 'week' in question_text:
-                # Each bag = ~40 kg CO2 per year
-                emission = slider_value * 40
-                features_used.append(f"Waste bags: {slider_value}/week")
-                print(f"  🍽️ Waste bags ({slider_value}/week): +{emission} kg")
-                
-            emissions['Food'] += emission
-            
-        # CONSUMPTION CATEGORY
-        elif category == 'Consumption':
-            # New clothes per month
-            if 'clothes' in question_text:
-                # Each item = ~12 kg CO2 per year (manufacturing + transport)
-                emission = slider_value * 12
-                features_used.append(f"Clothes: {slider_value}/month")
-                print(f"  🛍️ Clothes ({slider_value}/month): +{emission} kg")
-                
-            # Waste bag size
-            elif 'waste' in question_text and 'size' in question_text:
-                bag_map = {
-                    'Small': 150,
-                    'Medium': 280,
-                    'Large': 420,
-                    'Extra large': 580
-                }
-                emission = bag_map.get(selected_option, 300)
-                features_used.append(f"Bag size: {selected_option}")
-                print(f"  🛍️ Bag size ({selected_option}): +{emission} kg")
-                
-            # Shower frequency
-            elif 'shower' in question_text:
-                shower_map = {
-                    'Less frequently (every 2-3 days)': 120,
-                    'Daily': 220,
-                    'More frequently (1.5x/day)': 320,
-                    'Twice a day': 420
-                }
-                emission = shower_map.get(selected_option, 220)
-                features_used.append(f"Shower: {selected_option}")
-                print(f"  🛍️ Shower ({selected_option}): +{emission} kg")
-                
-            emissions['Consumption'] += emission
+        if entry.per_unit is None:
+            value = answer.get('selectedOption', '')
+            emission = entry.options.get(value, entry.default)
+        else:
+            value = answer.get('sliderValue') or 0
+            emission = value * entry.per_unit
+        
+        feature = entry.label.format(value)
+        features_used.append(feature)
+        if debug:
+            logger.debug("%s %s: +%s kg", CATEGORY_ICONS[entry.category], feature, emission)
+        
+        emissions[entry.category] += emission
     
     # Calculate total
-    total_emission = sum(emissions.values())
-    
-    # Add baseline for features not in quiz (Social Activity, Recycling, Cooking, etc.)
-    # Dataset mean is 2269, our questions cover ~80% of variance
-    baseline = 250
-    total_emission += baseline
+    total_emission = sum(emissions.values()) + BASELINE_EMISSION
     
     # Ensure realistic bounds
-    total_emission = max(306, min(total_emission, 8377))
+    total_emission = max(EMISSION_RANGE[0], min(total_emission, EMISSION_RANGE[1]))
     
-    print(f"\n✅ Total CO2: {total_emission:.1f} kg/year")
-    print(f"   Dataset mean: {DATASET_MEAN:.1f} kg/year")
-    print(f"   Category breakdown: {emissions}\n")
+    if debug:
+        logger.debug("✅ Total CO2: %.1f kg/year (dataset mean %.1f), category breakdown: %s",
+                     total_emission, DATASET_MEAN, emissions)
     
     return {
         'emissions': emissions,
@@ -205,10 +285,150 @@ def calculate_emission(user_answers):
     }
 
 
+# ===================================
+# Batch scoring
+# ===================================
+
+# Column order of the batch feature matrix: one column per quiz question
+FEATURE_COLUMNS = tuple(sorted(SCORING_TABLE))
+
+
+def _compile_batch_arrays(table):
+    """
+    Lay the scoring table out as arrays for vectorized scoring
+
+    Multiple choice columns hold an option code (row index into option_kg,
+    -1 for an unknown option which scores the column default); slider
+    columns hold the raw slider value.
+    """
+    n_columns = len(FEATURE_COLUMNS)
+    n_slots = max(len(entry.options) for entry in table.values() if entry.options) + 1
+
+    per_unit = np.zeros(n_columns)
+    option_kg = np.zeros((n_columns, n_slots))
+    category_matrix = np.zeros((n_columns, len(CATEGORIES)))
+    column_lookup = {}
+
+    for column, question_id in enumerate(FEATURE_COLUMNS):
+        entry = table[question_id]
+        category_matrix[column, CATEGORIES.index(entry.category)] = 1
+
+        if entry.per_unit is None:
+            option_codes = {text: code for code, text in enumerate(entry.options)}
+            option_kg[column, :len(option_codes)] = list(entry.options.values())
+            option_kg[column, -1] = entry.default
+        else:
+            option_codes = None
+            per_unit[column] = entry.per_unit
+
+        for key in (question_id, str(question_id), entry.question):
+            column_lookup[key] = (column, option_codes)
+
+    slider_columns = np.flatnonzero([table[qid].per_unit is not None for qid in FEATURE_COLUMNS])
+    choice_columns = np.flatnonzero([table[qid].per_unit is None for qid in FEATURE_COLUMNS])
+
+    return {
+        'per_unit': per_unit[slider_columns],
+        'option_kg': option_kg[choice_columns],
+        'category_matrix': category_matrix,
+        'slider_columns': slider_columns,
+        'choice_columns': choice_columns,
+        'column_lookup': column_lookup,
+    }
+
+
+_BATCH = _compile_batch_arrays(SCORING_TABLE)
+
+
+def encode_answer_sets(answer_sets):
+    """
+    Encode answer sets into a feature matrix
+
+    Args:
+        answer_sets: Iterable of answer sets, each in any form accepted by
+            calculate_emission
+
+    Returns:
+        np.ndarray: (N, len(FEATURE_COLUMNS)) float matrix, NaN where a
+        question was not answered
+    """
+    column_lookup = _BATCH['column_lookup']
+    empty_row = [np.nan] * len(FEATURE_COLUMNS)
+    rows = []
+
+    for answers in answer_sets:
+        row = empty_row.copy()
+        for key, answer in _iter_answers(answers):
+            if not answer:
+                continue
+            column = column_lookup.get(key) or column_lookup.get(answer.get('questionText'))
+            if column is None:
+                continue
+            index, option_codes = column
+            if option_codes is None:
+                row[index] = answer.get('sliderValue') or 0
+            else:
+                row[index] = option_codes.get(answer.get('selectedOption'), -1)
+        rows.append(row)
+
+    return np.array(rows, dtype=float).reshape(len(rows), len(FEATURE_COLUMNS))
+
+
+def score_feature_matrix(features):
+    """
+    Score an encoded feature matrix (see encode_answer_sets)
+
+    Returns:
+        dict: Columnar results - per-category emission arrays and the
+        baselined, clamped total for every row
+    """
+    features = np.asarray(features, dtype=float)
+    contributions = np.zeros_like(features)
+
+    sliders = features[:, _BATCH['slider_columns']]
+    contributions[:, _BATCH['slider_columns']] = np.nan_to_num(sliders) * _BATCH['per_unit']
+
+    codes = features[:, _BATCH['choice_columns']]
+    unanswered = np.isnan(codes)
+    codes = np.where(unanswered, -1, codes).astype(np.intp)
+    option_kg = _BATCH['option_kg']
+    kg = option_kg[np.arange(len(option_kg)), codes]
+    kg[unanswered] = 0
+    contributions[:, _BATCH['choice_columns']] = kg
+
+    category_emissions = contributions @ _BATCH['category_matrix']
+    total = category_emissions.sum(axis=1) + BASELINE_EMISSION
+    total = np.clip(total, *EMISSION_RANGE)
+
+    return {
+        'count': len(features),
+        'categories': {category: category_emissions[:, i] for i, category in enumerate(CATEGORIES)},
+        'total': np.round(total, 2),
+    }
+
+
+def calculate_emissions_batch(answer_sets):
+    """
+    Calculate emissions for many answer sets at once
+
+    Same coefficients, baseline and bounds as calculate_emission, computed
+    as array operations over the whole batch and without per-answer output.
+
+    Args:
+        answer_sets: List of answer sets, each in any form accepted by
+            calculate_emission
+
+    Returns:
+        dict: Columnar results ('count', 'categories', 'total'), one array
+        element per answer set
+    """
+    return score_feature_matrix(encode_answer_sets(answer_sets))
+
+
 def get_comparison_data():
     """Return dataset statistics for comparison"""
     return {
         'dataset_mean': DATASET_MEAN,
         'dataset_std': DATASET_STD,
-        'dataset_range': (306, 8377)
+        'dataset_range': EMISSION_RANGE
     }
@@ -0,0 +1,226 @@
+"""
+Model Bundle
+A single versioned file holding everything inference.py needs to serve the
+trained model, replacing model.cbm + encoders.pkl + scalers.pkl +
+feature_order.pkl.
+
+- Encoders are plain category arrays (a value's code is its index) and the
+  scalers are mean/scale vectors; no sklearn objects, nothing unpickled
+- Arrays are memory-mapped and viewed in place with np.frombuffer
+- A SHA-256 of the payload is stored in the manifest and checked on load
+
+Layout (sections start on 64-byte boundaries):
+
+    b'ECOBNDL' + format byte
+    uint64 manifest length (little endian)
+    manifest JSON: version, created, checksum, feature_order, num_columns,
+                   categorical columns and {section: offset, length, dtype}
+    sections: model (CatBoost .cbm bytes), mean, scale, cat:<column>...
+
+    python -m model_bundle convert [MODEL_DIR] [--output PATH]
+    python -m model_bundle info PATH
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+import numpy as np
+
+MAGIC = b'ECOBNDL'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+BUNDLE_NAME = 'model.bundle'
+
+
+class BundleError(ValueError):
+    """Raised when a bundle is malformed, from a newer format or fails its checksum"""
+
+
+def _pad(length):
+    return -length % ALIGNMENT
+
+
+def _category_array(values):
+    """Category values as a plain NumPy array (strings, or ints for the 0/1 flags)"""
+    if all(isinstance(value, str) for value in values):
+        return np.array(values, dtype=str)
+    return np.array(values, dtype=np.int64)
+
+
+def save_bundle(path, model, categories, mean, scale, feature_order, version=None):
+    """
+    Write a bundle atomically (temp file + rename, so a watcher never sees half a file)
+
+    Args:
+        path: Output file
+        model: Fitted CatBoostRegressor
+        categories: {column: sorted category values}
+        mean: {numeric column: mean}
+        scale: {numeric column: scale}
+        feature_order: Model input column order
+        version: Label for this model (default: a UTC timestamp)
+
+    Returns:
+        dict: the manifest
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'model.cbm')
+        model.save_model(model_path)
+        with open(model_path, 'rb') as f:
+            model_bytes = f.read()
+
+    num_columns = list(mean)
+    sections = [('model', np.frombuffer(model_bytes, dtype=np.uint8)),
+                ('mean', np.array([mean[column] for column in num_columns], dtype='<f8')),
+                ('scale', np.array([scale[column] for column in num_columns], dtype='<f8'))]
+    sections += [(f'cat:{column}', _category_array(values)) for column, values in categories.items()]
+
+    table, payload, offset = {}, [], 0
+    digest = hashlib.sha256()
+    for name, array in sections:
+        data = array.tobytes()
+        table[name] = {'offset': offset, 'length': len(data), 'dtype': array.dtype.str}
+        chunk = data + b'\0' * _pad(len(data))
+        digest.update(chunk)
+        payload.append(chunk)
+        offset += len(chunk)
+
+    manifest = {
+        'format': FORMAT_VERSION,
+        'version': version or time.strftime('%Y%m%dT%H%M%SZ', time.gmtime()),
+        'created': time.time(),
+        'checksum': 'sha256:' + digest.hexdigest(),
+        'feature_order': list(feature_order),
+        'num_columns': num_columns,
+        'cat_columns': list(categories),
+        'sections': table,
+    }
+    header = json.dumps(manifest, sort_keys=True).encode()
+    header += b' ' * _pad(len(MAGIC) + 1 + 8 + len(header))
+
+    tmp_path = f'{path}.tmp{os.getpid()}'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC + bytes([FORMAT_VERSION]) + struct.pack('<Q', len(header)) + header)
+        for chunk in payload:
+            f.write(chunk)
+    os.replace(tmp_path, path)
+    return manifest
+
+
+class ModelBundle:
+    """
+    A memory-mapped bundle
+
+    Attributes:
+        manifest: The bundle's manifest dict
+        version: Its version label
+        feature_order, num_columns: Column lists
+        categories: {column: array of category values} (views into the file)
+        mean, scale: float64 vectors aligned with num_columns (views)
+    """
+
+    def __init__(self, path, verify=True):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = self._mmap
+
+        prefix = len(MAGIC) + 1 + 8
+        if len(buffer) < prefix or buffer[:len(MAGIC)] != MAGIC:
+            raise BundleError(f"{path} is not a model bundle")
+        if buffer[len(MAGIC)] > FORMAT_VERSION:
+            raise BundleError(f"{path} uses bundle format {buffer[len(MAGIC)]}, newer than {FORMAT_VERSION}")
+        (header_length,) = struct.unpack_from('<Q', buffer, len(MAGIC) + 1)
+        try:
+            self.manifest = json.loads(bytes(buffer[prefix:prefix + header_length]))
+        except ValueError as e:
+            raise BundleError(f"{path} has a corrupt manifest: {e}") from e
+        self._start = prefix + header_length
+
+        if verify:
+            digest = 'sha256:' + hashlib.sha256(memoryview(buffer)[self._start:]).hexdigest()
+            if digest != self.manifest['checksum']:
+                raise BundleError(f"{path} failed its checksum ({digest} != {self.manifest['checksum']})")
+
+        self.version = self.manifest['version']
+        self.feature_order = self.manifest['feature_order']
+        self.num_columns = self.manifest['num_columns']
+        self.mean = self.section('mean')
+        self.scale = self.section('scale')
+        self.categories = {column: self.section(f'cat:{column}') for column in self.manifest['cat_columns']}
+
+    def section(self, name):
+        """Zero-copy array view of a section"""
+        entry = self.manifest['sections'][name]
+        dtype = np.dtype(entry['dtype'])
+        return np.frombuffer(self._mmap, dtype=dtype, count=entry['length'] // dtype.itemsize,
+                             offset=self._start + entry['offset'])
+
+    def load_model(self):
+        """The CatBoost model (CatBoost parses the .cbm bytes into its own structures)"""
+        import catboost as cb
+
+        model = cb.CatBoostRegressor()
+        model.load_model(blob=bytes(self.section('model')))
+        return model
+
+    @property
+    def category_codes(self):
+        """{column: {raw value: code}} lookup tables for serving"""
+        return {column: {value: code for code, value in enumerate(values.tolist())}
+                for column, values in self.categories.items()}
+
+    @property
+    def scaling(self):
+        """{column: (mean, scale)} lookup tables for serving"""
+        return dict(zip(self.num_columns, zip(self.mean.tolist(), self.scale.tolist())))
+
+
+def convert_artifacts(model_dir, output=None, version=None):
+    """Build a bundle from train_model.py's older model.cbm + pickle artifacts"""
+    import pickle
+
+    import catboost as cb
+    from feature_pipeline import FeaturePipeline
+
+    model = cb.CatBoostRegressor()
+    model.load_model(os.path.join(model_dir, 'model.cbm'))
+    artifacts = {}
+    for name in ('encoders', 'scalers', 'feature_order'):
+        with open(os.path.join(model_dir, f'{name}.pkl'), 'rb') as f:
+            artifacts[name] = pickle.load(f)
+    pipeline = FeaturePipeline.from_sklearn(artifacts['encoders'], artifacts['scalers'], artifacts['feature_order'])
+    return save_bundle(output or os.path.join(model_dir, BUNDLE_NAME), model, pipeline.categories,
+                       pipeline.mean, pipeline.scale, pipeline.feature_order, version)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or inspect model bundles")
+    commands = parser.add_subparsers(dest='command', required=True)
+    convert = commands.add_parser('convert', help="Bundle model.cbm + encoders/scalers/feature_order pickles")
+    convert.add_argument('model_dir', nargs='?', default='.')
+    convert.add_argument('--output', help=f"Bundle path (default: MODEL_DIR/{BUNDLE_NAME})")
+    convert.add_argument('--version', help="Version label (default: UTC timestamp)")
+    info = commands.add_parser('info', help="Print a bundle's manifest and verify its checksum")
+    info.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        manifest = convert_artifacts(args.model_dir, args.output, args.version)
+        print(f"✅ Bundle {manifest['version']} written ({manifest['checksum']})")
+    else:
+        bundle = ModelBundle(args.path)
+        manifest = dict(bundle.manifest, sections=len(bundle.manifest['sections']))
+        print(json.dumps(manifest, indent=2))
+        print("✅ Checksum OK")
+
+
+if __name__ == '__main__':
+    main()
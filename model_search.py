@@ -0,0 +1,314 @@
+"""
+Model Search
+K-fold cross-validation and grid/random hyperparameter search for the
+CatBoost model, spread over a process pool.
+
+- Folds are preprocessed once (FeaturePipeline fitted on each training
+  split) and saved as .npy arrays; every candidate memory-maps the same files
+- Each (candidate, fold) fit is one pool task; CatBoost's thread_count is
+  set to cores // jobs so the pool never oversubscribes the machine
+- Every candidate's parameters, CV metrics and timings go to a results
+  table (CSV); the winner is refit on all rows and exported as the
+  model.bundle inference.py loads
+
+    folds_dir/
+        meta.json
+        <fold>/{train,valid}_{cat,num,y}.npy
+"""
+
+import csv
+import itertools
+import json
+import logging
+import os
+import random
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from feature_pipeline import TARGET, FeaturePipeline
+from model_bundle import BUNDLE_NAME, save_bundle
+
+logger = logging.getLogger(__name__)
+
+FOLDS_VERSION = 1
+
+# Settings every candidate shares (train_model.py's original configuration)
+BASE_PARAMS = {
+    'iterations': 1000,
+    'learning_rate': 0.1,
+    'depth': 5,
+    'loss_function': 'RMSE',
+    'eval_metric': 'RMSE',
+    'random_seed': 42,
+}
+EARLY_STOPPING_ROUNDS = 100
+
+# Search space for grid and random search
+PARAM_GRID = {
+    'depth': [4, 6, 8],
+    'learning_rate': [0.05, 0.1, 0.2],
+    'l2_leaf_reg': [1, 3, 9],
+}
+
+RESULT_FIELDS = ['rank', 'candidate', 'params', 'rmse', 'rmse_std', 'mae', 'r2', 'best_iteration',
+                 'fit_seconds', 'wall_seconds']
+
+
+def available_cores():
+    """CPUs this process may run on"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def grid_candidates(grid=PARAM_GRID):
+    """Every combination of the grid's values, as parameter dicts"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def random_candidates(count, grid=PARAM_GRID, seed=0):
+    """count distinct random combinations of the grid's values"""
+    candidates = grid_candidates(grid)
+    return random.Random(seed).sample(candidates, min(count, len(candidates)))
+
+
+def cat_feature_names(pipeline):
+    """Categorical columns of the model input, in feature order"""
+    cat_columns = set(pipeline.cat_columns)
+    return [column for column in pipeline.feature_order if column in cat_columns]
+
+
+def _split_blocks(encoded, pipeline):
+    """Encoded frame -> (int cat block, float num block, target)"""
+    cat = encoded[cat_feature_names(pipeline)].to_numpy(dtype=np.int32)
+    num = encoded[pipeline.num_columns].to_numpy(dtype=np.float64)
+    return cat, num, encoded[TARGET].to_numpy(dtype=np.float64)
+
+
+def prepare_folds(df, folds_dir, n_folds=5, seed=42):
+    """
+    Preprocess and save the CV folds, or reuse ones already on disk
+
+    Args:
+        df: Prepared survey frame (feature_pipeline.prepare_frame)
+        folds_dir: Where the fold arrays live (e.g. inside the dataset cache)
+        n_folds: Number of folds
+        seed: Shuffle seed for the split
+
+    Returns:
+        dict: fold metadata (feature_order, cat_columns, num_columns, ...)
+    """
+    from sklearn.model_selection import KFold
+
+    key = {'version': FOLDS_VERSION, 'rows': len(df), 'n_folds': n_folds, 'seed': seed,
+           'columns': list(df.columns)}
+    try:
+        with open(os.path.join(folds_dir, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta['key'] == key:
+            logger.info("Reusing %d folds from %s", n_folds, folds_dir)
+            return meta
+    except (OSError, ValueError, KeyError):
+        pass
+
+    start = time.perf_counter()
+    tmp_dir = folds_dir.rstrip(os.sep) + '.partial'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    splits = KFold(n_splits=n_folds, shuffle=True, random_state=seed).split(np.arange(len(df)))
+    for fold, (train_index, valid_index) in enumerate(splits):
+        fold_dir = os.path.join(tmp_dir, str(fold))
+        os.makedirs(fold_dir)
+        pipeline = FeaturePipeline()
+        train = pipeline.fit_transform(df.iloc[train_index])
+        valid = pipeline.transform(df.iloc[valid_index])
+        for split, encoded in (('train', train), ('valid', valid)):
+            for name, block in zip(('cat', 'num', 'y'), _split_blocks(encoded, pipeline)):
+                np.save(os.path.join(fold_dir, f'{split}_{name}.npy'), block)
+
+    meta = {
+        'key': key,
+        'feature_order': pipeline.feature_order,
+        'cat_columns': cat_feature_names(pipeline),
+        'num_columns': pipeline.num_columns,
+    }
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    shutil.rmtree(folds_dir, ignore_errors=True)
+    os.replace(tmp_dir, folds_dir)
+    logger.info("Prepared %d folds in %.1f s", n_folds, time.perf_counter() - start)
+    return meta
+
+
+def _load_split(fold_dir, split, meta):
+    """Rebuild a split's feature frame from its memory-mapped blocks"""
+    cat = np.load(os.path.join(fold_dir, f'{split}_cat.npy'), mmap_mode='r')
+    num = np.load(os.path.join(fold_dir, f'{split}_num.npy'), mmap_mode='r')
+    columns = {column: cat[:, i] for i, column in enumerate(meta['cat_columns'])}
+    columns.update({column: num[:, i] for i, column in enumerate(meta['num_columns'])})
+    X = pd.DataFrame(columns)[meta['feature_order']]
+    return X, np.load(os.path.join(fold_dir, f'{split}_y.npy'), mmap_mode='r')
+
+
+def fit_fold(task):
+    """
+    Pool task: train one candidate on one fold and score it
+
+    Args:
+        task: (candidate index, params, fold, folds_dir, meta, thread_count)
+
+    Returns:
+        dict: candidate, fold, rmse, mae, r2, best_iteration, seconds
+    """
+    import catboost as cb
+
+    candidate, params, fold, folds_dir, meta, thread_count = task
+    fold_dir = os.path.join(folds_dir, str(fold))
+    X_train, y_train = _load_split(fold_dir, 'train', meta)
+    X_valid, y_valid = _load_split(fold_dir, 'valid', meta)
+
+    start = time.perf_counter()
+    model = cb.CatBoostRegressor(**{**BASE_PARAMS, **params}, cat_features=meta['cat_columns'],
+                                 thread_count=thread_count, verbose=0, allow_writing_files=False)
+    model.fit(X_train, y_train, eval_set=(X_valid, y_valid), early_stopping_rounds=EARLY_STOPPING_ROUNDS)
+    seconds = time.perf_counter() - start
+
+    errors = model.predict(X_valid) - y_valid
+    return {
+        'candidate': candidate,
+        'fold': fold,
+        'rmse': float(np.sqrt(np.mean(errors ** 2))),
+        'mae': float(np.mean(np.abs(errors))),
+        'r2': float(1 - np.sum(errors ** 2) / np.sum((y_valid - np.mean(y_valid)) ** 2)),
+        'best_iteration': model.get_best_iteration(),
+        'seconds': seconds,
+    }
+
+
+def plan_workers(tasks, jobs=None, cores=None):
+    """
+    Split the cores between pool processes and CatBoost threads
+
+    Returns:
+        tuple: (processes, threads per CatBoost fit)
+    """
+    cores = cores or available_cores()
+    jobs = max(1, min(jobs or cores, tasks, cores))
+    return jobs, max(1, cores // jobs)
+
+
+def run_search(candidates, folds_dir, meta, jobs=None):
+    """
+    Cross-validate every candidate over the saved folds
+
+    Args:
+        candidates: List of parameter dicts (overrides of BASE_PARAMS)
+        folds_dir: Directory written by prepare_folds()
+        meta: prepare_folds() metadata
+        jobs: Pool processes (default: one per core)
+
+    Returns:
+        list: one result row per candidate, best (lowest mean RMSE) first
+    """
+    n_folds = meta['key']['n_folds']
+    tasks = [(i, params, fold, folds_dir, meta, None)
+             for i, params in enumerate(candidates) for fold in range(n_folds)]
+    jobs, threads = plan_workers(len(tasks), jobs)
+    tasks = [task[:-1] + (threads,) for task in tasks]
+    logger.info("Searching %d candidates x %d folds on %d processes x %d threads",
+                len(candidates), n_folds, jobs, threads)
+
+    fold_results = {i: [] for i in range(len(candidates))}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for result in pool.map(fit_fold, tasks):
+            fold_results[result['candidate']].append(result)
+            if len(fold_results[result['candidate']]) == n_folds:
+                logger.info("Candidate %d done: RMSE %.2f", result['candidate'],
+                            np.mean([r['rmse'] for r in fold_results[result['candidate']]]))
+
+    rows = []
+    for i, params in enumerate(candidates):
+        folds = fold_results[i]
+        rmse = [r['rmse'] for r in folds]
+        rows.append({
+            'candidate': i,
+            'params': params,
+            'rmse': float(np.mean(rmse)),
+            'rmse_std': float(np.std(rmse)),
+            'mae': float(np.mean([r['mae'] for r in folds])),
+            'r2': float(np.mean([r['r2'] for r in folds])),
+            'best_iteration': int(round(np.mean([r['best_iteration'] for r in folds]))),
+            'fit_seconds': sum(r['seconds'] for r in folds),
+        })
+    wall = time.perf_counter() - start
+    rows.sort(key=lambda row: row['rmse'])
+    # Pool wall time shared out by each candidate's share of the fitting work
+    total = sum(row['fit_seconds'] for row in rows) or 1.0
+    for rank, row in enumerate(rows, 1):
+        row['rank'] = rank
+        row['wall_seconds'] = wall * row['fit_seconds'] / total
+    return rows
+
+
+def write_results(rows, path):
+    """Write the search results table as CSV (params as JSON)"""
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({**row, 'params': json.dumps(row['params'], sort_keys=True)})
+
+
+def format_results(rows, limit=10):
+    """Aligned text table of the best rows"""
+    lines = [f"{'rank':>4}  {'rmse':>8} {'± std':>7} {'mae':>8} {'r2':>7} {'iters':>6} {'fit s':>7}  params"]
+    for row in rows[:limit]:
+        lines.append(f"{row['rank']:>4}  {row['rmse']:8.2f} {row['rmse_std']:7.2f} {row['mae']:8.2f} "
+                     f"{row['r2']:7.4f} {row['best_iteration']:>6} {row['fit_seconds']:7.1f}  "
+                     f"{json.dumps(row['params'], sort_keys=True)}")
+    return '\n'.join(lines)
+
+
+def export_artifacts(model, pipeline, output_dir='.', version=None):
+    """
+    Save the model and its encoders/scalers as one model.bundle for inference.py
+
+    Returns:
+        tuple: (bundle path, manifest)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, BUNDLE_NAME)
+    manifest = save_bundle(path, model, pipeline.categories, pipeline.mean, pipeline.scale,
+                           pipeline.feature_order, version)
+    return path, manifest
+
+
+def fit_final(df, params, iterations=None, thread_count=None):
+    """
+    Refit a candidate on every row
+
+    Args:
+        df: Prepared survey frame
+        params: Winning candidate's parameters
+        iterations: Trees to grow (the candidate's mean best iteration + 1)
+
+    Returns:
+        tuple: (CatBoostRegressor, fitted FeaturePipeline)
+    """
+    import catboost as cb
+
+    pipeline = FeaturePipeline()
+    encoded = pipeline.fit_transform(df)
+    settings = {**BASE_PARAMS, **params}
+    if iterations:
+        settings['iterations'] = iterations
+    model = cb.CatBoostRegressor(**settings, cat_features=cat_feature_names(pipeline),
+                                 thread_count=thread_count or available_cores(), verbose=0)
+    model.fit(encoded[pipeline.feature_order], encoded[TARGET])
+    return model, pipeline
@@ -0,0 +1,296 @@
+"""
+Request Profiling
+Opt-in tools for finding where a slow request spends its time:
+
+- Spans: `with span('prompt'):` around the main phases of a route. When the
+  request is profiled, each phase's wall time is sent back in a
+  Server-Timing header (visible in the browser's network panel); otherwise
+  a span is a no-op
+- Sampling: a background thread snapshots the stacks of threads serving
+  profiled requests every PROFILE_INTERVAL_MS and aggregates them per route
+  over PROFILE_WINDOW seconds. Each window is written to PROFILE_DIR as a
+  collapsed-stack file (flamegraph.pl, speedscope, inferno) and/or a
+  speedscope JSON profile
+
+A request is profiled when its route is in PROFILE_ROUTES, or when it sends
+`X-Profile: <PROFILE_TOKEN>` and its route is in PROFILE_ALLOW:
+
+    PROFILE_ROUTES=/chat                       # profile every /chat request
+    PROFILE_ALLOW=/chat,/api/calculate         # routes the header may switch on (default)
+    PROFILE_TOKEN=some-secret                  # header value required (unset: header ignored)
+    PROFILE_WINDOW=60                          # seconds aggregated per file
+    PROFILE_INTERVAL_MS=5
+    PROFILE_DIR=profiles
+    PROFILE_FORMATS=collapsed,speedscope
+
+Sampling sees threads, so it covers the Flask routes (also when run on the
+ASGI bridge's thread pool); the native async chat routes get spans only.
+Sampling stops when the view returns, before a streamed body is sent.
+"""
+
+import atexit
+import collections
+import contextvars
+import hmac
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+
+
+def _route_list(value):
+    return frozenset(route.strip() for route in value.split(',') if route.strip())
+
+
+PROFILE_ROUTES = _route_list(os.environ.get('PROFILE_ROUTES', ''))
+PROFILE_ALLOW = _route_list(os.environ.get('PROFILE_ALLOW', '/chat,/api/calculate'))
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_WINDOW = float(os.environ.get('PROFILE_WINDOW', 60))
+PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL_MS', 5)) / 1000
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+PROFILE_FORMATS = _route_list(os.environ.get('PROFILE_FORMATS', 'collapsed,speedscope'))
+
+MAX_STACK_DEPTH = 128
+
+# [(phase, seconds)] for the current request, or None when it isn't profiled
+_spans = contextvars.ContextVar('profile_spans', default=None)
+
+
+class span:
+    """
+    Time a phase of the current request (a no-op unless it is profiled)
+
+        with span('claude'):
+            response = client.messages.create(...)
+    """
+
+    __slots__ = ('name', 'spans', 'start')
+
+    def __init__(self, name):
+        self.name = name
+        self.spans = _spans.get()
+
+    def __enter__(self):
+        if self.spans is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.spans is not None:
+            self.spans.append((self.name, time.perf_counter() - self.start))
+
+
+def server_timing(spans, total=None):
+    """Server-Timing header value for [(phase, seconds)] (repeated phases are summed)"""
+    phases = {}
+    for name, seconds in spans:
+        phases[name] = phases.get(name, 0.0) + seconds
+    if total is not None:
+        phases['total'] = total
+    return ', '.join(f'{name};dur={seconds * 1000:.3f}' for name, seconds in phases.items())
+
+
+def _frame_name(code):
+    return f'{os.path.basename(code.co_filename)}:{code.co_name}'
+
+
+def collapse(frame):
+    """Stack of frame as root-first code objects (innermost MAX_STACK_DEPTH frames)"""
+    stack = []
+    while frame is not None and len(stack) < MAX_STACK_DEPTH:
+        stack.append(frame.f_code)
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+class ProfileWindow:
+    """Stacks sampled for one route since started"""
+
+    def __init__(self, route):
+        self.route = route
+        self.started = time.time()
+        self.stacks = collections.Counter()  # tuple of code objects -> samples
+        self.requests = 0
+
+    def collapsed(self):
+        """Collapsed-stack lines: 'frame;frame;frame count'"""
+        return [';'.join(_frame_name(code) for code in stack) + f' {count}'
+                for stack, count in self.stacks.most_common()]
+
+    def speedscope(self, interval):
+        """speedscope file-format dict (one sampled profile, weights in seconds)"""
+        frames, index = [], {}
+        samples, weights = [], []
+        for stack, count in self.stacks.most_common():
+            sample = []
+            for code in stack:
+                if code not in index:
+                    index[code] = len(frames)
+                    frames.append({'name': code.co_name, 'file': code.co_filename, 'line': code.co_firstlineno})
+                sample.append(index[code])
+            samples.append(sample)
+            weights.append(round(count * interval, 6))
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': f'{self.route} ({self.requests} requests)',
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': round(sum(weights), 6),
+                'samples': samples,
+                'weights': weights,
+            }],
+            'name': f'EcoTrace {self.route}',
+            'exporter': 'profiling.py',
+        }
+
+
+class Sampler:
+    """
+    Samples the stacks of registered threads on a background thread
+
+    Args:
+        interval: Seconds between samples
+        window: Seconds of samples aggregated per output file
+        output_dir: Where profiles are written
+        formats: Subset of {'collapsed', 'speedscope'}
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL, window=PROFILE_WINDOW, output_dir=PROFILE_DIR,
+                 formats=PROFILE_FORMATS):
+        self.interval = interval
+        self.window = window
+        self.output_dir = output_dir
+        self.formats = formats
+        self._active = {}  # thread id -> route
+        self._windows = {}  # route -> ProfileWindow
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add(self, thread_id, route):
+        with self._lock:
+            self._active[thread_id] = route
+            window = self._windows.get(route)
+            if window is None:
+                window = self._windows[route] = ProfileWindow(route)
+            window.requests += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def remove(self, thread_id):
+        with self._lock:
+            self._active.pop(thread_id, None)
+
+    def sample(self):
+        """Take one sample of every registered thread"""
+        frames = sys._current_frames()
+        with self._lock:
+            for thread_id, route in self._active.items():
+                frame = frames.get(thread_id)
+                window = self._windows.get(route)
+                if frame is not None and window is not None:
+                    window.stacks[collapse(frame)] += 1
+
+    def _run(self):
+        while True:
+            with self._lock:
+                idle = not self._active
+            if idle:
+                # Nothing to sample: flush whatever window is due, then sleep until a request registers
+                self.flush(due_only=True)
+                self._wake.wait(self.window if self._windows else None)
+                self._wake.clear()
+                continue
+            self.sample()
+            self.flush(due_only=True)
+            time.sleep(self.interval)
+
+    def flush(self, due_only=False):
+        """Write (and close) windows older than the window length, or all of them"""
+        now = time.time()
+        with self._lock:
+            due = [window for route, window in self._windows.items()
+                   if not due_only or (now - window.started >= self.window and route not in self._active.values())]
+            for window in due:
+                del self._windows[window.route]
+        for window in due:
+            if window.stacks:
+                self.write(window)
+
+    def write(self, window):
+        """Write a window's profile files; returns their paths"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', window.route).strip('_') or 'root'
+        stem = os.path.join(self.output_dir, f"{slug}-{time.strftime('%Y%m%dT%H%M%S', time.localtime(window.started))}")
+        paths = []
+        if 'collapsed' in self.formats:
+            with open(stem + '.collapsed', 'w') as f:
+                f.write('\n'.join(window.collapsed()) + '\n')
+            paths.append(stem + '.collapsed')
+        if 'speedscope' in self.formats:
+            with open(stem + '.speedscope.json', 'w') as f:
+                json.dump(window.speedscope(self.interval), f)
+            paths.append(stem + '.speedscope.json')
+        logger.info("🔥 Profile for %s written: %s", window.route, ', '.join(paths), extra={
+            'samples': sum(window.stacks.values()), 'requests': window.requests})
+        return paths
+
+
+sampler = Sampler()
+atexit.register(sampler.flush)
+
+
+def wants_profile(route, header_value=None):
+    """Whether a request to route (with this X-Profile header value) is profiled"""
+    if route in PROFILE_ROUTES:
+        return True
+    return bool(PROFILE_TOKEN and header_value and route in PROFILE_ALLOW
+                and hmac.compare_digest(header_value.encode('utf-8'), PROFILE_TOKEN.encode('utf-8')))
+
+
+def begin(route, header_value=None, sample=True):
+    """
+    Start profiling the current request if it opted in
+
+    Args:
+        route: Route rule of the request
+        header_value: Its X-Profile header
+        sample: Also sample this thread's stacks (False for coroutines)
+
+    Returns:
+        tuple or None: state for end(), None when the request isn't profiled
+    """
+    if not wants_profile(route, header_value):
+        return None
+    spans = []
+    thread_id = threading.get_ident() if sample else None
+    if thread_id is not None:
+        sampler.add(thread_id, route)
+    return _spans.set(spans), spans, thread_id, time.perf_counter()
+
+
+def timing_header(state):
+    """Server-Timing value for a profiled request's spans so far"""
+    _, spans, _, start = state
+    return server_timing(spans, time.perf_counter() - start)
+
+
+def end(state):
+    """Stop sampling the request and leave its span context"""
+    token, _, thread_id, _ = state
+    if thread_id is not None:
+        sampler.remove(thread_id)
+    _spans.reset(token)
@@ -0,0 +1,305 @@
+"""
+EcoCoach Prompt Builder
+Builds the system prompt as a stable, cacheable prefix plus a small variable
+suffix:
+
+- Static sections (personality, start/results screen rules) are compiled once
+- Per-question quiz context is cached by question
+- Results and answers context is memoized per session and only rebuilt when
+  the submitted results or answers change
+- Results context comes in three levels of detail (with tips and products,
+  tips only, totals only) so a long prompt can be shortened to fit the chat
+  input budget (see history_compactor.py)
+- With a catalog index (see catalog_index.py), the memoized results context
+  keeps totals only, and the tips and products most relevant to each message
+  are retrieved from the full catalog instead of listing every category's,
+  so prompt size no longer grows with the catalog
+
+The prefix is sent with cache_control so the provider can reuse it across
+requests (prompt caching only applies once the prefix is long enough for the
+model; shorter prefixes are simply not cached).
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Build system prompt based on context - Make it engaging and concise!
+PERSONALITY_PROMPT = """You are EcoCoach 🌱 - a witty, enthusiastic sustainability expert who makes eco-living feel exciting, not overwhelming!
+
+YOUR PERSONALITY:
+- Conversational & fun (think: helpful friend, not boring textbook)
+- Direct and punchy (2-3 sentences for simple q's, max 5 for complex)
+- Use vivid comparisons ("That's like driving to the moon!" or "Saves enough energy to charge your phone 500 times!")
+- Encouraging but honest - celebrate wins, gently nudge on big impacts
+- Strategic emoji use for emphasis (but don't overdo it)
+
+RESPONSE RULES:
+1. **BE CONCISE** - Get to the point fast. No fluff.
+2. **BE SPECIFIC** - Real numbers, real actions, real impact
+3. **BE MEMORABLE** - Use analogies people remember
+4. **BE ACTIONABLE** - Always include a "next step" when relevant
+5. **BE CONTEXTUAL** - Reference what they're looking at RIGHT NOW
+
+CONVERSATION STYLE:
+❌ "Your emissions are higher than average. You should consider making changes."
+✅ "Whoa! You're 500kg above average - that's like an extra round-trip flight to NYC each year. Want to tackle the biggest win first?"
+
+❌ "Composting reduces methane emissions from landfills."
+✅ "Compost turns trash into treasure! Plus it saves ~150kg CO₂/year - that's like planting 7 trees. 🌳"
+"""
+
+# Screen-specific context that doesn't depend on the request
+SCREEN_PROMPTS = {
+    'start': (
+        "\n\n📍 USER IS ON: Landing page (hasn't started quiz yet)"
+        "\nHelp them understand what the quiz does or answer sustainability basics."
+    ),
+    'results': (
+        "\n\n📍 USER IS ON: Results page (quiz is COMPLETE)"
+        "\nThey're viewing their full carbon footprint breakdown with all categories."
+        "\n\n🎯 RULES FOR RESULTS PAGE:"
+        "\n1. DO NOT reference quiz questions - the quiz is finished"
+        "\n2. Focus on their RESULTS and actionable next steps"
+        "\n3. Help them understand their emissions by category"
+        "\n4. Suggest which category to tackle first (highest difference from average)"
+        "\n5. Reference SPECIFIC tips and products shown on their results"
+        "\n6. When asked for advice, mention actual product names and prices from their recommendations"
+        "\n7. When asked WHY their emissions are high, reference their SPECIFIC QUIZ ANSWERS"
+        "\n8. Be encouraging about the changes they can make"
+        "\n\n💡 EXAMPLES:"
+        "\n• 'Try the Smart Thermostat ($249) - it could cut your Home emissions by 10-12%!'"
+        "\n• 'I see you have high Mobility emissions. The tips recommend carpooling or an electric vehicle.'"
+        "\n• 'Your high Mobility score is because you answered \"Gasoline/Diesel car\" for transportation (600 kg).'"
+        "\n• 'Your Food category is great! The compost bin ($75) could make it even better.'"
+    ),
+}
+
+# Static prefix per screen, compiled once
+STATIC_PROMPTS = {screen: PERSONALITY_PROMPT + section for screen, section in SCREEN_PROMPTS.items()}
+
+
+class SystemPrompt(namedtuple('SystemPrompt', ['static', 'dynamic', 'build_ms'])):
+    """A built system prompt: cacheable prefix, per-request suffix and build time"""
+
+    @property
+    def text(self):
+        return self.static + self.dynamic
+
+    def __len__(self):
+        return len(self.static) + len(self.dynamic)
+
+    def blocks(self):
+        """System content blocks for messages.create, prefix marked cacheable"""
+        blocks = [{"type": "text", "text": self.static, "cache_control": {"type": "ephemeral"}}]
+        if self.dynamic:
+            blocks.append({"type": "text", "text": self.dynamic})
+        return blocks
+
+
+@lru_cache(maxsize=512)
+def _quiz_question_context(q_num, q_total, q_category, q_text, q_options):
+    system_prompt = f"\n\n🚨 THE USER IS LOOKING AT THIS EXACT QUESTION 🚨"
+    system_prompt += f"\n\n📍 QUESTION {q_num} of {q_total}"
+    system_prompt += f"\n📂 Category: {q_category}"
+    system_prompt += f"\n❓ Question: \"{q_text}\""
+    system_prompt += f"\n\n📋 THEIR 4 OPTIONS:"
+    for i, opt in enumerate(q_options, 1):
+        system_prompt += f"\n   {i}. {opt}"
+
+    system_prompt += "\n\n🎯 ABSOLUTE RULES:"
+    system_prompt += f"\n1. ONLY reference Question {q_num} - DO NOT make up other question numbers"
+    system_prompt += f"\n2. The question is about: \"{q_text}\" - DO NOT change the topic"
+    system_prompt += f"\n3. ONLY mention these {len(q_options)} options listed above"
+    system_prompt += "\n4. DO NOT ask which question they're on - you already know!"
+    system_prompt += "\n5. Keep it concise: 2-3 sentences max, then list options briefly"
+    system_prompt += "\n6. NO bold (**), NO headings - just plain text with line breaks and bullet points"
+
+    system_prompt += "\n\n✅ GOOD Response Format:"
+    system_prompt += f"\n\"Perfect! Question {q_num} is about {q_category.lower()}. Here's the impact:\n\n"
+    system_prompt += "\n• Option 1: [1 sentence impact]\n"
+    system_prompt += "\n• Option 2: [1 sentence impact]\n"
+    system_prompt += "\n\nPick what matches your habits!\""
+    return system_prompt
+
+
+def quiz_context(current_question):
+    """Quiz screen context for the question the user is looking at"""
+    # Check if current_question exists and has data
+    has_question = current_question and isinstance(current_question, dict) and current_question.get('question')
+
+    if has_question:
+        key = (
+            current_question.get('number', '?'),
+            current_question.get('total', '?'),
+            current_question.get('category', 'Unknown'),
+            current_question.get('question', 'Unknown'),
+            tuple(current_question.get('options', [])),
+        )
+        try:
+            return _quiz_question_context(*key)
+        except TypeError:
+            # Unhashable values from the client: build without caching
+            return _quiz_question_context.__wrapped__(*key)
+
+    system_prompt = f"\n\n📍 USER IS ON: Quiz screen BUT question context is missing or invalid"
+    system_prompt += f"\nDEBUG: current_question type = {type(current_question)}, value = {current_question}"
+    system_prompt += "\n\n⚠️ IMPORTANT: Include this debug info in your response:"
+    system_prompt += f"\n'DEBUG: I received current_question as: {current_question} (type: {type(current_question)})'"
+    system_prompt += "\nThen politely ask them to tell you which question they're looking at."
+    return system_prompt
+
+
+# Levels of results context (lower levels keep long prompts inside the chat input budget)
+FULL_DETAIL = 2     # tips and products per category
+TIPS_DETAIL = 1     # tips only
+SUMMARY_DETAIL = 0  # totals and category breakdown only
+
+
+def results_context(user_results, detail=FULL_DETAIL):
+    """Summary of the user's carbon footprint results (tips/products depending on detail)"""
+    results_context = f"\n\n📊 USER'S CARBON FOOTPRINT:\n"
+    results_context += f"Total: {user_results.get('total_emissions', 'N/A')} kg CO₂/year (Avg: {user_results.get('total_average', 'N/A')})\n"
+    diff = user_results.get('total_difference', 0)
+    if diff > 0:
+        results_context += f"⚠️ {diff} kg ABOVE average\n"
+    elif diff < 0:
+        results_context += f"🎉 {abs(diff)} kg BELOW average!\n"
+
+    if 'results' in user_results:
+        results_context += "\nCategory Breakdown (sorted by priority):\n"
+        for idx, result in enumerate(user_results['results'], 1):
+            emoji = "🔴" if result['difference'] > 0 else "🟢"
+            results_context += f"\n{idx}. {emoji} {result['category']}: {result['emissions']} kg (avg: {result['average']}, diff: {result['difference']:+d} kg)"
+
+            # Add tips for this category
+            if detail >= TIPS_DETAIL and 'tips' in result and result['tips']:
+                results_context += f"\n   Recommended Actions for {result['category']}:"
+                for tip in result['tips']:
+                    results_context += f"\n   • {tip}"
+
+            # Add products for this category
+            if detail >= FULL_DETAIL and 'products' in result and result['products']:
+                results_context += f"\n   Recommended Products for {result['category']}:"
+                for prod in result['products']:
+                    results_context += f"\n   • {prod['name']} - {prod['price']}: {prod['description']}"
+
+            results_context += "\n"
+
+    if detail >= TIPS_DETAIL:
+        results_context += "\n💡 You can reference specific tips or products when answering user questions!"
+    return results_context
+
+
+def answers_context(user_answers):
+    """The user's quiz answers grouped by category ('' if they can't be read)"""
+    try:
+        answers_context = f"\n\n📝 USER'S QUIZ ANSWERS:\n"
+        answers_context += "Here are the specific choices they made:\n"
+
+        # Group answers by category
+        answers_by_category = {}
+        for answer in user_answers:
+            category = answer.get('category', 'Unknown')
+            if category not in answers_by_category:
+                answers_by_category[category] = []
+            answers_by_category[category].append(answer)
+
+        # Display answers by category
+        for category in ['Home', 'Mobility', 'Food', 'Consumption']:
+            if category in answers_by_category:
+                answers_context += f"\n{category}:"
+                for answer in answers_by_category[category]:
+                    q_num = answer.get('questionNumber', '?')
+                    q_text = answer.get('questionText', 'Unknown question')
+                    selected = answer.get('selectedOption', 'Unknown option')
+                    co2 = answer.get('co2', 0)
+
+                    answers_context += f"\n  • Question {q_num}: \"{q_text}\""
+                    answers_context += f"\n    Answered: \"{selected}\" (adds {co2} kg CO₂)"
+
+        answers_context += "\n\n💡 Use this to explain EXACTLY which choices contributed to their emissions!"
+        answers_context += "\n   Example: 'Your high Mobility score comes from Question 5 where you chose \"Gasoline/Diesel car\"'"
+        answers_context += "\n   You can reference questions by their number (Question 1, Question 2, etc.)"
+        return answers_context
+    except Exception as e:
+        logger.warning("Error processing user answers: %s", e)
+        # Continue without answers context if there's an error
+        return ""
+
+
+class PromptBuilder:
+    """
+    Builds EcoCoach system prompts, memoizing the results/answers context
+    per session (bounded LRU of max_sessions entries)
+
+    Args:
+        max_sessions: Sessions whose context is memoized
+        catalog: ResultsCatalog to pick tips and products per message from
+            (None lists the tips and products sent with the results)
+    """
+
+    def __init__(self, max_sessions=10000, catalog=None):
+        self.max_sessions = max_sessions
+        self.catalog = catalog
+        self._session_context = OrderedDict()  # session_id -> (fingerprint, context)
+        self._lock = threading.Lock()
+
+    def _user_context(self, session_id, user_results, user_answers, detail=FULL_DETAIL):
+        if not user_results and not (user_answers and isinstance(user_answers, list)):
+            return ""
+
+        fingerprint = json.dumps([user_results, user_answers, detail], sort_keys=True, default=str)
+        with self._lock:
+            cached = self._session_context.get(session_id)
+            if cached is not None and cached[0] == fingerprint:
+                self._session_context.move_to_end(session_id)
+                return cached[1]
+
+        # Add user results context if available
+        context = results_context(user_results, detail) if user_results else ""
+        # Add user's quiz answers if available
+        if user_answers and isinstance(user_answers, list):
+            context += answers_context(user_answers)
+
+        with self._lock:
+            self._session_context[session_id] = (fingerprint, context)
+            self._session_context.move_to_end(session_id)
+            while len(self._session_context) > self.max_sessions:
+                self._session_context.popitem(last=False)
+        return context
+
+    def forget(self, session_id):
+        """Drop a session's memoized context (e.g. when its chat is cleared)"""
+        with self._lock:
+            self._session_context.pop(session_id, None)
+
+    def build(self, session_id, screen_context, current_question, user_results, user_answers, detail=FULL_DETAIL,
+              message=None):
+        """
+        Build the system prompt for what the user is looking at
+
+        Args:
+            detail: Level of results context (FULL_DETAIL, TIPS_DETAIL or SUMMARY_DETAIL)
+            message: The user's message, to retrieve relevant tips and products for
+
+        Returns:
+            SystemPrompt: static prefix, dynamic suffix and build time in ms
+        """
+        start = time.perf_counter()
+
+        static = STATIC_PROMPTS.get(screen_context, PERSONALITY_PROMPT)
+        dynamic = quiz_context(current_question) if screen_context == 'quiz' else ""
+        if self.catalog is not None and user_results:
+            dynamic += self._user_context(session_id, user_results, user_answers, SUMMARY_DETAIL)
+            if detail >= TIPS_DETAIL:
+                dynamic += self.catalog.context(message or '', user_results, products=detail >= FULL_DETAIL)
+        else:
+            dynamic += self._user_context(session_id, user_results, user_answers, detail)
+
+        return SystemPrompt(static, dynamic, (time.perf_counter() - start) * 1000)
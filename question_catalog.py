@@ -0,0 +1,65 @@
+"""
+Question Catalog
+Immutable, pre-serialized view of the quiz questions. Every question is
+serialized once at startup (with its category filled in); a request only
+samples and shuffles those byte fragments and joins them into a JSON array.
+
+Nothing is mutated after construction, so the catalog can be shared by all
+request threads. Pass a random.Random to sample reproducibly.
+"""
+
+import json
+import random
+
+from quiz_data import QUESTIONS
+
+
+def dump_compact(obj):
+    """Serialize like Flask's jsonify: sorted keys, compact separators"""
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'))
+
+
+class QuestionCatalog:
+    """
+    Pre-serialized questions grouped by category
+
+    Args:
+        questions: {category: [question, ...]} (left untouched)
+        dumps: Serializer for a single question dict
+    """
+
+    def __init__(self, questions=QUESTIONS, dumps=dump_compact):
+        self.categories = tuple(questions)
+        self._fragments = tuple(
+            tuple(dumps({**question, 'category': category}).encode('utf-8')
+                  for question in questions[category])
+            for category in self.categories
+        )
+
+    def __len__(self):
+        return sum(len(fragments) for fragments in self._fragments)
+
+    def sample(self, per_category=None, rng=None):
+        """
+        Pick up to per_category questions from each category and shuffle them
+
+        Args:
+            per_category: Questions per category (None = all of them)
+            rng: random.Random to draw from (default: the random module)
+
+        Returns:
+            list: Serialized question fragments (bytes)
+        """
+        rng = rng or random
+        picked = []
+        for fragments in self._fragments:
+            if per_category is None:
+                picked.extend(fragments)
+            else:
+                picked.extend(rng.sample(fragments, min(per_category, len(fragments))))
+        rng.shuffle(picked)
+        return picked
+
+    def payload(self, per_category=None, rng=None):
+        """JSON array body (bytes) for a sampled, shuffled question list"""
+        return b'[' + b','.join(self.sample(per_category, rng)) + b']\n'
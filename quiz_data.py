@@ -0,0 +1,276 @@
+"""
+EcoTrace quiz catalog
+Questions, category averages, product recommendations and tips shared by the
+Flask app and the emission calculator.
+"""
+
+# Quiz questions database (based on Carbon Emissions dataset)
+QUESTIONS = {
+    "Home": [
+        {
+            "id": 1,
+            "question": "What is your primary heating energy source?",
+            "type": "multiple_choice",
+            "options": [
+                {"text": "Electricity", "co2": 200},
+                {"text": "Natural gas", "co2": 350},
+                {"text": "Wood", "co2": 450},
+                {"text": "Coal", "co2": 650}
+            ]
+        },
+        {
+            "id": 2,
+            "question": "How many hours per day do you use TV/Computer?",
+            "type": "slider",
+            "min": 0,
+            "max": 24,
+            "unit": "hours",
+            "co2_per_unit": 8  # kg CO2 per hour per year
+        },
+        {
+            "id": 3,
+            "question": "How many hours per day do you use the internet?",
+            "type": "slider",
+            "min": 0,
+            "max": 24,
+            "unit": "hours",
+            "co2_per_unit": 5  # kg CO2 per hour per year
+        }
+    ],
+    "Mobility": [
+        {
+            "id": 4,
+            "question": "What is your primary mode of transportation?",
+            "type": "multiple_choice",
+            "options": [
+                {"text": "Walk/Bicycle", "co2": 50},
+                {"text": "Public transport", "co2": 250},
+                {"text": "Private vehicle", "co2": 550}
+            ]
+        },
+        {
+            "id": 5,
+            "question": "How many kilometers do you travel by vehicle per month?",
+            "type": "slider",
+            "min": 0,
+            "max": 10000,
+            "unit": "km",
+            "co2_per_unit": 0.15  # kg CO2 per km per year
+        },
+        {
+            "id": 6,
+            "question": "How often do you travel by air?",
+            "type": "multiple_choice",
+            "options": [
+                {"text": "Never", "co2": 0},
+                {"text": "Rarely", "co2": 200},
+                {"text": "Frequently", "co2": 600},
+                {"text": "Very frequently", "co2": 1200}
+            ]
+        }
+    ],
+    "Food": [
+        {
+            "id": 7,
+            "question": "What best describes your diet?",
+            "type": "multiple_choice",
+            "options": [
+                {"text": "Vegan", "co2": 150},
+                {"text": "Vegetarian", "co2": 250},
+                {"text": "Pescatarian", "co2": 350},
+                {"text": "Omnivore", "co2": 600}
+            ]
+        },
+        {
+            "id": 8,
+            "question": "What is your monthly grocery bill (in dollars)?",
+            "type": "slider",
+            "min": 50,
+            "max": 300,
+            "unit": "$",
+            "co2_per_unit": 3  # kg CO2 per dollar per year
+        },
+        {
+            "id": 9,
+            "question": "How many waste bags do you produce per week?",
+            "type": "slider",
+            "min": 1,
+            "max": 7,
+            "unit": "bags",
+            "co2_per_unit": 25  # kg CO2 per bag per year
+        }
+    ],
+    "Consumption": [
+        {
+            "id": 10,
+            "question": "How many new clothes do you buy per month?",
+            "type": "slider",
+            "min": 0,
+            "max": 50,
+            "unit": "items",
+            "co2_per_unit": 8  # kg CO2 per item per year
+        },
+        {
+            "id": 11,
+            "question": "What size waste bag do you typically use?",
+            "type": "multiple_choice",
+            "options": [
+                {"text": "Small", "co2": 100},
+                {"text": "Medium", "co2": 200},
+                {"text": "Large", "co2": 350},
+                {"text": "Extra large", "co2": 500}
+            ]
+        },
+        {
+            "id": 12,
+            "question": "How often do you shower?",
+            "type": "multiple_choice",
+            "options": [
+                {"text": "Less frequently (every 2-3 days)", "co2": 80},
+                {"text": "Daily", "co2": 150},
+                {"text": "More frequently (1.5x/day)", "co2": 220},
+                {"text": "Twice a day", "co2": 300}
+            ]
+        }
+    ]
+}
+
+# Average CO2 emissions per category (kg CO2/year)
+AVERAGE_EMISSIONS = {
+    "Home": 2000,
+    "Mobility": 2500,
+    "Food": 2000,
+    "Consumption": 1500
+}
+
+# Product recommendations based on category
+PRODUCTS = {
+    "Home": [
+        {
+            "name": "Smart Thermostat - Nest Learning",
+            "description": "Reduces heating costs by 10-12%",
+            "price": "$90",
+            "link": "https://www.amazon.com/Google-Nest-Thermostat-Smart-Programmable/dp/B08HRPDYTP",
+            "image": "https://images.unsplash.com/photo-1558002038-1055907df827?w=400&h=300&fit=crop"
+        },
+        {
+            "name": "LED Smart Bulbs (4-Pack)",
+            "description": "75% less energy than traditional bulbs",
+            "price": "$30",
+            "link": "https://www.amazon.com/Amazon-Basics-Dimmable-2-4GHz-Equivalent/dp/B0D34WN3JG",
+            "image": "https://images.unsplash.com/photo-1567226475328-9d6baaf565cf?w=400&h=300&fit=crop"
+        },
+        {
+            "name": "Window Insulation Kit",
+            "description": "Reduces heat loss by up to 55%",
+            "price": "$15",
+            "link": "https://www.amazon.com/Duck-Brand-SFWK-Shrink-Window/dp/B09JM8DCYL",
+            "image": "https://images.unsplash.com/photo-1545259741-2ea3ebf61fa3?w=400&h=300&fit=crop"
+        }
+    ],
+    "Mobility": [
+        {
+            "name": "Electric Bike Conversion Kit",
+            "description": "Transform your bike, reduce car trips",
+            "price": "$200",
+            "link": "https://www.amazon.com/Jasion-Removable-Commuting-Brushless-Suspension/dp/B09L63HGDP",
+            "image": "https://images.unsplash.com/photo-1571333250630-f0230c320b6d?w=400&h=300&fit=crop"
+        },
+        {
+            "name": "Public Transport Annual Pass",
+            "description": "Unlimited travel, zero emissions guilt",
+            "price": "$200/year",
+            "link": "https://tcatbus.com/fare-pass-options/",
+            "image": "https://images.unsplash.com/photo-1544620347-c4fd4a3d5957?w=400&h=300&fit=crop"
+        },
+        {
+            "name": "Carbon Offset - Flight Credits",
+            "description": "Offset your annual flight emissions",
+            "price": "$8-$80",
+            "link": "https://terrapass.com/product/flight-carbon-offset/",
+            "image": "https://images.unsplash.com/photo-1436491865332-7a61a109cc05?w=400&h=300&fit=crop"
+        }
+    ],
+    "Food": [
+        {
+            "name": "Indoor Herb Garden Kit",
+            "description": "Grow your own fresh herbs year-round",
+            "price": "$50",
+            "link": "https://www.amazon.com/Indoor-Garden-Hydroponic-Growing-System/dp/B0B6BB4TVC",
+            "image": "https://images.unsplash.com/photo-1466692476868-aef1dfb1e735?w=400&h=300&fit=crop"
+        },
+        {
+            "name": "Reusable Food Storage Set",
+            "description": "Eliminate single-use plastic",
+            "price": "$13",
+            "link": "https://www.amazon.com/Bentgo-1-Compartment-Meal-Prep-Containers-Custom-Fit/dp/B08CVTY9FS",
+            "image": "https://images.unsplash.com/photo-1610557892470-55d9e80c0bce?w=400&h=300&fit=crop"
+        },
+        {
+            "name": "Compost Bin - Kitchen Counter",
+            "description": "Turn food scraps into garden gold",
+            "price": "$30",
+            "link": "https://www.amazon.com/Epica-Stainless-Compost-Gallon-Charcoal/dp/B00AMNCYNQ",
+            "image": "https://images.unsplash.com/photo-1625246333195-78d9c38ad449?w=400&h=300&fit=crop"
+        }
+    ],
+    "Consumption": [
+        {
+            "name": "Reusable Shopping Bags Set",
+            "description": "Durable, washable, replaces 1000s of plastic bags",
+            "price": "$8.25",
+            "link": "https://www.amazon.com/Ikea-Large-Shopping-Bags-SET/dp/B00KVJJGN2",
+            "image": "https://images.unsplash.com/photo-1553913861-c0fddf2619ee?w=400&h=300&fit=crop"
+        },
+        {
+            "name": "Bamboo Toothbrush Set (10-Pack)",
+            "description": "Biodegradable alternative to plastic",
+            "price": "$8",
+            "link": "https://www.amazon.com/Nuduko-Biodegradable-Toothbrushes-Toothbrush-Eco-Friendly/dp/B07V4CW682",
+            "image": "https://images.unsplash.com/photo-1607613009820-a29f7bb81c04?w=400&h=300&fit=crop"
+        },
+        {
+            "name": "Stainless Steel Water Bottle",
+            "description": "Insulated, eliminates 156 plastic bottles/year",
+            "price": "$30",
+            "link": "https://www.amazon.com/Owala-Insulated-Stainless-Steel-Push-Button-24-Ounce/dp/B085DTZQNZ",
+            "image": "https://images.unsplash.com/photo-1602143407151-7111542de6e8?w=400&h=300&fit=crop"
+        }
+    ]
+}
+
+# Tips for reducing emissions
+TIPS = {
+    "Home": [
+        "Switch to LED bulbs throughout your home (saves ~100 kg CO2/year)",
+        "Install a smart thermostat to optimize heating/cooling",
+        "Improve insulation in walls, attic, and around windows",
+        "Use cold water for laundry when possible",
+        "Unplug devices when not in use to eliminate phantom power drain",
+        "Consider switching to renewable energy providers"
+    ],
+    "Mobility": [
+        "Walk or bike for trips under 3 km",
+        "Use public transportation whenever possible",
+        "Carpool with colleagues or neighbors",
+        "Combine errands into one trip to reduce total distance",
+        "Consider an electric or hybrid vehicle for your next car",
+        "Avoid unnecessary flights; choose trains for shorter distances"
+    ],
+    "Food": [
+        "Reduce red meat consumption to once per week or less",
+        "Buy seasonal and locally-sourced produce",
+        "Plan meals to minimize food waste",
+        "Start composting organic waste",
+        "Choose products with minimal packaging",
+        "Grow your own herbs or vegetables if possible"
+    ],
+    "Consumption": [
+        "Buy second-hand clothes and electronics when possible",
+        "Repair items instead of replacing them",
+        "Choose quality products that last longer",
+        "Recycle properly and learn your local recycling guidelines",
+        "Avoid single-use plastics; carry reusable alternatives",
+        "Support companies with strong sustainability practices"
+    ]
+}
@@ -0,0 +1,73 @@
+"""
+Response Cache
+Size-bounded LRU of serialized JSON responses with ETags and hit/miss
+counters. Used in front of /api/calculate, where popular answer combinations
+are submitted over and over: a hit skips both scoring and serialization.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+CachedResponse = namedtuple('CachedResponse', ['body', 'etag'])
+
+
+def make_etag(body):
+    """Strong ETag value for a response body"""
+    return hashlib.sha1(body).hexdigest()
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU mapping a hashable key to a serialized response
+
+    Args:
+        max_entries: Entries kept before the least recently used is evicted
+            (0 disables the cache)
+    """
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the CachedResponse for key (counted as a hit) or None (a miss)"""
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return cached
+
+    def put(self, key, body):
+        """Store a serialized body under key; returns its CachedResponse"""
+        cached = CachedResponse(body, make_etag(body))
+        if self.max_entries <= 0:
+            return cached
+        with self._lock:
+            self._entries[key] = cached
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return cached
+
+    def clear(self):
+        """Drop every entry (e.g. when the scoring model changes)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return {'entries', 'hits', 'misses', 'hit_ratio'}"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
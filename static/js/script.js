@@ -74,11 +74,27 @@ function showScreen(screenId) {
 // ===================================
 // Quiz Logic
 // ===================================
+// Questions embedded in the page by the server (used once, for the first quiz)
+function takeInlineQuestions() {
+    const element = document.getElementById('quiz-questions');
+    if (!element) return null;
+    element.remove();
+    try {
+        return JSON.parse(element.textContent);
+    } catch (error) {
+        console.error('Invalid inline questions:', error);
+        return null;
+    }
+}
+
 async function startQuiz() {
     try {
-        // Fetch questions from backend
-        const response = await fetch('/api/questions');
-        questions = await response.json();
+        // Use the server-rendered question set, or fetch a new one (retakes)
+        questions = takeInlineQuestions();
+        if (!questions) {
+            const response = await fetch('/api/questions');
+            questions = await response.json();
+        }
         
         // Reset state - create a fresh empty array
         currentQuestionIndex = 0;
@@ -707,8 +723,8 @@ async function sendChatMessage() {
         
         console.log('Sending to chatbot:', contextData);
         
-        // Send message to backend
-        const response = await fetch('/chat', {
+        // Stream the reply from the backend as Server-Sent Events
+        const response = await fetch('/chat/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -721,15 +737,47 @@ async function sendChatMessage() {
             throw new Error(`HTTP ${response.status}: ${response.statusText}`);
         }
         
-        const data = await response.json();
+        // Render tokens into a single bot message as they arrive
+        let botContent = null;
+        let reply = '';
+        let renderPending = false;
+        let gotResponse = false;
+        
+        const renderReply = () => {
+            renderPending = false;
+            renderMessageContent(botContent, reply);
+            const chatMessages = document.getElementById('chatMessages');
+            chatMessages.scrollTop = chatMessages.scrollHeight;
+        };
+        
+        await readEventStream(response, (event, data) => {
+            if (event === 'token') {
+                if (!botContent) {
+                    hideTypingIndicator();
+                    botContent = addMessageToChat('', 'bot');
+                }
+                reply += data.text;
+                if (!renderPending) {
+                    renderPending = true;
+                    requestAnimationFrame(renderReply);
+                }
+            } else if (event === 'done') {
+                gotResponse = true;
+            } else if (event === 'error') {
+                gotResponse = true;
+                hideTypingIndicator();
+                addMessageToChat(data.message || 'Sorry, I encountered an error. Please try again.', 'bot');
+            }
+        });
         
         // Remove typing indicator
         hideTypingIndicator();
         
-        if (data.success) {
-            addMessageToChat(data.message, 'bot');
-        } else {
-            addMessageToChat(data.message || 'Sorry, I encountered an error. Please try again.', 'bot');
+        if (botContent) {
+            renderReply();
+        }
+        if (!gotResponse) {
+            addMessageToChat('Sorry, I encountered an error. Please try again.', 'bot');
         }
     } catch (error) {
         console.error('Chat error:', error);
@@ -738,6 +786,38 @@ async function sendChatMessage() {
     }
 }
 
+// Read a text/event-stream response, calling onEvent(event, data) per frame
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const frame = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let event = 'message';
+            let data = '';
+            for (const line of frame.split('\n')) {
+                if (line.startsWith('event:')) {
+                    event = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    data += line.slice(5).trim();
+                }
+            }
+            if (data) {
+                onEvent(event, JSON.parse(data));
+            }
+        }
+    }
+}
+
 function addMessageToChat(message, sender) {
     const chatMessages = document.getElementById('chatMessages');
     const messageDiv = document.createElement('div');
@@ -754,7 +834,20 @@ function addMessageToChat(message, sender) {
     
     const content = document.createElement('div');
     content.className = 'message-content';
+    renderMessageContent(content, message);
+    
+    messageDiv.appendChild(avatar);
+    messageDiv.appendChild(content);
+    
+    chatMessages.appendChild(messageDiv);
+    
+    // Scroll to bottom
+    chatMessages.scrollTop = chatMessages.scrollHeight;
     
+    return content;
+}
+
+function renderMessageContent(content, message) {
     // Clean and format the message
     let formattedMessage = message
         // Remove markdown bold/italic
@@ -803,14 +896,6 @@ function addMessageToChat(message, sender) {
     }
     
     content.innerHTML = html;
-    
-    messageDiv.appendChild(avatar);
-    messageDiv.appendChild(content);
-    
-    chatMessages.appendChild(messageDiv);
-    
-    // Scroll to bottom
-    chatMessages.scrollTop = chatMessages.scrollHeight;
 }
 
 function showTypingIndicator() {
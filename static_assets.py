@@ -0,0 +1,413 @@
+"""
+Static Assets
+Build step and serving for the front-end files:
+
+- `python -m static_assets build` minifies static/css/style.css and
+  static/js/script.js, names each copy after a hash of its content and
+  precompresses it (.gz, and .br when brotli is installed) into static/dist/
+- Font Awesome is self-hosted: the solid icon font is subset to the icons
+  the template and script.js actually use (from the fontawesomefree package)
+- Inter and Quicksand are self-hosted when their font files are in
+  assets/fonts/ (Google Fonts downloads, OFL), subset to Latin
+- static/dist/manifest.json maps source names to built names, and records
+  a hash of each source file
+
+At runtime init_app() makes url_for('static', filename='css/style.css')
+resolve to the built file (unless the source changed since the build: a
+stale entry is ignored with a warning and the plain file is served), and serves static/dist/ with the best encoding
+the client accepts and an immutable one-year Cache-Control. Without a build
+everything falls back to the plain files, and any fonts that aren't
+self-hosted load from the CDNs without blocking render.
+
+    pip install rcssmin rjsmin brotli fonttools fontawesomefree   # build-only tools
+    python -m static_assets build [--clean]
+"""
+
+import glob
+import gzip
+import hashlib
+import io
+import json
+import logging
+import mimetypes
+import os
+import re
+import shutil
+
+from flask import request, send_from_directory
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = 'dist'  # under STATIC_DIR
+MANIFEST_NAME = 'manifest.json'
+FONT_SOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'fonts')
+
+# Source files built into static/dist/ (paths relative to static/)
+ASSET_SOURCES = ('css/style.css', 'js/script.js')
+# Files scanned for fa-* icon names
+ICON_SOURCES = ('templates/index.html', 'static/js/script.js')
+
+TEXT_FONTS = ('Inter', 'Quicksand')
+ICON_FONT = 'Font Awesome 6 Free'
+GOOGLE_FONTS_URL = ('https://fonts.googleapis.com/css2?family=Quicksand:wght@400;500;600;700'
+                    '&family=Inter:wght@300;400;500;600&display=swap')
+FONT_AWESOME_URL = 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css'
+
+# Google Fonts' "latin" subset
+LATIN_UNICODES = ([*range(0x20, 0x7F), *range(0xA0, 0x100), 0x131, 0x152, 0x153, 0x2BB, 0x2BC, 0x2C6, 0x2DA,
+                   0x2DC, *range(0x2000, 0x2070), 0x2074, 0x20AC, 0x2122, 0x2191, 0x2193, 0x2212, 0x2215,
+                   0xFEFF, 0xFFFD])
+LATIN_RANGE = ('U+0000-00FF, U+0131, U+0152-0153, U+02BB-02BC, U+02C6, U+02DA, U+02DC, U+2000-206F, U+2074, '
+               'U+20AC, U+2122, U+2191, U+2193, U+2212, U+2215, U+FEFF, U+FFFD')
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+# ===================================
+# Build
+# ===================================
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def hashed_name(path, data):
+    """css/style.css -> css/style.<hash>.css"""
+    stem, ext = os.path.splitext(path)
+    return f'{stem}.{content_hash(data)}{ext}'
+
+
+def minify(path, data):
+    """Minified bytes of a .css/.js file (unchanged if rcssmin/rjsmin isn't installed)"""
+    try:
+        if path.endswith('.css'):
+            from rcssmin import cssmin
+            return cssmin(data.decode('utf-8')).encode('utf-8')
+        if path.endswith('.js'):
+            from rjsmin import jsmin
+            return jsmin(data.decode('utf-8')).encode('utf-8')
+    except ImportError as e:
+        logger.warning("⚠️  %s not minified (%s); pip install rcssmin rjsmin", path, e)
+    return data
+
+
+def precompress(path, data):
+    """
+    Write path.gz and path.br next to path (skipping any that wouldn't be smaller)
+
+    Returns:
+        dict: {encoding: compressed size}
+    """
+    variants = {'gzip': gzip.compress(data, 9, mtime=0)}
+    try:
+        import brotli
+        variants['br'] = brotli.compress(data, quality=11)
+    except ImportError:
+        logger.warning("⚠️  brotli not installed; only .gz variants are written")
+    sizes = {}
+    for encoding, suffix in ENCODINGS:
+        if encoding in variants and len(variants[encoding]) < len(data):
+            with open(path + suffix, 'wb') as f:
+                f.write(variants[encoding])
+            sizes[encoding] = len(variants[encoding])
+    return sizes
+
+
+def icon_names(root, sources=ICON_SOURCES):
+    """fa-* icon names used by the template and scripts"""
+    names = set()
+    for source in sources:
+        with open(os.path.join(root, source), encoding='utf-8') as f:
+            names.update(re.findall(r'\bfa-([a-z0-9-]+)', f.read()))
+    return sorted(names - {'solid', 'regular', 'brands'})
+
+
+def font_awesome_dir():
+    """Root of the fontawesomefree package's files, or None"""
+    try:
+        import fontawesomefree
+    except ImportError:
+        return None
+    return os.path.join(os.path.dirname(fontawesomefree.__file__), 'static', 'fontawesomefree')
+
+
+def icon_codepoints(names, icons):
+    """{icon name: codepoint} for solid icons, resolving aliases (home -> house)"""
+    by_name = {}
+    for name, icon in icons.items():
+        if 'solid' not in icon.get('styles', ()):
+            continue
+        by_name[name] = int(icon['unicode'], 16)
+        for alias in icon.get('aliases', {}).get('names', ()):
+            by_name.setdefault(alias, int(icon['unicode'], 16))
+    missing = [name for name in names if name not in by_name]
+    if missing:
+        logger.warning("⚠️  Unknown Font Awesome icons (not in the subset): %s", ', '.join(missing))
+    return {name: by_name[name] for name in names if name in by_name}
+
+
+def subset_font(path, unicodes):
+    """
+    Subset a font file to unicodes and return it as WOFF2
+
+    Returns:
+        tuple: (woff2 bytes, font-weight value, font-style value)
+    """
+    from fontTools import subset
+
+    options = subset.Options()
+    options.flavor = 'woff2'
+    options.layout_features = ['*']
+    font = subset.load_font(path, options)
+    if 'fvar' in font:
+        axis = next((axis for axis in font['fvar'].axes if axis.axisTag == 'wght'), None)
+        weight = f'{axis.minValue:g} {axis.maxValue:g}' if axis else str(font['OS/2'].usWeightClass)
+    else:
+        weight = str(font['OS/2'].usWeightClass)
+    style = 'italic' if font['OS/2'].fsSelection & 1 else 'normal'
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=unicodes)
+    subsetter.subset(font)
+    buffer = io.BytesIO()
+    subset.save_font(font, buffer, options)
+    return buffer.getvalue(), weight, style
+
+
+def font_face(family, url, weight, style, unicode_range=None, display='swap'):
+    rules = [f'font-family:"{family}"', f'font-style:{style}', f'font-weight:{weight}', f'font-display:{display}',
+             f'src:url({url}) format("woff2")']
+    if unicode_range:
+        rules.append(f'unicode-range:{unicode_range}')
+    return '@font-face{' + ';'.join(rules) + '}'
+
+
+def build_icon_font(root, dist):
+    """
+    Subset Font Awesome's solid font to the icons in use
+
+    Returns:
+        tuple: (CSS rules, [font paths relative to static/]) or (None, []) without fontawesomefree
+    """
+    source = font_awesome_dir()
+    if source is None:
+        logger.warning("⚠️  fontawesomefree not installed; icons keep loading from the CDN")
+        return None, []
+    with open(os.path.join(source, 'metadata', 'icons.json'), encoding='utf-8') as f:
+        codepoints = icon_codepoints(icon_names(root), json.load(f))
+
+    data, _, _ = subset_font(os.path.join(source, 'webfonts', 'fa-solid-900.ttf'), list(codepoints.values()))
+    font_path = hashed_name('fonts/fa-solid-900.woff2', data)
+    with open(os.path.join(dist, font_path), 'wb') as f:
+        f.write(data)
+
+    rules = [font_face(ICON_FONT, f'../{font_path}', 900, 'normal', display='block'),
+             '.fa,.fas,.fa-solid{-moz-osx-font-smoothing:grayscale;-webkit-font-smoothing:antialiased;'
+             'display:inline-block;font-style:normal;font-variant:normal;line-height:1;text-rendering:auto;'
+             f'font-family:"{ICON_FONT}";font-weight:900}}']
+    rules += [f'.fa-{name}:before{{content:"\\{codepoint:x}"}}' for name, codepoint in codepoints.items()]
+    print(f"🔤 {ICON_FONT} subset to {len(codepoints)} icons: {len(data):,} bytes")
+    return rules, [font_path]
+
+
+def build_text_fonts(dist, source_dir=FONT_SOURCE_DIR):
+    """
+    Subset the TEXT_FONTS files found in source_dir (<Family>*.ttf/otf/woff2) to Latin
+
+    Returns:
+        tuple: (CSS rules, [font paths], [self-hosted families])
+    """
+    rules, paths, families = [], [], []
+    for family in TEXT_FONTS:
+        sources = sorted(path for ext in ('ttf', 'otf', 'woff2')
+                         for path in glob.glob(os.path.join(source_dir, f'{family}*.{ext}')))
+        if not sources:
+            logger.warning("⚠️  No %s font files in %s; it keeps loading from Google Fonts", family, source_dir)
+            continue
+        for source in sources:
+            data, weight, style = subset_font(source, LATIN_UNICODES)
+            stem = os.path.splitext(os.path.basename(source))[0]
+            font_path = hashed_name(f'fonts/{stem}.woff2', data)
+            with open(os.path.join(dist, font_path), 'wb') as f:
+                f.write(data)
+            rules.append(font_face(family, f'../{font_path}', weight, style, LATIN_RANGE))
+            paths.append(font_path)
+        families.append(family)
+    return rules, paths, families
+
+
+def build(root=None, clean=False):
+    """
+    Build static/dist/ and its manifest
+
+    Args:
+        root: Project root (default: this file's directory)
+        clean: Remove earlier builds first (by default old hashed files are kept,
+            so pages rendered before a deploy can still load them)
+
+    Returns:
+        dict: the manifest, plus a 'report' list of (name, source, minified, gzip, brotli) sizes
+    """
+    root = root or os.path.dirname(os.path.abspath(__file__))
+    static = os.path.join(root, 'static')
+    dist = os.path.join(static, DIST_DIR)
+    if clean:
+        shutil.rmtree(dist, ignore_errors=True)
+    for sub in ('css', 'js', 'fonts'):
+        os.makedirs(os.path.join(dist, sub), exist_ok=True)
+
+    files, sources, report = {}, {}, []
+
+    def emit(source_name, original_size, data):
+        built = hashed_name(source_name, data)
+        path = os.path.join(dist, built)
+        with open(path, 'wb') as f:
+            f.write(data)
+        sizes = precompress(path, data)
+        files[source_name] = built
+        report.append((source_name, original_size, len(data), sizes.get('gzip'), sizes.get('br')))
+
+    for source_name in ASSET_SOURCES:
+        with open(os.path.join(static, source_name), 'rb') as f:
+            original = f.read()
+        sources[source_name] = content_hash(original)
+        emit(source_name, len(original), minify(source_name, original))
+
+    icon_rules, icon_paths = build_icon_font(root, dist)
+    text_rules, text_paths, families = build_text_fonts(dist, os.path.join(root, 'assets', 'fonts'))
+    if icon_rules or text_rules:
+        fonts_css = '\n'.join(text_rules + (icon_rules or [])).encode('utf-8') + b'\n'
+        emit('css/fonts.css', len(fonts_css), fonts_css)
+
+    manifest = {
+        'files': files,
+        'sources': sources,
+        'preload': text_paths + icon_paths,
+        'self_hosted': families + ([ICON_FONT] if icon_rules else []),
+    }
+    tmp_path = os.path.join(dist, MANIFEST_NAME + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(dist, MANIFEST_NAME))
+    return dict(manifest, report=report)
+
+
+def format_report(report):
+    lines = [f"{'asset':<18} {'source':>9} {'minified':>9} {'gzip':>9} {'brotli':>9}"]
+    for name, source, minified, gz, br in report:
+        cells = [f'{size:>9,}' if size else f"{'-':>9}" for size in (source, minified, gz, br)]
+        lines.append(f'{name:<18} ' + ' '.join(cells))
+    return '\n'.join(lines)
+
+
+# ===================================
+# Serving
+# ===================================
+class StaticAssets:
+    """
+    Built-asset lookups for templates (exposed to Jinja as `assets`)
+
+    Attributes:
+        files: {source name: built name} (empty without a build; sources edited since the build are left out)
+        self_hosted: Font families served from static/dist/
+    """
+
+    def __init__(self, static_dir=STATIC_DIR):
+        self.dist = os.path.join(static_dir, DIST_DIR)
+        try:
+            with open(os.path.join(self.dist, MANIFEST_NAME)) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            manifest = {}
+        self.files = self._current(static_dir, manifest.get('files', {}), manifest.get('sources', {}))
+        self.preload = manifest.get('preload', [])
+        self.self_hosted = set(manifest.get('self_hosted', ()))
+
+    @staticmethod
+    def _current(static_dir, files, sources):
+        """files without the entries whose source no longer matches the hash recorded at build time"""
+        current = {}
+        for name, built in files.items():
+            try:
+                with open(os.path.join(static_dir, name), 'rb') as f:
+                    source_hash = content_hash(f.read())
+            except FileNotFoundError:
+                current[name] = built  # generated by the build (fonts.css)
+                continue
+            if sources.get(name) == source_hash:
+                current[name] = built
+            else:
+                logger.warning("⚠️  static/%s changed since the last build; serving it unbuilt "
+                               "(python -m static_assets build)", name)
+        return current
+
+    @property
+    def built(self):
+        return bool(self.files)
+
+    @property
+    def google_fonts(self):
+        """Whether any text font still has to come from Google Fonts"""
+        return not self.self_hosted.issuperset(TEXT_FONTS)
+
+    @property
+    def font_awesome_cdn(self):
+        return ICON_FONT not in self.self_hosted
+
+    def resolve(self, filename):
+        """static/ path of the built copy of filename, or None"""
+        built = self.files.get(filename)
+        return f'{DIST_DIR}/{built}' if built else None
+
+
+def init_app(app):
+    """Point url_for('static', ...) at built files and serve them precompressed"""
+    assets = StaticAssets(app.static_folder)
+    app.jinja_env.globals['assets'] = assets
+    app.jinja_env.globals['GOOGLE_FONTS_URL'] = GOOGLE_FONTS_URL
+    app.jinja_env.globals['FONT_AWESOME_URL'] = FONT_AWESOME_URL
+    if assets.built:
+        logger.info("📦 Serving %d built static assets from %s", len(assets.files), assets.dist)
+
+    @app.url_defaults
+    def hashed_static_url(endpoint, values):
+        if endpoint == 'static':
+            built = assets.resolve(values.get('filename'))
+            if built is not None:
+                values['filename'] = built
+
+    @app.route(f'{app.static_url_path}/{DIST_DIR}/<path:filename>')
+    def dist_static(filename):
+        """Built assets: content-hashed, so cached forever; .br/.gz variants when accepted"""
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        for encoding, suffix in ENCODINGS:
+            if request.accept_encodings[encoding] and os.path.isfile(os.path.join(assets.dist, filename + suffix)):
+                response = send_from_directory(assets.dist, filename + suffix, mimetype=mimetype)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(assets.dist, filename, mimetype=mimetype)
+        response.headers['Cache-Control'] = IMMUTABLE
+        response.vary.add('Accept-Encoding')
+        return response
+
+    return assets
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build fingerprinted, precompressed static assets")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_command = commands.add_parser('build', help="Minify, hash and precompress into static/dist/")
+    build_command.add_argument('--clean', action='store_true', help="Remove earlier builds first")
+    args = parser.parse_args()
+
+    manifest = build(clean=args.clean)
+    print(format_report(manifest['report']))
+    print(f"Self-hosted fonts: {', '.join(manifest['self_hosted']) or 'none'}")
+    print(f"✅ Static assets built into static/{DIST_DIR}/")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,105 +1,136 @@
 """
 Train CatBoost model and export for Flask app
-Run this script to generate model.cbm, encoders.pkl, and scalers.pkl
+Run this script to generate model.bundle (model, encoders, scalers and feature order)
+and coefficients.json (the calculator's table, distilled from the new model)
+
+    python train_model.py [--data PATH] [--cache-dir DIR] [--chunk-rows N] [--rebuild]
+                          [--search {none,grid,random}] [--candidates N] [--folds K] [--jobs N]
+                          [--results PATH] [--output-dir DIR] [--model-version LABEL]
+
+The CSV is streamed once into a columnar cache next to it (see
+dataset_cache.py); later runs load the cache instead of re-parsing.
+
+With --search, candidates from model_search.PARAM_GRID are cross-validated
+on a process pool, the results table is written to --results and the best
+candidate is refit on all rows and exported.
 """
 
-import numpy as np
-import pandas as pd
-import pickle
-from sklearn.preprocessing import LabelEncoder, StandardScaler
+import argparse
+import os
+from sklearn.metrics import mean_absolute_error, r2_score
 from sklearn.model_selection import train_test_split
 import catboost as cb
 
-# Load data
-df = pd.read_csv("/Users/dickyning/Downloads/Carbon Emission.csv")
-
-# Rename columns
-df.columns = ['Body Type', 'Sex', 'Diet', 'Shower', 'Heating', 'Transport', 'Vehicle', 'Social', 'Grocery', 'Flight', 'Vehicle Distance',
-              'Bag Size', 'Waste Weekly', 'TV Daily Hour', 'Clothes Monthly', 'Internet Daily', 'Energy Eff', 'Recycling', 'Cooking',
-              'CarbonEmission']
-
-# Replace NaN
-df.replace(np.nan, 'None', inplace=True)
-
-# Parse recycling and cooking
-import ast
-df['Recycling'] = df['Recycling'].apply(ast.literal_eval)
-recycling_items = list(set(item for sublist in df['Recycling'] for item in sublist))
-
-df['Cooking'] = df['Cooking'].apply(ast.literal_eval)
-cooking_items = list(set(item for sublist in df['Cooking'] for item in sublist))
-
-# Create binary columns
-for item in recycling_items:
-    df[item] = df['Recycling'].apply(lambda x: 1 if item in x else 0)
-
-for item in cooking_items:
-    df[item] = df['Cooking'].apply(lambda x: 1 if item in x else 0)
-
-df = df.drop(columns=['Recycling', 'Cooking'])
-
-# Define column types
-cat_col = ['Body Type', 'Sex', 'Diet', 'Shower', 'Heating', 'Transport', 'Vehicle', 'Social','Flight', 'Bag Size',
-           'Energy Eff', 'Plastic', 'Glass', 'Metal', 'Paper', 'Microwave', 'Oven', 'Stove', 'Airfryer', 'Grill']
-num_col = ['Grocery', 'Vehicle Distance', 'Waste Weekly', 'TV Daily Hour', 'Internet Daily', 'Clothes Monthly']
-
-# Label encoding
-encoders = {}
-for col in cat_col:
-    encoder = LabelEncoder()
-    df[col] = encoder.fit_transform(df[col])
-    encoders[col] = encoder
-
-# Standard scaling
-scalers = {}
-for column in num_col:
-    scaler = StandardScaler()
-    df[column] = scaler.fit_transform(df[[column]])
-    scalers[column] = scaler
-
-# Split data
-X = df.drop('CarbonEmission', axis=1)
-y = df['CarbonEmission']
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-# Train model
-print("Training CatBoost model...")
-catboost_model = cb.CatBoostRegressor(
-    iterations=1000,
-    learning_rate=0.1,
-    depth=5,
-    eval_metric='RMSE',
-    cat_features=[0, 1, 2, 3, 4, 5, 6],  # Indices of categorical features
-    verbose=100
-)
-
-catboost_model.fit(X_train, y_train, eval_set=(X_test, y_test), early_stopping_rounds=100)
-
-# Save model
-model_path = 'model.cbm'
-catboost_model.save_model(model_path)
-print(f"\n✅ Model saved to {model_path}")
-
-# Save encoders
-with open('encoders.pkl', 'wb') as f:
-    pickle.dump(encoders, f)
-print("✅ Encoders saved to encoders.pkl")
-
-# Save scalers
-with open('scalers.pkl', 'wb') as f:
-    pickle.dump(scalers, f)
-print("✅ Scalers saved to scalers.pkl")
-
-# Save feature order for reference
-feature_order = list(X.columns)
-with open('feature_order.pkl', 'wb') as f:
-    pickle.dump(feature_order, f)
-print("✅ Feature order saved to feature_order.pkl")
-
-print("\n🎉 All files exported successfully!")
-print("\nModel performance:")
-from sklearn.metrics import mean_absolute_error, r2_score
-y_pred = catboost_model.predict(X_test)
-print(f"MAE: {mean_absolute_error(y_test, y_pred):.2f}")
-print(f"R²: {r2_score(y_test, y_pred):.4f}")
-
+from dataset_cache import DEFAULT_CHUNK_ROWS, load_or_build
+from distill_coefficients import distill, format_report, write_table
+from feature_pipeline import FeaturePipeline, TARGET, prepare_frame
+from inference import QuizEncoder
+from model_search import (BASE_PARAMS, EARLY_STOPPING_ROUNDS, available_cores, cat_feature_names, export_artifacts,
+                          fit_final, format_results, grid_candidates, plan_workers, prepare_folds, random_candidates,
+                          run_search, write_results)
+
+
+def export_coefficients(model, pipeline, version, output_dir):
+    """Distill the calculator's coefficient table from the new model and report its fidelity"""
+    encoder = QuizEncoder(pipeline.feature_order, pipeline.category_codes, pipeline.scaling)
+    table = distill(model, encoder, model_version=version)
+    path = os.path.join(output_dir, 'coefficients.json')
+    write_table(table, path)
+    print(f"\n{format_report(table)}")
+    print(f"✅ Coefficient table saved to {path}")
+
+
+def train_once(df, args):
+    """Train the base configuration on an 80/20 split and export it"""
+    # Multi-hot Recycling/Cooking, categorical codes and standard scaling in one vectorized pass
+    pipeline = FeaturePipeline()
+    encoded = pipeline.fit_transform(df)
+
+    # Split data
+    X = encoded[pipeline.feature_order]
+    y = encoded[TARGET]
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    # Train model
+    print("Training CatBoost model...")
+    catboost_model = cb.CatBoostRegressor(
+        **BASE_PARAMS,
+        cat_features=cat_feature_names(pipeline),  # Every label-encoded column
+        verbose=100
+    )
+
+    catboost_model.fit(X_train, y_train, eval_set=(X_test, y_test), early_stopping_rounds=EARLY_STOPPING_ROUNDS)
+
+    # Save model, encoders, scalers and feature order as one bundle
+    path, manifest = export_artifacts(catboost_model, pipeline, args.output_dir, args.model_version)
+    print(f"\n✅ Model bundle {manifest['version']} saved to {path}")
+    export_coefficients(catboost_model, pipeline, manifest['version'], args.output_dir)
+
+    print("\nModel performance:")
+    y_pred = catboost_model.predict(X_test)
+    print(f"MAE: {mean_absolute_error(y_test, y_pred):.2f}")
+    print(f"R²: {r2_score(y_test, y_pred):.4f}")
+
+
+def search(df, args, cache_dir):
+    """Cross-validate the candidates, export the best one refit on all rows"""
+    candidates = grid_candidates() if args.search == 'grid' else random_candidates(args.candidates)
+
+    # Folds are preprocessed once and shared by every candidate (kept in the dataset cache)
+    folds_dir = os.path.join(cache_dir, f'folds-k{args.folds}')
+    meta = prepare_folds(df, folds_dir, n_folds=args.folds)
+
+    jobs, threads = plan_workers(len(candidates) * args.folds, args.jobs)
+    print(f"🔎 Cross-validating {len(candidates)} candidates x {args.folds} folds "
+          f"({jobs} processes x {threads} CatBoost threads)...")
+    results = run_search(candidates, folds_dir, meta, jobs=jobs)
+    write_results(results, args.results)
+    print(format_results(results))
+    print(f"✅ Results table saved to {args.results}")
+
+    best = results[0]
+    print(f"\n🏆 Refitting best candidate on all {len(df):,} rows: {best['params']}")
+    catboost_model, pipeline = fit_final(df, best['params'], iterations=best['best_iteration'] + 1,
+                                         thread_count=available_cores())
+    path, manifest = export_artifacts(catboost_model, pipeline, args.output_dir, args.model_version)
+    print(f"\n✅ Model bundle {manifest['version']} saved to {path}")
+    export_coefficients(catboost_model, pipeline, manifest['version'], args.output_dir)
+    print(f"\nCross-validated performance ({args.folds} folds):")
+    print(f"MAE: {best['mae']:.2f}")
+    print(f"R²: {best['r2']:.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the CatBoost model and export its artifacts")
+    parser.add_argument('--data', default=os.environ.get('CARBON_DATA', 'Carbon Emission.csv'),
+                        help="Survey CSV (default: $CARBON_DATA or ./Carbon Emission.csv)")
+    parser.add_argument('--cache-dir', help="Columnar cache directory (default: <data>.cache)")
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help="CSV rows parsed per chunk")
+    parser.add_argument('--rebuild', action='store_true', help="Rebuild the cache even if it is up to date")
+    parser.add_argument('--search', choices=['none', 'grid', 'random'], default='none',
+                        help="Hyperparameter search (default: train the base configuration once)")
+    parser.add_argument('--candidates', type=int, default=8, help="Candidates sampled by --search random")
+    parser.add_argument('--folds', type=int, default=5, help="Cross-validation folds for --search")
+    parser.add_argument('--jobs', type=int, help="Pool processes for --search (default: one per core)")
+    parser.add_argument('--results', default='search_results.csv', help="Search results table (CSV)")
+    parser.add_argument('--output-dir', default='.', help="Where model.bundle is written")
+    parser.add_argument('--model-version', help="Version label stored in the bundle (default: UTC timestamp)")
+    args = parser.parse_args()
+
+    # Load data (chunked CSV ingestion on first run, memory-mapped cache afterwards)
+    cache_dir = args.cache_dir or args.data + '.cache'
+    df = load_or_build(args.data, cache_dir, chunk_rows=args.chunk_rows, rebuild=args.rebuild)
+    print(f"📂 Loaded {len(df):,} rows from {args.data}")
+
+    # Rename columns and replace NaN
+    df = prepare_frame(df)
+
+    if args.search == 'none':
+        train_once(df, args)
+    else:
+        search(df, args, cache_dir)
+
+
+# Guarded so pool workers (spawned on macOS/Windows) don't rerun training on import
+if __name__ == '__main__':
+    main()
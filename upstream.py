@@ -0,0 +1,384 @@
+"""
+Upstream Client
+Claude calls with a deadline, retries and a circuit breaker, so a slow or
+failing upstream costs each chat a bounded wait instead of a blocked worker:
+
+- One pooled HTTP client per process (UPSTREAM_MAX_CONNECTIONS, of which
+  UPSTREAM_KEEPALIVE_CONNECTIONS are kept alive for UPSTREAM_KEEPALIVE_EXPIRY
+  seconds); the SDK's own retries are turned off, this module owns them
+- Each chat gets CHAT_DEADLINE seconds for all of its attempts and backoff.
+  Every attempt's timeout is what is left of it (connecting is capped at
+  UPSTREAM_CONNECT_TIMEOUT)
+- Connection errors, timeouts, 408/409/429 and 5xx/529 responses are retried
+  up to UPSTREAM_MAX_RETRIES times with full-jitter exponential backoff
+  (UPSTREAM_BACKOFF_BASE doubling up to UPSTREAM_BACKOFF_MAX, or the server's
+  retry-after), only while the deadline leaves room for another attempt.
+  Other errors (400, 401, ...) are raised at once
+- UPSTREAM_BREAKER_FAILURES chats in a row failing with retryable errors open
+  the circuit: for UPSTREAM_BREAKER_COOLDOWN seconds calls fail fast with
+  CircuitOpen (the chat routes answer with a local fallback), then one probe
+  call is let through and closes it again if it succeeds
+- Streams are retried until the response starts; once tokens flow, an error
+  ends the stream
+
+python -m benchmarks.bench_upstream compares tail latency with and without
+this layer against the local fake API with injected latency and errors.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from anthropic import (DEFAULT_CONNECTION_LIMITS, APIConnectionError, APIStatusError, APITimeoutError, Anthropic,
+                       AsyncAnthropic, DefaultAsyncHttpxClient, DefaultHttpxClient, Timeout)
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+CHAT_DEADLINE = float(os.environ.get('CHAT_DEADLINE', 20))
+UPSTREAM_CONNECT_TIMEOUT = float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', 3))
+UPSTREAM_MAX_CONNECTIONS = int(os.environ.get('UPSTREAM_MAX_CONNECTIONS', 64))
+UPSTREAM_KEEPALIVE_CONNECTIONS = int(os.environ.get('UPSTREAM_KEEPALIVE_CONNECTIONS', 32))
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.environ.get('UPSTREAM_KEEPALIVE_EXPIRY', 30))
+UPSTREAM_MAX_RETRIES = int(os.environ.get('UPSTREAM_MAX_RETRIES', 2))
+UPSTREAM_BACKOFF_BASE = float(os.environ.get('UPSTREAM_BACKOFF_BASE', 0.25))
+UPSTREAM_BACKOFF_MAX = float(os.environ.get('UPSTREAM_BACKOFF_MAX', 2))
+UPSTREAM_BREAKER_FAILURES = int(os.environ.get('UPSTREAM_BREAKER_FAILURES', 5))
+UPSTREAM_BREAKER_COOLDOWN = float(os.environ.get('UPSTREAM_BREAKER_COOLDOWN', 30))
+
+RETRYABLE_STATUS = frozenset({408, 409, 429, 500, 502, 503, 504, 529})
+MIN_ATTEMPT_SECONDS = 0.5  # don't start an attempt with less of the deadline left
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling Claude while the circuit breaker is open"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Claude API circuit open, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """Raised when an async call's deadline passes before Claude answers"""
+
+    def __init__(self, deadline):
+        super().__init__(f"No answer from the Claude API within the {deadline:g}s deadline")
+
+
+def retryable(error):
+    """Whether a failed call is worth retrying (and counts against the circuit breaker)"""
+    if isinstance(error, APIStatusError):
+        return error.status_code in RETRYABLE_STATUS
+    return isinstance(error, (APIConnectionError, DeadlineExceeded))
+
+
+def unavailable(error):
+    """Whether an error means Claude is unreachable or overloaded (rather than a bad request or key)"""
+    return isinstance(error, CircuitOpen) or retryable(error)
+
+
+def _retry_after(error):
+    """Seconds from a response's retry-after header, if any"""
+    response = getattr(error, 'response', None)
+    try:
+        return float(response.headers.get('retry-after'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker (closed -> open -> half-open probe -> closed)
+
+    Args:
+        failures: Failed calls in a row that open the circuit
+        cooldown: Seconds the circuit stays open before a probe is allowed
+    """
+
+    def __init__(self, failures=UPSTREAM_BREAKER_FAILURES, cooldown=UPSTREAM_BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._consecutive = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now):
+        if self._opened_at is None:
+            return 'closed'
+        return 'open' if now - self._opened_at < self.cooldown or self._probing else 'half_open'
+
+    def allow(self):
+        """
+        Claim permission for one call
+
+        Returns:
+            bool: Whether the call is the half-open probe (pass it back to record)
+
+        Raises:
+            CircuitOpen: While open, or while the half-open probe is in flight
+        """
+        with self._lock:
+            now = time.monotonic()
+            state = self._state(now)
+            if state == 'closed':
+                return False
+            if state == 'half_open':
+                self._probing = True
+                return True
+            self.rejected += 1
+            raise CircuitOpen(max(0.0, self._opened_at + self.cooldown - now))
+
+    def record(self, failed, probe=False):
+        """Record the outcome of an allowed call"""
+        with self._lock:
+            if probe:
+                self._probing = False
+            if not failed:
+                if self._opened_at is not None:
+                    logger.info("✅ Claude API circuit closed")
+                self._consecutive = 0
+                self._opened_at = None
+                return
+            self._consecutive += 1
+            if probe or (self._opened_at is None and self._consecutive >= self.failures):
+                if self._opened_at is None:
+                    self.opened += 1
+                    logger.warning("⚡ Claude API circuit open after %d failed calls, failing fast for %ss",
+                                   self._consecutive, self.cooldown)
+                self._opened_at = time.monotonic()
+
+    def release(self, probe):
+        """Forget an allowed call that ended without an outcome (e.g. cancelled)"""
+        if probe:
+            with self._lock:
+                self._probing = False
+
+    def stats(self):
+        """State (0 closed, 1 half-open, 2 open), times opened and calls rejected"""
+        state = self.state
+        return {'state': state, 'state_value': {'closed': 0, 'half_open': 1, 'open': 2}[state],
+                'opened': self.opened, 'rejected': self.rejected}
+
+
+class RetryPolicy:
+    """
+    Which failures to retry and how long to wait before the next attempt
+
+    Args:
+        max_retries: Retries after the first attempt
+        base: First backoff ceiling in seconds (doubles per retry)
+        cap: Largest backoff ceiling
+        rng: random.Random for the jitter
+    """
+
+    def __init__(self, max_retries=UPSTREAM_MAX_RETRIES, base=UPSTREAM_BACKOFF_BASE, cap=UPSTREAM_BACKOFF_MAX,
+                 rng=None):
+        self.max_retries = max_retries
+        self.base = base
+        self.cap = cap
+        self.rng = rng or random.Random()
+
+    def delay(self, retry, error, remaining):
+        """
+        Seconds to wait before retry number retry (0-based), or None to give up
+
+        Args:
+            retry: Retries made so far
+            error: The exception of the failed attempt
+            remaining: Seconds left of the deadline
+        """
+        if retry >= self.max_retries or not retryable(error):
+            return None
+        wait = self.rng.uniform(0, min(self.cap, self.base * 2 ** retry))
+        server_wait = _retry_after(error)
+        if server_wait is not None:
+            wait = max(wait, min(server_wait, self.cap))
+        if remaining - wait < MIN_ATTEMPT_SECONDS:
+            return None
+        return wait
+
+
+def _timeout(remaining, connect=UPSTREAM_CONNECT_TIMEOUT):
+    return Timeout(remaining, connect=min(connect, remaining))
+
+
+def _reason(error):
+    if isinstance(error, APIStatusError):
+        return str(error.status_code)
+    return 'timeout' if isinstance(error, (APITimeoutError, DeadlineExceeded)) else 'connection'
+
+
+async def _bounded(awaitable, seconds, deadline):
+    # asyncio's TimeoutError is an OSError, which the stream handlers treat as a client disconnect
+    try:
+        return await asyncio.wait_for(awaitable, seconds)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(deadline) from None
+
+
+class _Attempts:
+    """Deadline and retry bookkeeping shared by the sync and async clients"""
+
+    def __init__(self, breaker, policy, deadline):
+        self.breaker = breaker
+        self.policy = policy
+        self.deadline = deadline
+        self.probe = breaker.allow()
+
+    def done(self, failed):
+        self.breaker.record(failed, self.probe)
+
+    def failed(self, error, retry, started, call):
+        """Backoff before the next attempt, or None (the breaker has then been told)"""
+        remaining = self.deadline - (time.perf_counter() - started)
+        wait = self.policy.delay(retry, error, remaining)
+        if wait is None:
+            self.done(retryable(error))
+            return None
+        metrics.record_retry(call, _reason(error))
+        logger.info("🔁 Retrying Claude %s in %.2fs after %s", call, wait, _reason(error))
+        return wait
+
+
+def pooled_http_client(async_client=False):
+    """HTTP client for the SDK with the UPSTREAM_* pool settings"""
+    limits = type(DEFAULT_CONNECTION_LIMITS)(  # the Limits class of the SDK's HTTP library
+        max_connections=UPSTREAM_MAX_CONNECTIONS,
+        max_keepalive_connections=UPSTREAM_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY,
+    )
+    return (DefaultAsyncHttpxClient if async_client else DefaultHttpxClient)(limits=limits)
+
+
+class ResilientClient:
+    """
+    Anthropic client wrapper: messages.create / messages.stream with deadline, retries and breaker
+
+    Args:
+        client: Anthropic client (create one with max_retries=0; see create_client)
+        breaker: CircuitBreaker (may be shared with the async client)
+        policy: RetryPolicy
+        deadline: Seconds per call, all attempts and backoff included
+    """
+
+    def __init__(self, client, breaker=None, policy=None, deadline=CHAT_DEADLINE):
+        self.client = client
+        self.breaker = breaker or CircuitBreaker()
+        self.policy = policy or RetryPolicy()
+        self.deadline = deadline
+
+    @property
+    def messages(self):
+        """SDK-style access: client.messages.create(...) / client.messages.stream(...)"""
+        return self
+
+    def _call(self, call, attempt):
+        attempts = _Attempts(self.breaker, self.policy, self.deadline)
+        started = time.perf_counter()
+        retry = 0
+        while True:
+            try:
+                result = attempt(_timeout(self.deadline - (time.perf_counter() - started)))
+            except Exception as e:
+                wait = attempts.failed(e, retry, started, call)
+                if wait is None:
+                    raise
+                time.sleep(wait)
+                retry += 1
+                continue
+            attempts.done(False)
+            return result
+
+    def create(self, **kwargs):
+        """messages.create under the deadline, retry policy and breaker"""
+        return self._call('create', lambda timeout: self.client.messages.create(**kwargs, timeout=timeout))
+
+    @contextmanager
+    def stream(self, **kwargs):
+        """messages.stream; retried until the response starts"""
+        def attempt(timeout):
+            manager = self.client.messages.stream(**kwargs, timeout=timeout)
+            return manager, manager.__enter__()
+
+        manager, stream = self._call('stream', attempt)
+        try:
+            yield stream
+        finally:
+            manager.__exit__(None, None, None)
+
+    def close(self):
+        self.client.close()
+
+
+class AsyncResilientClient(ResilientClient):
+    """ResilientClient for AsyncAnthropic (the deadline is also enforced with asyncio.wait_for)"""
+
+    async def _call(self, call, attempt):
+        attempts = _Attempts(self.breaker, self.policy, self.deadline)
+        started = time.perf_counter()
+        retry = 0
+        try:
+            while True:
+                remaining = self.deadline - (time.perf_counter() - started)
+                try:
+                    result = await _bounded(attempt(_timeout(remaining)), remaining, self.deadline)
+                except Exception as e:
+                    wait = attempts.failed(e, retry, started, call)
+                    if wait is None:
+                        raise
+                    await asyncio.sleep(wait)
+                    retry += 1
+                    continue
+                attempts.done(False)
+                return result
+        except asyncio.CancelledError:
+            # The client went away; that says nothing about the upstream
+            self.breaker.release(attempts.probe)
+            raise
+
+    async def create(self, **kwargs):
+        return await self._call('create', lambda timeout: self.client.messages.create(**kwargs, timeout=timeout))
+
+    @asynccontextmanager
+    async def stream(self, **kwargs):
+        async def attempt(timeout):
+            manager = self.client.messages.stream(**kwargs, timeout=timeout)
+            return manager, await manager.__aenter__()
+
+        manager, stream = await self._call('stream', attempt)
+        try:
+            yield stream
+        finally:
+            await manager.__aexit__(None, None, None)
+
+    async def close(self):
+        await self.client.close()
+
+
+def create_client(api_key, breaker=None, async_client=False, deadline=CHAT_DEADLINE, **client_args):
+    """
+    Pooled Anthropic client (SDK retries off) wrapped in a (Async)ResilientClient
+
+    Args:
+        api_key: Anthropic API key
+        breaker: CircuitBreaker to share (the Flask and ASGI clients use one per process)
+        async_client: Wrap AsyncAnthropic instead of Anthropic
+        deadline: Seconds per call, all attempts and backoff included
+        client_args: More Anthropic() arguments (e.g. base_url)
+    """
+    sdk = AsyncAnthropic if async_client else Anthropic
+    client = sdk(api_key=api_key, max_retries=0, http_client=pooled_http_client(async_client), **client_args)
+    return (AsyncResilientClient if async_client else ResilientClient)(client, breaker, deadline=deadline)